@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Validate several chart repositories (URLs or local docs/ directories) in parallel processes"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import debug_log
+from offline_validate import DEFAULT_REPO_URL, build_offline_checks
+from validation_runner import FAIL, ValidationRunner
+
+
+def validate_repository(target, repo_url=DEFAULT_REPO_URL):
+    """Run the deep debug checks against one repository; returns a JSON-serializable result.
+
+    target is a repository URL or a local directory (served as repo_url, as
+    offline_validate does). Runs inside a worker process: its checks fetch
+    concurrently on the worker's own thread pool and HTTP session, while
+    YAML parsing and hashing use the worker's core.
+    """
+    # Imported here so worker processes pay for the network stack only when they use it
+    from deep_debug_artifacthub import build_checks
+
+    started = time.perf_counter()
+    local = os.path.isdir(target)
+    lines = []
+    try:
+        if not local and not target.startswith(("http://", "https://")):
+            raise ValueError("not a directory or an http(s) URL")
+        if local:
+            checks, resources = build_offline_checks(target, repo_url)
+        else:
+            checks, resources = build_checks(target.rstrip("/"))
+        results = ValidationRunner(checks, resources, output=lines.append).run()
+        checks_out = [
+            {"id": check.check_id, "status": result.status, "lines": result.lines}
+            for check, result in results
+        ]
+        error = None
+    except Exception as e:
+        checks_out = []
+        error = f"{type(e).__name__}: {e}"
+    debug_log.flush()
+    failed = error is not None or any(check["status"] == FAIL for check in checks_out)
+    return {
+        "repository": target,
+        "mode": "local" if local else "network",
+        "status": "fail" if failed else "pass",
+        "error": error,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+        "checks": checks_out,
+        "lines": lines,
+    }
+
+
+def validate_all(targets, repo_url=DEFAULT_REPO_URL, processes=None):
+    """Validate every target across a process pool; results come back in input order"""
+    processes = processes or min(len(targets), os.cpu_count() or 1)
+    # spawn: workers start without the parent's threads, locks or HTTP connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        return list(pool.map(validate_repository, targets, [repo_url] * len(targets)))
+
+
+def merge_report(results):
+    """Combine per-repository results into one report with per-check totals"""
+    totals = {}
+    for result in results:
+        for check in result["checks"]:
+            totals.setdefault(check["id"], {}).setdefault(check["status"], 0)
+            totals[check["id"]][check["status"]] += 1
+    return {
+        "generated": int(time.time() * 1000),
+        "repositories": len(results),
+        "failed": [result["repository"] for result in results if result["status"] == "fail"],
+        "checkTotals": totals,
+        "results": results,
+    }
+
+
+def read_targets(paths):
+    """Targets from files with one URL or directory per line (# starts a comment)"""
+    targets = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    targets.append(line)
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("targets", nargs="*", help="repository URLs or local docs/ directories")
+    parser.add_argument("--from-file", action="append", default=[], help="file listing targets, one per line")
+    parser.add_argument("--repo-url", default=DEFAULT_REPO_URL, help="URL local directories are served from")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per target, up to the CPU count)")
+    parser.add_argument("--json", help="also write the merged report to this file")
+    parser.add_argument("--quiet", action="store_true", help="print only the summary")
+    args = parser.parse_args(argv)
+
+    targets = args.targets + read_targets(args.from_file)
+    if not targets:
+        parser.error("no repositories given")
+
+    started = time.perf_counter()
+    report = merge_report(validate_all(targets, args.repo_url, args.processes))
+    elapsed = time.perf_counter() - started
+
+    for result in report["results"]:
+        if not args.quiet:
+            print(f"\n{'=' * 70}\n📦 {result['repository']} ({result['mode']})\n{'=' * 70}")
+            for line in result["lines"]:
+                print(line)
+            if result["error"]:
+                print(f"❌ ERROR: {result['error']}")
+    print(f"\n📋 Batch summary ({len(targets)} repositories in {elapsed:.1f}s):")
+    for result in report["results"]:
+        mark = "✓" if result["status"] == "pass" else "❌"
+        print(f"   {mark} {result['repository']} ({result['elapsedMs']:.0f} ms)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"   Report written to {args.json}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    status = main()
+    debug_log.flush()
+    sys.exit(status)
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Benchmark the validators against a synthetic chart repository served from localhost"""
+import argparse
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+DEFAULT_OUTPUT = "bench_results.json"
+
+
+def make_package(name, version, size, rng):
+    """Return a valid chart .tgz of roughly size bytes (the payload is incompressible)"""
+    chart_yaml = yaml.safe_dump({
+        "apiVersion": "v2",
+        "name": name,
+        "version": version,
+        "appVersion": f"v{version}",
+        "description": "Synthetic chart for benchmarking",
+        "type": "application",
+    }).encode()
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=1, mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode="w") as tar:
+            for member, data in ((f"{name}/Chart.yaml", chart_yaml),
+                                 (f"{name}/files/payload.bin", rng.randbytes(size))):
+                info = tarfile.TarInfo(member)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class MockChartRepository:
+    """A chart repository of charts x versions packages served over HTTP/1.1 on localhost.
+
+    Packages are spread round-robin over hosts servers (one port each, so
+    per-host limits apply as they would across real hosts); index.yaml is
+    served by the first. The last slow_hosts servers add slow_latency to every
+    response, the others latency. A package request fails with 503 with
+    probability error_rate. GET, HEAD, Range: bytes=0-0 and If-None-Match
+    are supported, and requests, body bytes and statuses are counted per host.
+    """
+
+    def __init__(self, charts=10, versions=10, package_size=32 * 1024, hosts=1, slow_hosts=0,
+                 latency=0.0, slow_latency=0.2, error_rate=0.0, seed=0):
+        self.charts = charts
+        self.versions = versions
+        self.package_size = package_size
+        self.hosts = max(1, hosts)
+        self.slow_hosts = min(slow_hosts, self.hosts)
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._servers = []
+        self.files = {}
+        self.index_bytes = b""
+        self.reset_stats()
+
+    def _host_latency(self, host):
+        return self.slow_latency if host >= self.hosts - self.slow_hosts else self.latency
+
+    def start(self):
+        for host in range(self.hosts):
+            server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler(host))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        self._build()
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def base_url(self, host):
+        return f"http://127.0.0.1:{self._servers[host].server_port}"
+
+    @property
+    def repo_url(self):
+        return f"{self.base_url(0)}/repo"
+
+    def _build(self):
+        entries = {}
+        n = 0
+        for c in range(self.charts):
+            name = f"chart-{c:04d}"
+            for v in range(self.versions):
+                version = f"1.{v}.0"
+                filename = f"{name}-{version}.tgz"
+                body = make_package(name, version, self.package_size, self._rng)
+                host = n % self.hosts
+                n += 1
+                self._add_file(host, f"/repo/{filename}", body)
+                entries.setdefault(name, []).append({
+                    "apiVersion": "v2",
+                    "name": name,
+                    "version": version,
+                    "created": "2026-01-01T00:00:00Z",
+                    "digest": hashlib.sha256(body).hexdigest(),
+                    "urls": [f"{self.base_url(host)}/repo/{filename}"],
+                })
+        self.index_data = {"apiVersion": "v1", "entries": entries, "generated": "2026-01-01T00:00:00Z"}
+        self.index_bytes = yaml.dump(self.index_data, Dumper=SafeDumper).encode()
+        self._add_file(0, "/repo/index.yaml", self.index_bytes)
+
+    def _add_file(self, host, path, body):
+        self.files[(host, path)] = (body, '"%s"' % hashlib.md5(body).hexdigest())
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {"requests": Counter(), "bytes": Counter(), "statuses": Counter()}
+
+    def stats(self):
+        """Return totals and per-host counts since the last reset_stats()"""
+        with self._stats_lock:
+            requests, sent, statuses = (Counter(self._stats[k]) for k in ("requests", "bytes", "statuses"))
+        return {
+            "requests": sum(requests.values()),
+            "bytes": sum(sent.values()),
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            "perHost": {str(h): {"requests": requests[h], "bytes": sent[h]} for h in sorted(requests)},
+        }
+
+    def _record(self, host, status, size):
+        with self._stats_lock:
+            self._stats["requests"][host] += 1
+            self._stats["bytes"][host] += size
+            self._stats["statuses"][status] += 1
+
+    def _fails(self):
+        if not self.error_rate:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+    def _handler(self, host):
+        repo = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, send_body):
+                time.sleep(repo._host_latency(host))
+                path = self.path.split("?", 1)[0]
+                if (host, path) not in repo.files:
+                    return self._send(404, b"", send_body)
+                if path.endswith(".tgz") and repo._fails():
+                    return self._send(503, b"", send_body)
+                body, etag = repo.files[(host, path)]
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, b"", send_body, {"ETag": etag})
+                headers = {"ETag": etag, "Content-Type": "application/octet-stream"}
+                if self.headers.get("Range") == "bytes=0-0" and body:
+                    headers["Content-Range"] = f"bytes 0-0/{len(body)}"
+                    return self._send(206, body[:1], send_body, headers)
+                return self._send(200, body, send_body, headers)
+
+            def _send(self, status, body, send_body, headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                sent = len(body) if send_body else 0
+                if sent:
+                    self.wfile.write(body)
+                repo._record(host, status, sent)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def _chart_urls(index_data):
+    return [url for versions in index_data["entries"].values() for version in versions for url in version["urls"]]
+
+
+def bench_fetch_and_parse_index(repo_url, index_data):
+    from deep_debug_artifacthub import fetch_and_parse_index
+    ok, index, _ = fetch_and_parse_index(repo_url, "BENCH")
+    return ok and len(index.result()["entries"]) == len(index_data["entries"])
+
+
+def bench_validate_probe(repo_url, index_data):
+    from deep_debug_artifacthub import validate_chart_urls
+    return validate_chart_urls(index_data, repo_url, "BENCH", verify_digests=False)[0]
+
+
+def bench_validate_digest(repo_url, index_data):
+    from deep_debug_artifacthub import validate_chart_urls
+    return validate_chart_urls(index_data, repo_url, "BENCH", verify_digests=True)[0]
+
+
+def _bench_check_url(index_data, probe):
+    from fetch_pool import run_bounded
+    from test_artifacthub import check_url
+    results = run_bounded(_chart_urls(index_data), lambda url: check_url(url, "BENCH", "Chart package", probe=probe))
+    return all(ok for ok, _, _, _ in results)
+
+
+def bench_check_url_probe(repo_url, index_data):
+    return _bench_check_url(index_data, probe=True)
+
+
+def bench_check_url_get(repo_url, index_data):
+    return _bench_check_url(index_data, probe=False)
+
+
+# (name, function, name of the benchmark whose HTTP cache it starts from or None for a cold cache)
+BENCHMARKS = [
+    ("fetch_and_parse_index", bench_fetch_and_parse_index, None),
+    ("fetch_and_parse_index:warm", bench_fetch_and_parse_index, "fetch_and_parse_index"),
+    ("validate_chart_urls:probe", bench_validate_probe, None),
+    ("validate_chart_urls:digest", bench_validate_digest, None),
+    ("validate_chart_urls:digest-warm", bench_validate_digest, "validate_chart_urls:digest"),
+    ("check_url:probe", bench_check_url_probe, None),
+    ("check_url:get", bench_check_url_get, None),
+]
+
+
+def _max_rss_kib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _child(function, repo_url, index_path, conn):
+    """Run one benchmark in a fresh interpreter so peak RSS is its own"""
+    from index_parser import load_index
+    with open(index_path, "rb") as f:
+        index_data = load_index(f)
+    start_rss = _max_rss_kib()
+    started = time.perf_counter()
+    try:
+        ok, error = bool(function(repo_url, index_data)), None
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    import debug_log
+    debug_log.flush()
+    conn.send({"ok": ok, "error": error, "wallSeconds": wall, "startRssKiB": start_rss, "peakRssKiB": _max_rss_kib()})
+    conn.close()
+
+
+def run_benchmark(repo, function, index_path, cache_dir, log_path):
+    """Run function in a spawned process against repo; returns its measurements"""
+    os.environ["ARTIFACTHUB_CACHE_DIR"] = cache_dir
+    os.environ["ARTIFACTHUB_DEBUG_LOG"] = log_path
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    repo.reset_stats()
+    process = ctx.Process(target=_child, args=(function, repo.repo_url, index_path, child))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    result.update(repo.stats())
+    return result
+
+
+def run_suite(repo, names=None, repeat=1, workdir=None):
+    """Run the selected benchmarks repeat times each; returns one result dict per benchmark"""
+    workdir = workdir or tempfile.mkdtemp(prefix="chart-bench-")
+    index_path = os.path.join(workdir, "index.yaml")
+    with open(index_path, "wb") as f:
+        f.write(repo.index_bytes)
+    results = []
+    for name, function, warm_from in BENCHMARKS:
+        if names and name not in names:
+            continue
+        runs = []
+        for i in range(repeat):
+            cache_dir = os.path.join(workdir, f"cache-{name.replace(':', '-')}-{i}")
+            if warm_from:
+                seed_dir = os.path.join(workdir, f"cache-{warm_from.replace(':', '-')}-{i}")
+                if not os.path.isdir(seed_dir):
+                    seed = next(f for n, f, _ in BENCHMARKS if n == warm_from)
+                    run_benchmark(repo, seed, index_path, seed_dir, os.path.join(workdir, "debug.log"))
+                shutil.copytree(seed_dir, cache_dir)
+            runs.append(run_benchmark(repo, function, index_path, cache_dir, os.path.join(workdir, "debug.log")))
+        walls = [run["wallSeconds"] for run in runs]
+        results.append({
+            "name": name,
+            "ok": all(run["ok"] for run in runs),
+            "wallSeconds": statistics.median(walls),
+            "wallSecondsMin": min(walls),
+            "requests": runs[-1]["requests"],
+            "bytes": runs[-1]["bytes"],
+            "peakRssKiB": max(run["peakRssKiB"] for run in runs),
+            "runs": runs,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--charts", type=int, default=10, help="number of charts (default: 10)")
+    parser.add_argument("--versions", type=int, default=10, help="versions per chart (default: 10)")
+    parser.add_argument("--package-size", type=int, default=32 * 1024, help="payload bytes per package (default: 32768)")
+    parser.add_argument("--hosts", type=int, default=2, help="servers the packages are spread over (default: 2)")
+    parser.add_argument("--slow-hosts", type=int, default=0, help="how many of those servers are slow")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds added to every response (default: 0.005)")
+    parser.add_argument("--slow-latency", type=float, default=0.2, help="seconds added by slow hosts (default: 0.2)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of package requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for payloads and injected errors")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per benchmark; the median wall time is reported")
+    parser.add_argument("--only", action="append", help="run only this benchmark (repeatable)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"JSON results file (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.only or ()) - {name for name, _, _ in BENCHMARKS}
+    if unknown:
+        parser.error(f"unknown benchmark(s): {sorted(unknown)}")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("only", "output")}
+    repo = MockChartRepository(args.charts, args.versions, args.package_size, args.hosts, args.slow_hosts,
+                               args.latency, args.slow_latency, args.error_rate, args.seed).start()
+    workdir = tempfile.mkdtemp(prefix="chart-bench-")
+    try:
+        print(f"Serving {args.charts} charts x {args.versions} versions from {repo.repo_url}")
+        results = run_suite(repo, args.only, args.repeat, workdir)
+    finally:
+        repo.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results:
+        mark = "✓" if result["ok"] else "❌"
+        print(f"{mark} {result['name']:<34} {result['wallSeconds'] * 1000:9.1f} ms "
+              f"{result['requests']:6d} req {result['bytes'] / 1024:10.1f} KiB {result['peakRssKiB'] / 1024:7.1f} MiB RSS")
+    with open(args.output, "w") as f:
+        json.dump({
+            "config": config,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Compare two published chart packages member by member and diff their YAML structurally"""
+import argparse
+import difflib
+import hashlib
+import json
+import re
+import sys
+
+import yaml
+
+import debug_log
+import request_timing
+from chart_http import CHUNK_SIZE
+from chart_inspect import open_chart_archive
+from fetch_pool import run_bounded
+from index_parser import SafeLoader
+from repo_fetcher import NETWORK
+
+# Members whose content is kept for a structural diff; everything else is only hashed
+STRUCTURED = ("Chart.yaml", "values.yaml", "crds/", "templates/")
+
+# Larger YAML members are compared by hash and size only
+MAX_DIFF_BYTES = 16 * 1024 * 1024
+
+_ACTION = re.compile(r"{{.*?}}", re.S)
+_PLACEHOLDER = re.compile(r"__tpl(\d+)__")
+
+
+class LocalStreams:
+    """open_stream() for plain file paths, so local packages and URLs can be mixed"""
+
+    def open_stream(self, path):
+        return open(path, "rb")
+
+
+LOCAL = LocalStreams()
+
+
+def _is_structured(relative):
+    return relative.endswith((".yaml", ".yml")) and relative.startswith(STRUCTURED)
+
+
+def read_members(stream):
+    """Hash every file in a chart .tgz read sequentially from stream.
+
+    Returns (chart_root, members) where members maps each path relative to
+    the chart directory to (sha256, size, content). content is kept only for
+    the YAML members that may be diffed (Chart.yaml, values.yaml, crds/,
+    templates/); everything else is hashed a chunk at a time and dropped.
+    """
+    chart_root = None
+    members = {}
+    with open_chart_archive(stream) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            root, _, relative = member.name.lstrip("./").partition("/")
+            if chart_root is None:
+                chart_root = root
+            keep = _is_structured(relative) and member.size <= MAX_DIFF_BYTES
+            digest = hashlib.sha256()
+            chunks = []
+            f = tar.extractfile(member)
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                if keep:
+                    chunks.append(chunk)
+            members[relative] = (digest.hexdigest(), member.size, b"".join(chunks) if keep else None)
+    while stream.read(CHUNK_SIZE):
+        pass
+    return chart_root, members
+
+
+def open_members(source, fetcher=NETWORK):
+    """read_members() for a package path or URL"""
+    opener = fetcher if source.startswith(("http://", "https://")) else LOCAL
+    with opener.open_stream(source) as stream:
+        return read_members(stream)
+
+
+def parse_documents(relative, content):
+    """Parse a member into {document key: document}.
+
+    Template actions are swapped for placeholders before parsing (and put
+    back afterwards), so templates are compared as written rather than as
+    rendered with either package's values. Kubernetes objects are keyed by
+    kind and name, so reordering documents within a file is not a change.
+    """
+    text = content.decode("utf-8")
+    actions = []
+    if relative.startswith("templates/"):
+        def placeholder(match):
+            actions.append(match.group(0))
+            return f"__tpl{len(actions) - 1}__"
+        text = _ACTION.sub(placeholder, text)
+    documents = {}
+    for position, doc in enumerate(yaml.load_all(text, Loader=SafeLoader)):
+        if doc is None:
+            continue
+        if actions:
+            doc = _restore(doc, actions)
+        key = f"#{position}"
+        if isinstance(doc, dict) and doc.get("kind"):
+            key = f"{doc['kind']}/{(doc.get('metadata') or {}).get('name')}"
+        documents[key] = doc
+    return documents
+
+
+def _restore(node, actions):
+    if isinstance(node, str):
+        return _PLACEHOLDER.sub(lambda match: actions[int(match.group(1))], node)
+    if isinstance(node, dict):
+        return {_restore(k, actions): _restore(v, actions) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_restore(item, actions) for item in node]
+    return node
+
+
+def _named(items):
+    """Map list items by their "name" field when every item has a distinct one"""
+    if not all(isinstance(item, dict) and isinstance(item.get("name"), str) for item in items):
+        return None
+    named = {item["name"]: item for item in items}
+    return named if len(named) == len(items) else None
+
+
+def diff_tree(old, new, path="", changes=None):
+    """Append ("+"|"-"|"~", path, old, new) for every difference between two YAML trees.
+
+    Equal subtrees are skipped with a single == comparison, so the cost
+    grows with the size of the change rather than of the document. Lists of
+    mappings with unique "name" fields (containers, ports, CRD versions) are
+    matched by name; other lists position by position.
+    """
+    if changes is None:
+        changes = []
+    if old == new:
+        return changes
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            child = f"{path}.{key}" if path else str(key)
+            if key not in new:
+                changes.append(("-", child, old[key], None))
+            else:
+                diff_tree(old[key], new[key], child, changes)
+        for key in new:
+            if key not in old:
+                changes.append(("+", f"{path}.{key}" if path else str(key), None, new[key]))
+        return changes
+    if isinstance(old, list) and isinstance(new, list):
+        old_named, new_named = _named(old), _named(new)
+        if old_named is not None and new_named is not None:
+            for name, item in old_named.items():
+                child = f"{path}[name={name}]"
+                if name not in new_named:
+                    changes.append(("-", child, item, None))
+                else:
+                    diff_tree(item, new_named[name], child, changes)
+            for name, item in new_named.items():
+                if name not in old_named:
+                    changes.append(("+", f"{path}[name={name}]", None, item))
+            return changes
+        for position in range(max(len(old), len(new))):
+            child = f"{path}[{position}]"
+            if position >= len(new):
+                changes.append(("-", child, old[position], None))
+            elif position >= len(old):
+                changes.append(("+", child, None, new[position]))
+            else:
+                diff_tree(old[position], new[position], child, changes)
+        return changes
+    changes.append(("~", path, old, new))
+    return changes
+
+
+def diff_member(relative, old_content, new_content):
+    """Structural changes of one member, or a unified text diff if either side is not valid YAML"""
+    try:
+        old_docs = parse_documents(relative, old_content)
+        new_docs = parse_documents(relative, new_content)
+    except (yaml.YAMLError, UnicodeDecodeError):
+        lines = difflib.unified_diff(old_content.decode("utf-8", "replace").splitlines(),
+                                     new_content.decode("utf-8", "replace").splitlines(), lineterm="", n=1)
+        return {"text": list(lines)[2:]}
+    # A single unkeyed document (values.yaml, Chart.yaml) needs no document prefix in paths
+    if list(old_docs) == list(new_docs) == ["#0"]:
+        return {"changes": diff_tree(old_docs["#0"], new_docs["#0"])}
+    return {"changes": diff_tree(old_docs, new_docs)}
+
+
+def diff_packages(old_source, new_source, fetcher=NETWORK):
+    """Compare two chart packages (paths or URLs); both are streamed concurrently.
+
+    Members are matched by their path inside the chart directory, so a
+    renamed chart still lines up. Members with equal hashes are counted and
+    skipped without being parsed.
+    """
+    (old_root, old), (new_root, new) = run_bounded(
+        [old_source, new_source], lambda source: open_members(source, fetcher), key=lambda source: source,
+    )
+    report = {
+        "old": {"source": old_source, "chartRoot": old_root},
+        "new": {"source": new_source, "chartRoot": new_root},
+        "identical": 0,
+        "added": sorted(path for path in new if path not in old),
+        "removed": sorted(path for path in old if path not in new),
+        "changed": {},
+    }
+    for path in sorted(path for path in old if path in new):
+        (old_digest, old_size, old_content), (new_digest, new_size, new_content) = old[path], new[path]
+        if old_digest == new_digest:
+            report["identical"] += 1
+        elif old_content is not None and new_content is not None:
+            report["changed"][path] = diff_member(path, old_content, new_content)
+        else:
+            report["changed"][path] = {"sizes": [old_size, new_size]}
+    return report
+
+
+def _show(value):
+    text = json.dumps(value, default=str)
+    return text if len(text) <= 80 else text[:77] + "..."
+
+
+def format_report(report):
+    """Return the lines printed for a package diff"""
+    lines = [
+        f"Comparing {report['old']['source']} -> {report['new']['source']}",
+        f"  = {report['identical']} identical members skipped",
+    ]
+    lines += [f"  + {path}" for path in report["added"]]
+    lines += [f"  - {path}" for path in report["removed"]]
+    for path, change in report["changed"].items():
+        lines.append(f"  ~ {path}")
+        if "sizes" in change:
+            lines.append(f"      content differs ({change['sizes'][0]} -> {change['sizes'][1]} bytes)")
+        elif "text" in change:
+            lines.append("      not valid YAML in either package, text diff:")
+            lines += [f"      {line}" for line in change["text"]]
+        else:
+            for op, key, old, new in change["changes"]:
+                if op == "~":
+                    lines.append(f"      ~ {key}: {_show(old)} -> {_show(new)}")
+                else:
+                    lines.append(f"      {op} {key}: {_show(old if op == '-' else new)}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old", help="older chart package (.tgz path or URL)")
+    parser.add_argument("new", help="newer chart package (.tgz path or URL)")
+    parser.add_argument("--json", help="also write the diff to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        report = diff_packages(args.old, args.new)
+    except Exception as e:
+        print(f"❌ Could not read packages: {type(e).__name__}: {e}")
+        return 1
+    for line in format_report(report):
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Diff written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
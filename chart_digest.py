@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Streaming SHA-256 verification of chart packages against index.yaml digests"""
+import hashlib
+
+from chart_http import CHUNK_SIZE, get_session
+from fetch_pool import DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST, host_of, run_bounded
+from http_cache import get_cache
+
+
+def sha256_chunks(chunks):
+    """Return (hexdigest, size) of an iterable of byte chunks"""
+    hasher = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        hasher.update(chunk)
+        size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    """Return (hexdigest, size) of a file, read in fixed-size chunks"""
+    with open(path, "rb") as f:
+        return sha256_chunks(iter(lambda: f.read(chunk_size), b""))
+
+
+def verify_digest(url, expected, session=None, cache=None, chunk_size=CHUNK_SIZE):
+    """Stream url through SHA-256 and compare with the expected hex digest.
+
+    The body is hashed chunk by chunk while it is written to the HTTP cache,
+    so memory use is one chunk regardless of package size. When the cached
+    copy is still current (304) the digest recorded for it is reused and no
+    body is transferred. Returns a dict with url, expected, actual, size,
+    matches and notModified. HTTP errors propagate to the caller.
+    """
+    session = session or get_session()
+    cache = cache or get_cache()
+    meta = cache.lookup(url)
+    request_headers = cache.validators(meta) if meta else {}
+    with session.open("GET", url, headers=request_headers) as response:
+        if response.status == 304 and meta:
+            response.read()
+            cache.touch(url)
+            actual, size = meta.get("sha256"), meta.get("size")
+            if not actual:
+                actual, size = sha256_file(cache.body_path(url), chunk_size)
+                cache.update_meta(url, sha256=actual)
+            not_modified = True
+        else:
+            hasher = hashlib.sha256()
+
+            def hashed():
+                for chunk in response.iter_chunks(chunk_size):
+                    hasher.update(chunk)
+                    yield chunk
+
+            size = cache.store(url, response.headers, hashed())
+            actual = hasher.hexdigest()
+            cache.update_meta(url, sha256=actual)
+            not_modified = False
+    return {
+        "url": url,
+        "expected": expected,
+        "actual": actual,
+        "size": size,
+        "matches": actual == (expected or "").lower(),
+        "notModified": not_modified,
+    }
+
+
+def verify_digests(pairs, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST):
+    """Verify (url, expected_digest) pairs concurrently; results follow input order.
+
+    A failed download is reported as a non-matching result with an "error"
+    field instead of raising.
+    """
+    def verify(pair):
+        url, expected = pair
+        try:
+            return verify_digest(url, expected)
+        except Exception as e:
+            return {"url": url, "expected": expected, "actual": None, "size": None,
+                    "matches": False, "notModified": False, "error": str(e)}
+
+    return run_bounded(pairs, verify, max_workers=max_workers, per_host=per_host,
+                       key=lambda pair: host_of(pair[0]))
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""HTTP helpers shared by the Artifact Hub validator scripts"""
+import http.client
+import re
+import ssl
+import threading
+import urllib.error
+from urllib.parse import urljoin, urlsplit
+
+from request_timing import RequestTiming, connect_timed, get_recorder
+from retry_policy import (BREAKER_STATUSES, IDEMPOTENT_METHODS, RETRY_ERRORS, RETRY_STATUSES, BreakerRegistry,
+                          RetryPolicy)
+
+USER_AGENT = 'ArtifactHub/1.0'
+DEFAULT_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 8
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 64 * 1024
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+# HEAD responses that mean "this server does not do HEAD", not "resource missing"
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+
+# Errors raised when a pooled keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+_CONTENT_RANGE_TOTAL = re.compile(r'/(\d+)\s*$')
+
+
+class ConnectionPool:
+    """Idle keep-alive connections to one scheme://host:port"""
+
+    def __init__(self, scheme, host, port, maxsize, ssl_context):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.ssl_context = ssl_context
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self, timeout):
+        """Return (connection, reused)"""
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        if self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        return conn, False
+
+    def put(self, conn):
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class Response:
+    """A response whose connection goes back to its pool once the body is consumed"""
+
+    def __init__(self, url, raw, conn, pool, timing=None):
+        self.url = url
+        self.raw = raw
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.msg
+        self.timing = timing
+        self._conn = conn
+        self._pool = pool
+
+    def read(self, amt=None):
+        data = self.raw.read(amt)
+        if self.timing is not None:
+            self.timing.bytes += len(data)
+        if amt is None or not data:
+            self.release()
+        return data
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """Yield the body in chunks of at most chunk_size bytes"""
+        while True:
+            chunk = self.raw.read(chunk_size)
+            if not chunk:
+                break
+            if self.timing is not None:
+                self.timing.bytes += len(chunk)
+            yield chunk
+        self.release()
+
+    def release(self):
+        """Return the connection to the pool, or close it if the body is unread"""
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if not self.raw.isclosed() and self.raw.length == 0:
+            # HEAD, 204 and empty bodies: finish the response so the connection is clean
+            self.raw.read()
+        if self.raw.isclosed() and not self.raw.will_close:
+            self._pool.put(conn)
+        else:
+            self.raw.close()
+            conn.close()
+        if self.timing is not None:
+            self.timing.body = self.timing.lap()
+            get_recorder().record(self.timing)
+
+    close = release
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class HTTPSession:
+    """Keep-alive HTTP client with one connection pool per host.
+
+    Connections are reused across requests (and threads), so only the first
+    request to a host pays for the TCP and TLS handshakes. Idempotent
+    requests that hit a network error or a retryable status are retried per
+    retry_policy, and each host has a circuit breaker so a dead host fails
+    fast instead of costing a full timeout per URL.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, user_agent=USER_AGENT,
+                 retry_policy=None, breakers=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breakers = breakers or BreakerRegistry()
+        self.ssl_context = ssl.create_default_context()
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool_for(self, parts):
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = ConnectionPool(scheme, parts.hostname, port, self.pool_size, self.ssl_context)
+            return pool
+
+    def _send(self, method, url, headers, timeout):
+        parts = urlsplit(url)
+        pool = self._pool_for(parts)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        request_headers = {'User-Agent': self.user_agent}
+        request_headers.update(headers or {})
+        while True:
+            conn, reused = pool.get(timeout)
+            timing = RequestTiming(method, url, f"{parts.hostname}:{pool.port}")
+            timing.reused = reused
+            try:
+                if conn.sock is None:
+                    timing.reused = False
+                    connect_timed(conn, timing)
+                conn.request(method, path, headers=request_headers)
+                raw = conn.getresponse()
+                timing.ttfb = timing.lap()
+                timing.status = raw.status
+            except Exception as e:
+                conn.close()
+                if reused and isinstance(e, STALE_CONNECTION_ERRORS):
+                    # The server dropped an idle connection; retry on a fresh one
+                    continue
+                timing.error = type(e).__name__
+                timing.lap()
+                get_recorder().record(timing)
+                raise
+            return Response(url, raw, conn, pool, timing)
+
+    def _send_with_retry(self, method, url, headers, timeout):
+        """_send() guarded by the host's circuit breaker and retried per the retry policy"""
+        parts = urlsplit(url)
+        breaker = self.breakers.get(f"{parts.hostname}:{parts.port or (443 if parts.scheme == 'https' else 80)}")
+        retry = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_request()
+            try:
+                response = self._send(method, url, headers, timeout)
+            except RETRY_ERRORS:
+                breaker.record_failure()
+                delay = self.retry_policy.delay_for(attempt) if retry else None
+                if delay is None:
+                    raise
+                self.retry_policy.sleep(delay)
+                continue
+            except Exception:
+                breaker.record_neutral()
+                raise
+            if response.status in BREAKER_STATUSES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if retry and response.status in RETRY_STATUSES:
+                delay = self.retry_policy.delay_for(attempt, response.headers.get('Retry-After'))
+                if delay is not None:
+                    response.read()
+                    self.retry_policy.sleep(delay)
+                    continue
+            return response
+
+    def open(self, method, url, headers=None, timeout=None):
+        """Send a request, following redirects; raises HTTPError for 4xx/5xx"""
+        timeout = self.timeout if timeout is None else timeout
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send_with_retry(method, url, headers, timeout)
+            location = response.headers.get('Location')
+            if response.status in REDIRECT_STATUSES and location:
+                response.read()
+                url = urljoin(url, location)
+                if response.status == 303 and method != 'HEAD':
+                    method = 'GET'
+                continue
+            if response.status >= 400:
+                response.read()
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            return response
+        raise urllib.error.URLError(f"Too many redirects for {url}")
+
+    def fetch(self, url, headers=None, timeout=None):
+        """GET url and return (status, body, headers)"""
+        with self.open('GET', url, headers=headers, timeout=timeout) as response:
+            return response.status, response.read(), response.headers
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide shared HTTPSession"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HTTPSession()
+        return _session
+
+
+def _probe_headers(response, method):
+    """Keep only the headers a probe cares about"""
+    headers = response.headers
+    content_length = headers.get('Content-Length')
+    if response.status == 206:
+        # Range probe: Content-Length is 1, the full size is in Content-Range
+        match = _CONTENT_RANGE_TOTAL.search(headers.get('Content-Range', ''))
+        content_length = match.group(1) if match else None
+    return {
+        'Content-Length': int(content_length) if content_length and content_length.isdigit() else None,
+        'ETag': headers.get('ETag'),
+        'Content-Type': headers.get('Content-Type'),
+        'probeMethod': method,
+    }
+
+
+def probe_url(url, timeout=None, session=None):
+    """Check url without downloading it: HEAD first, then a one-byte range GET.
+
+    Returns (status, headers) where headers holds Content-Length (full size),
+    ETag, Content-Type and the probe method used. A 206 to the range request
+    is reported as 200. HTTP errors are raised as urllib.error.HTTPError.
+    """
+    session = session or get_session()
+    try:
+        with session.open('HEAD', url, timeout=timeout) as response:
+            return response.status, _probe_headers(response, 'HEAD')
+    except urllib.error.HTTPError as e:
+        if e.code not in HEAD_FALLBACK_STATUSES:
+            raise
+
+    with session.open('GET', url, headers={'Range': 'bytes=0-0'}, timeout=timeout) as response:
+        headers = _probe_headers(response, 'RANGE')
+        if response.status == 206:
+            # One byte: cheap to drain, and it keeps the connection reusable
+            response.read()
+            return 200, headers
+        # The server ignored Range; leaving the body unread closes the connection
+        return response.status, headers
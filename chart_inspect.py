@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Look inside published chart packages by streaming each tarball through tarfile"""
+import argparse
+import contextlib
+import gzip
+import sys
+import tarfile
+
+import yaml
+
+import debug_log
+import request_timing
+from chart_http import CHUNK_SIZE
+from fetch_pool import DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST, host_of, run_bounded
+from index_parser import SafeLoader, load_index
+from repo_fetcher import NETWORK, LocalFetcher
+from repo_model import ChartRepository
+from validation_runner import FAIL, PASS, CheckResult
+
+DEFAULT_REPO_URL = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+
+# Chart.yaml and values.yaml are read into memory; refuse anything larger
+MAX_MANIFEST_BYTES = 1024 * 1024
+
+# Chart directories whose members are listed individually in the report
+SECTIONS = ("templates", "crds")
+
+log = debug_log.make_log("chart-inspect")
+
+
+def _read_manifest(tar, member):
+    if member.size > MAX_MANIFEST_BYTES:
+        raise ValueError(f"{member.name} is {member.size} bytes (limit {MAX_MANIFEST_BYTES})")
+    return yaml.load(tar.extractfile(member).read(), Loader=SafeLoader)
+
+
+@contextlib.contextmanager
+def open_chart_archive(stream):
+    """Open a chart .tgz from a binary stream as a sequential (tar "r|") TarFile"""
+    # gzip.GzipFile rather than mode="r|gz": helm writes an FEXTRA gzip header,
+    # and tarfile's stream mode skips that field with its decompressing read()
+    # instead of a raw read, so every helm package fails with "invalid
+    # compressed data" (still the case in CPython 3.11). Keep the GzipFile.
+    with gzip.GzipFile(fileobj=stream, mode="rb") as gz, tarfile.open(fileobj=gz, mode="r|") as tar:
+        yield tar
+
+
+def read_chart_yaml(stream):
+    """Return the parsed top-level Chart.yaml of a chart .tgz, reading no further than needed"""
+    with open_chart_archive(stream) as tar:
+        for member in tar:
+            parts = member.name.lstrip("./").split("/")
+            if member.isfile() and len(parts) == 2 and parts[1] == "Chart.yaml":
+                return _read_manifest(tar, member) or {}
+    raise ValueError("Chart.yaml not found")
+
+
+def inspect_stream(stream, expected_name=None, expected_version=None):
+    """Inspect a chart .tgz read sequentially from a binary stream.
+
+    The archive is read in tar stream mode ("r|"), so only one tar block
+    and the Chart.yaml/values.yaml being parsed are held in memory;
+    templates/, crds/ and every other member are skipped over after their
+    size is recorded. Returns a dict with the embedded chart name and
+    version, whether they match the expected ones, the top-level values.yaml
+    keys and file counts and sizes per section.
+    """
+    report = {
+        "chart": None,
+        "version": None,
+        "valuesKeys": None,
+        "files": 0,
+        "bytes": 0,
+        "sections": {name: {"files": [], "bytes": 0} for name in SECTIONS},
+        "errors": [],
+    }
+    chart_root = None
+    with open_chart_archive(stream) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            root, _, relative = member.name.lstrip("./").partition("/")
+            if chart_root is None:
+                chart_root = root
+            elif root != chart_root:
+                report["errors"].append(f"{member.name} is outside the chart directory {chart_root}/")
+            report["files"] += 1
+            report["bytes"] += member.size
+            section = relative.split("/", 1)[0]
+            if section in report["sections"] and "/" in relative:
+                report["sections"][section]["files"].append((relative, member.size))
+                report["sections"][section]["bytes"] += member.size
+            elif relative == "Chart.yaml":
+                chart = _read_manifest(tar, member) or {}
+                report["chart"] = chart.get("name")
+                report["version"] = chart.get("version")
+            elif relative == "values.yaml":
+                values = _read_manifest(tar, member)
+                report["valuesKeys"] = sorted(values) if isinstance(values, dict) else []
+    # Consume the end-of-archive padding so a network stream can be reused
+    while stream.read(CHUNK_SIZE):
+        pass
+
+    report["chartRoot"] = chart_root
+    if report["chart"] is None:
+        report["errors"].append("Chart.yaml not found")
+    if expected_name is not None and report["chart"] != expected_name:
+        report["errors"].append(f"Chart.yaml name {report['chart']!r} != index name {expected_name!r}")
+    if expected_version is not None and str(report["version"]) != str(expected_version):
+        report["errors"].append(f"Chart.yaml version {report['version']!r} != index version {expected_version!r}")
+    report["matches"] = not report["errors"]
+    return report
+
+
+def inspect_package(url, expected_name=None, expected_version=None, fetcher=NETWORK):
+    """Stream one package from fetcher and inspect it; errors are reported, not raised"""
+    try:
+        with fetcher.open_stream(url) as stream:
+            report = inspect_stream(stream, expected_name, expected_version)
+    except Exception as e:
+        report = {"chart": None, "version": None, "matches": False, "errors": [f"{type(e).__name__}: {e}"]}
+    report["url"] = url
+    report["expectedName"] = expected_name
+    report["expectedVersion"] = expected_version
+    # #region agent log
+    log("H8", "chart_inspect.py:inspect_package", "Package inspected", {
+        "url": url, "matches": report["matches"], "files": report.get("files"),
+        "bytes": report.get("bytes"), "errors": report["errors"],
+    })
+    # #endregion
+    return report
+
+
+def inspect_repository(repository, fetcher=NETWORK, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST):
+    """Inspect the first package URL of every version in a ChartRepository, concurrently.
+
+    At most max_workers archives (per_host per host) are open at once, so
+    memory stays bounded however many versions are published. Reports are
+    returned in index order.
+    """
+    targets = [(version.urls[0], version.name, version.version) for version in repository if version.urls]
+    return run_bounded(
+        targets,
+        lambda target: inspect_package(*target, fetcher=fetcher),
+        max_workers=max_workers,
+        per_host=per_host,
+        key=lambda target: host_of(target[0]),
+    )
+
+
+def format_report(report):
+    """Return the lines printed for one package"""
+    label = f"{report['expectedName']} {report['expectedVersion']}"
+    if not report["matches"]:
+        lines = [f"❌ {label}: {report['url']}"]
+        lines += [f"   - {error}" for error in report["errors"]]
+        return lines
+    sections = ", ".join(
+        f"{name}/ {len(info['files'])} files {info['bytes']} bytes"
+        for name, info in report["sections"].items()
+    )
+    return [f"✓ {label}: {report['files']} files, {report['bytes']} bytes ({sections})"]
+
+
+def check_package_contents(ctx, fetcher=NETWORK):
+    """Every package's embedded Chart.yaml matches its index.yaml entry"""
+    _, index, _ = ctx.resource("index")
+    reports = inspect_repository(ChartRepository.from_index(index.result()), fetcher=fetcher)
+    lines = [line for report in reports for line in format_report(report)]
+    if all(report["matches"] for report in reports):
+        return CheckResult(PASS, lines + [f"✓ H8 PASSED: {len(reports)} packages match their index entries"],
+                           {"packages": reports})
+    return CheckResult(FAIL, lines + ["❌ H8 FAILED: Some packages do not match their index entries"],
+                       {"packages": reports})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", help="inspect packages from this directory instead of the published repository")
+    parser.add_argument("--repo-url", default=DEFAULT_REPO_URL, help="chart repository URL")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="packages inspected at once")
+    args = parser.parse_args(argv)
+
+    fetcher = LocalFetcher(args.docs, args.repo_url) if args.docs else NETWORK
+    repo_url = args.repo_url.rstrip("/")
+    status, content, _, _ = fetcher.fetch(f"{repo_url}/index.yaml")
+    if status != 200:
+        print(f"❌ Could not fetch index.yaml: HTTP {status}")
+        return 1
+    repository = ChartRepository.from_index(load_index(content))
+    print(f"Inspecting {len(repository)} chart versions from {args.docs or repo_url}")
+    reports = inspect_repository(repository, fetcher=fetcher, max_workers=args.workers)
+    for report in reports:
+        for line in format_report(report):
+            print(line)
+    return 0 if all(report["matches"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
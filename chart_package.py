@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Package the chart into a reproducible .tgz, honouring .helmignore and skipping unchanged rebuilds"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import stat
+import sys
+import tarfile
+
+import yaml
+
+from chart_digest import sha256_file
+from index_builder import DEFAULT_CACHE_PATH as DEFAULT_INDEX_CACHE_PATH
+from index_builder import DEFAULT_REPO_URL, REPO_ROOT, write_index
+from index_parser import SafeLoader
+
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, ".cache", "chart-package.json")
+# Scratch output; packages are copied to docs/ by hand when a version is released
+DEFAULT_DESTINATION = os.path.join(REPO_ROOT, "dist")
+CACHE_VERSION = 1
+
+# Rules helm adds to every .helmignore (hidden files under templates/ are never rendered)
+DEFAULT_RULES = ("templates/.?*",)
+
+# Members written first, in this order, as helm does; everything else follows sorted by path
+LEADING_MEMBERS = ("Chart.yaml", "values.yaml")
+
+
+def _translate(glob):
+    """Regex source for one filepath.Match glob: * and ? never cross a "/" """
+    out = []
+    i = 0
+    while i < len(glob):
+        c = glob[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < len(glob):
+            out.append(re.escape(glob[i]))
+            i += 1
+        elif c == "[":
+            end = glob.find("]", i + 1)
+            if end < 0:
+                raise ValueError(f"unterminated character class in {glob!r}")
+            body = glob[i:end]
+            negate = body.startswith("^")
+            body = body[1:] if negate else body
+            out.append("[" + ("^" if negate else "") + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+class HelmIgnore:
+    """The rules of a .helmignore file, compiled into one regex.
+
+    Paths are matched relative to the chart directory with "/" separators,
+    the way helm does: a rule without "/" matches the basename, one with a
+    "/" (or a leading "/") the whole path, and a trailing "/" restricts it to
+    directories. The subject string is "<d|f>:<path>", so the file-type
+    restriction is part of the same regex and one match decides. When the
+    file contains "!" rules they are applied in order instead, a later
+    negated rule re-including what an earlier rule ignored.
+    """
+
+    def __init__(self, lines=(), defaults=DEFAULT_RULES):
+        self.rules = []
+        for line in list(lines) + list(defaults):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "**" in line:
+                raise ValueError(f"double-star (**) syntax is not supported: {line!r}")
+            negate = line.startswith("!")
+            rule = line[1:] if negate else line
+            dir_only = rule.endswith("/")
+            rule = rule.rstrip("/")
+            if "/" in rule:
+                source = _translate(rule.lstrip("/"))
+            else:
+                source = "(?:.*/)?" + _translate(rule)
+            self.rules.append((negate, ("d" if dir_only else "[df]") + ":" + source))
+        if any(negate for negate, _ in self.rules):
+            self._ordered = [(negate, re.compile(source, re.S)) for negate, source in self.rules]
+            self._combined = None
+        else:
+            self._ordered = None
+            self._combined = re.compile("|".join(f"(?:{source})" for _, source in self.rules) or "(?!)", re.S)
+
+    @classmethod
+    def from_chart(cls, chart_dir):
+        try:
+            with open(os.path.join(chart_dir, ".helmignore"), encoding="utf-8") as f:
+                return cls(f.read().splitlines())
+        except FileNotFoundError:
+            return cls()
+
+    def ignored(self, path, is_dir):
+        subject = ("d:" if is_dir else "f:") + path
+        if self._combined is not None:
+            return self._combined.fullmatch(subject) is not None
+        ignored = False
+        for negate, pattern in self._ordered:
+            if pattern.fullmatch(subject):
+                ignored = not negate
+        return ignored
+
+
+def _member_order(path):
+    if path in LEADING_MEMBERS:
+        return (LEADING_MEMBERS.index(path), "")
+    return (len(LEADING_MEMBERS), path)
+
+
+def walk_chart(chart_dir, ignore, exclude=()):
+    """Return the sorted relative paths of the files that go into the package.
+
+    Ignored directories are pruned, so their contents are never listed.
+    exclude holds absolute paths left out regardless of .helmignore (the
+    package being written must not end up inside itself).
+    """
+    chart_dir = os.path.abspath(chart_dir)
+    exclude = {os.path.abspath(path) for path in exclude}
+    files = []
+    for dirpath, dirnames, filenames in os.walk(chart_dir):
+        relative_dir = os.path.relpath(dirpath, chart_dir).replace(os.sep, "/")
+        prefix = "" if relative_dir == "." else relative_dir + "/"
+        dirnames[:] = [name for name in dirnames if not ignore.ignored(prefix + name, True)]
+        for name in filenames:
+            path = prefix + name
+            if not ignore.ignored(path, False) and os.path.join(dirpath, name) not in exclude:
+                files.append(path)
+    return sorted(files, key=_member_order)
+
+
+class BuildCache:
+    """Sidecar cache of input file digests and of the last build of each package.
+
+    File entries are valid while size and mtime are unchanged, the same
+    rule index_builder's DigestCache uses, so an unchanged tree is hashed
+    from stat() calls alone.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.files = {}
+        self.builds = {}
+        self.dirty = False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.files = data.get("files") or {}
+                self.builds = data.get("builds") or {}
+        except (OSError, ValueError):
+            pass
+
+    def file_digest(self, path, st):
+        entry = self.files.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            return entry["digest"]
+        digest, _ = sha256_file(path)
+        self.files[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "digest": digest}
+        self.dirty = True
+        return digest
+
+    def prune(self, paths):
+        for path in set(self.files) - set(paths):
+            del self.files[path]
+            self.dirty = True
+
+    def record_build(self, output, inputs, st, digest):
+        self.builds[output] = {"inputs": inputs, "size": st.st_size, "mtime": st.st_mtime_ns, "digest": digest}
+        self.dirty = True
+
+    def last_build(self, output, inputs):
+        """The recorded build of output if it was made from inputs and the file is still the one written"""
+        build = self.builds.get(output)
+        if not build or build["inputs"] != inputs:
+            return None
+        try:
+            st = os.stat(output)
+        except OSError:
+            return None
+        if st.st_size != build["size"] or st.st_mtime_ns != build["mtime"]:
+            return None
+        return build
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "files": self.files, "builds": self.builds}, f, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def _is_executable(st):
+    return bool(st.st_mode & stat.S_IXUSR)
+
+
+def input_hash(chart_dir, files, cache, mtime):
+    """SHA-256 over everything that ends up in the archive: paths, executable bits, contents and mtime"""
+    digest = hashlib.sha256(f"chart-package/{CACHE_VERSION}\0{mtime}\0".encode())
+    paths = []
+    for relative in files:
+        path = os.path.join(chart_dir, relative)
+        st = os.stat(path)
+        digest.update(f"{relative}\0{int(_is_executable(st))}\0{cache.file_digest(path, st)}\0".encode())
+        paths.append(path)
+    cache.prune(paths)
+    return digest.hexdigest()
+
+
+def _tarinfo(name, size, executable, mtime):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o755 if executable else 0o644
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def write_archive(chart_dir, chart_name, files, output, mtime=0):
+    """Write files under "<chart_name>/" into output as a byte-for-byte reproducible .tgz.
+
+    Members are written in the order given with fixed mtimes, root
+    ownership and 0644/0755 modes only; the gzip header carries no file
+    name and a zero timestamp. The archive is written next to output and
+    renamed into place, so a reader never sees a partial package.
+    """
+    tmp = f"{output}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as raw, \
+            gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0, compresslevel=9) as gz, \
+            tarfile.open(fileobj=gz, mode="w", format=tarfile.PAX_FORMAT) as tar:
+        for relative in files:
+            path = os.path.join(chart_dir, relative)
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                tar.addfile(_tarinfo(f"{chart_name}/{relative}", st.st_size, _is_executable(st), mtime), f)
+    os.replace(tmp, output)
+
+
+def read_chart(chart_dir):
+    with open(os.path.join(chart_dir, "Chart.yaml"), "rb") as f:
+        chart = yaml.load(f, Loader=SafeLoader)
+    if not isinstance(chart, dict) or not chart.get("name") or not chart.get("version"):
+        raise ValueError("Chart.yaml must set name and version")
+    return chart
+
+
+def source_date_epoch():
+    """Timestamp written into every member: $SOURCE_DATE_EPOCH when set, otherwise 0"""
+    value = os.environ.get("SOURCE_DATE_EPOCH")
+    return int(value) if value else 0
+
+
+def package_chart(chart_dir=REPO_ROOT, destination=DEFAULT_DESTINATION, cache_path=DEFAULT_CACHE_PATH, force=False):
+    """Package chart_dir into destination/<name>-<version>.tgz unless the inputs are unchanged.
+
+    Returns (output, built, digest, file_count). The tree is walked once;
+    file contents are only read when their size or mtime changed since the
+    last run, or when the archive has to be written. An existing package
+    with different content is never replaced without force: a chart version
+    that has been published must keep its digest. A rebuild that comes out
+    byte-identical leaves the existing file in place.
+    """
+    chart_dir = os.path.abspath(chart_dir)
+    chart = read_chart(chart_dir)
+    output = os.path.abspath(os.path.join(destination, f"{chart['name']}-{chart['version']}.tgz"))
+    mtime = source_date_epoch()
+    files = walk_chart(chart_dir, HelmIgnore.from_chart(chart_dir), exclude=[output])
+    cache = BuildCache(cache_path)
+    inputs = input_hash(chart_dir, files, cache, mtime)
+    build = None if force else cache.last_build(output, inputs)
+    built = False
+    if build is None:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        candidate = f"{output}.{os.getpid()}.new"
+        write_archive(chart_dir, chart["name"], files, candidate, mtime)
+        digest, _ = sha256_file(candidate)
+        if os.path.exists(output) and sha256_file(output)[0] == digest:
+            os.remove(candidate)
+        elif os.path.exists(output) and not force:
+            os.remove(candidate)
+            cache.save()
+            raise FileExistsError(f"{os.path.relpath(output)} already exists with different content; "
+                                  "bump the version in Chart.yaml or pass --force to replace it")
+        else:
+            os.replace(candidate, output)
+            built = True
+        cache.record_build(output, inputs, os.stat(output), digest)
+    else:
+        digest = build["digest"]
+    cache.save()
+    return output, built, digest, len(files)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chart", default=REPO_ROOT, help="chart directory (default: the repository root)")
+    parser.add_argument("--destination", default=DEFAULT_DESTINATION, help="directory the .tgz is written to (default: dist/)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="build cache file (default: .cache/chart-package.json)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild even when the inputs are unchanged, replacing an existing package")
+    parser.add_argument("--index", action="store_true", help="regenerate <destination>/index.yaml afterwards")
+    parser.add_argument("--repo-url", default=DEFAULT_REPO_URL, help="URL the packages are served from (with --index)")
+    args = parser.parse_args(argv)
+
+    try:
+        output, built, digest, count = package_chart(args.chart, args.destination, args.cache, args.force)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"❌ Could not package {args.chart}: {e}")
+        return 1
+    name = os.path.relpath(output)
+    if built:
+        print(f"✓ Packaged {count} files into {name}")
+    else:
+        print(f"✓ {name} is up to date")
+    print(f"   sha256 {digest}")
+    if args.index:
+        try:
+            changed, _ = write_index(args.destination, args.repo_url, cache_path=DEFAULT_INDEX_CACHE_PATH)
+        except ValueError as e:
+            print(f"❌ Could not regenerate index.yaml: {e}")
+            return 1
+        print("✓ index.yaml updated" if changed else "✓ index.yaml already up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
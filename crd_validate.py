@@ -0,0 +1,778 @@
+#!/usr/bin/env python3
+"""Validate Database and NDBServer custom resources offline against the chart's CRD schemas"""
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import yaml
+
+from index_parser import SafeLoader
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CRD_DIR = os.path.join(REPO_ROOT, "crds")
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, ".cache", "crd-validate.json")
+CACHE_VERSION = 1
+
+# Documents handed to a worker at a time, and batches in flight per worker
+BATCH_DOCUMENTS = 2000
+BATCHES_PER_WORKER = 2
+# Errors reported per document; the rest are counted
+MAX_ERRORS_PER_DOCUMENT = 20
+
+_DOCUMENT_START = re.compile(r"^---(?:\s|$)")
+_DNS_SUBDOMAIN = re.compile(r"^[a-z0-9]([-a-z0-9]*[a-z0-9])?(\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*$")
+
+INT_RANGES = {"int32": (-2 ** 31, 2 ** 31 - 1), "int64": (-2 ** 63, 2 ** 63 - 1)}
+
+
+def _is_base64(value):
+    try:
+        base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    return True
+
+
+# String formats the API server validates; any other format is accepted, as it is there
+FORMATS = {
+    "date-time": re.compile(r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:\d{2})$").match,
+    "date": re.compile(r"^\d{4}-\d{2}-\d{2}$").match,
+    "uuid": re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$").match,
+    "ipv4": re.compile(r"^((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)$").match,
+    "byte": _is_base64,
+}
+
+
+class KubeLoader(SafeLoader):
+    """SafeLoader that reads scalars the way the API server's YAML decoder does.
+
+    PyYAML follows YAML 1.1 and turns 2024-01-01 into a date and 12:00:00
+    into the base-60 integer 43200; Kubernetes keeps both as strings, so a
+    string field holding a time would otherwise be reported as an integer.
+    """
+
+
+def _construct_timestamp(loader, node):
+    return loader.construct_scalar(node)
+
+
+def _construct_int(loader, node):
+    if ":" in node.value:
+        return loader.construct_scalar(node)
+    return yaml.SafeLoader.construct_yaml_int(loader, node)
+
+
+def _construct_float(loader, node):
+    if ":" in node.value:
+        return loader.construct_scalar(node)
+    return yaml.SafeLoader.construct_yaml_float(loader, node)
+
+
+KubeLoader.add_constructor("tag:yaml.org,2002:timestamp", _construct_timestamp)
+KubeLoader.add_constructor("tag:yaml.org,2002:int", _construct_int)
+KubeLoader.add_constructor("tag:yaml.org,2002:float", _construct_float)
+
+
+class _Unsupported(Exception):
+    """Raised by load_documents for YAML it leaves to KubeLoader (merge keys, complex keys)"""
+
+
+_STR_TAG = "tag:yaml.org,2002:str"
+_MERGE_TAG = "tag:yaml.org,2002:merge"
+
+
+def _scalar(event, loader):
+    value = event.value
+    tag = event.tag
+    if tag is None or tag == "!":
+        # Only plain scalars whose first character can start a typed value need the resolver
+        if not event.implicit[0] or value[:1] not in loader.yaml_implicit_resolvers:
+            return value
+        tag = loader.resolve(yaml.ScalarNode, value, event.implicit)
+    if tag == _STR_TAG:
+        return value
+    if tag == _MERGE_TAG:
+        raise _Unsupported("merge key")
+    return loader.construct_object(yaml.ScalarNode(tag, value, event.start_mark, event.end_mark))
+
+
+def _build(event, events, loader, anchors):
+    """Build the Python value starting at event straight from parser events"""
+    kind = type(event)
+    if kind is yaml.ScalarEvent:
+        result = _scalar(event, loader)
+    elif kind is yaml.MappingStartEvent:
+        result = {}
+        if event.anchor:
+            anchors[event.anchor] = result
+        for key_event in events:
+            kind = type(key_event)
+            if kind is yaml.MappingEndEvent:
+                break
+            # Keys and values are mostly unanchored scalars; skip the recursive call for them
+            if kind is yaml.ScalarEvent and key_event.anchor is None:
+                key = _scalar(key_event, loader)
+            else:
+                key = _build(key_event, events, loader, anchors)
+            value_event = next(events)
+            if type(value_event) is yaml.ScalarEvent and value_event.anchor is None:
+                value = _scalar(value_event, loader)
+            else:
+                value = _build(value_event, events, loader, anchors)
+            try:
+                result[key] = value
+            except TypeError:
+                raise _Unsupported("complex key")
+        return result
+    elif kind is yaml.SequenceStartEvent:
+        result = []
+        if event.anchor:
+            anchors[event.anchor] = result
+        for item_event in events:
+            if type(item_event) is yaml.SequenceEndEvent:
+                break
+            result.append(_build(item_event, events, loader, anchors))
+        return result
+    elif kind is yaml.AliasEvent:
+        return anchors[event.anchor]
+    else:
+        raise yaml.YAMLError(f"Unexpected YAML event {event!r}")
+    if event.anchor:
+        anchors[event.anchor] = result
+    return result
+
+
+def load_documents(text, loader=None):
+    """Parse every document in text the way KubeLoader would, without building a node graph.
+
+    The values are built directly from libyaml's events, and the resolver
+    and constructors only run for plain scalars that may be typed (numbers,
+    booleans, nulls), which is most of what makes yaml.load_all slow on
+    large numbers of small manifests. Merge keys and complex keys fall
+    back to yaml.load_all.
+    """
+    loader = loader or KubeLoader("")
+    documents = []
+    events = yaml.parse(text, Loader=SafeLoader)
+    try:
+        for event in events:
+            if type(event) is yaml.DocumentStartEvent:
+                anchors = {}
+                documents.append(_build(next(events), events, loader, anchors))
+    except _Unsupported:
+        return list(yaml.load_all(text, Loader=KubeLoader))
+    return documents
+
+
+# Checkers return None for a valid value, otherwise a list of (message, segments) errors.
+# segments holds the path below the checker in reverse, so parents append their key as
+# the error propagates and valid values never pay for building paths.
+
+def _error(message):
+    return [(message, [])]
+
+
+def _prefix(errors, segment):
+    for _, segments in errors:
+        segments.append(segment)
+    return errors
+
+
+def _type_name(value):
+    if value is None:
+        return "null"
+    return {dict: "object", list: "array", str: "string", bool: "boolean", int: "integer", float: "number"}.get(
+        type(value), type(value).__name__)
+
+
+class Checker:
+    """A compiled schema node: the checks common to every type (enum, nullable)"""
+    __slots__ = ("nullable", "enum", "expected")
+
+    def __init__(self, schema):
+        self.nullable = bool(schema.get("nullable"))
+        enum = schema.get("enum")
+        self.enum = None
+        if enum is not None:
+            try:
+                self.enum = frozenset(enum)
+            except TypeError:
+                self.enum = tuple(enum)
+        self.expected = schema.get("type") or "any"
+
+    def check(self, value):
+        if value is None:
+            return None if self.nullable else _error(f"must be {self.expected}, not null")
+        errors = self.check_value(value)
+        if errors is None and self.enum is not None and value not in self.enum:
+            return _error(f"{value!r} is not one of {sorted(map(str, self.enum))}")
+        return errors
+
+    def check_value(self, value):
+        return None
+
+
+class ObjectChecker(Checker):
+    __slots__ = ("properties", "required", "additional", "closed", "min_properties", "max_properties")
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+        self.properties = {name: compile_child(child) for name, child in (schema.get("properties") or {}).items()}
+        self.required = tuple(schema.get("required") or ())
+        additional = schema.get("additionalProperties")
+        self.additional = compile_child(additional) if isinstance(additional, dict) else None
+        # Unknown fields are rejected by strict field validation (kubectl's default)
+        self.closed = (not schema.get("x-kubernetes-preserve-unknown-fields") and additional is not True
+                       and self.additional is None)
+        self.min_properties = schema.get("minProperties")
+        self.max_properties = schema.get("maxProperties")
+
+    def check_value(self, value):
+        if type(value) is not dict:
+            return _error(f"must be object, not {_type_name(value)}")
+        errors = None
+        properties = self.properties
+        for key, item in value.items():
+            checker = properties.get(key)
+            if checker is None:
+                checker = self.additional
+                if checker is None:
+                    if self.closed:
+                        errors = (errors or []) + _prefix(_error("unknown field"), key)
+                    continue
+            if item is None and not checker.nullable:
+                # The API server prunes nulls of non-nullable fields; only "required" can fail
+                continue
+            child_errors = checker.check(item)
+            if child_errors:
+                errors = (errors or []) + _prefix(child_errors, key)
+        for key in self.required:
+            if value.get(key) is None:
+                errors = (errors or []) + _prefix(_error("required field is missing"), key)
+        if self.min_properties is not None and len(value) < self.min_properties:
+            errors = (errors or []) + _error(f"must have at least {self.min_properties} properties")
+        if self.max_properties is not None and len(value) > self.max_properties:
+            errors = (errors or []) + _error(f"must have at most {self.max_properties} properties")
+        return errors
+
+
+class ArrayChecker(Checker):
+    __slots__ = ("items", "min_items", "max_items", "unique")
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+        items = schema.get("items")
+        self.items = compile_child(items) if isinstance(items, dict) else None
+        self.min_items = schema.get("minItems")
+        self.max_items = schema.get("maxItems")
+        self.unique = bool(schema.get("uniqueItems")) or schema.get("x-kubernetes-list-type") == "set"
+
+    def check_value(self, value):
+        if type(value) is not list:
+            return _error(f"must be array, not {_type_name(value)}")
+        errors = None
+        if self.items is not None:
+            check = self.items.check
+            for position, item in enumerate(value):
+                child_errors = check(item)
+                if child_errors:
+                    errors = (errors or []) + _prefix(child_errors, position)
+        if self.min_items is not None and len(value) < self.min_items:
+            errors = (errors or []) + _error(f"must have at least {self.min_items} items")
+        if self.max_items is not None and len(value) > self.max_items:
+            errors = (errors or []) + _error(f"must have at most {self.max_items} items")
+        if self.unique:
+            seen = [json.dumps(item, sort_keys=True, default=str) for item in value]
+            if len(set(seen)) != len(seen):
+                errors = (errors or []) + _error("items must be unique")
+        return errors
+
+
+class StringChecker(Checker):
+    __slots__ = ("pattern", "format", "format_name", "min_length", "max_length")
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+        pattern = schema.get("pattern")
+        self.pattern = re.compile(pattern).search if pattern else None
+        self.format_name = schema.get("format")
+        self.format = FORMATS.get(self.format_name)
+        self.min_length = schema.get("minLength")
+        self.max_length = schema.get("maxLength")
+
+    def check_value(self, value):
+        if type(value) is not str:
+            return _error(f"must be string, not {_type_name(value)}")
+        if self.pattern is not None and not self.pattern(value):
+            return _error(f"{value!r} does not match {self.pattern.__self__.pattern!r}")
+        if self.format is not None and not self.format(value):
+            return _error(f"{value!r} is not a valid {self.format_name}")
+        if self.min_length is not None and len(value) < self.min_length:
+            return _error(f"must be at least {self.min_length} characters")
+        if self.max_length is not None and len(value) > self.max_length:
+            return _error(f"must be at most {self.max_length} characters")
+        return None
+
+
+class NumberChecker(Checker):
+    __slots__ = ("integer", "minimum", "maximum", "exclusive_minimum", "exclusive_maximum", "multiple_of")
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+        self.integer = schema.get("type") == "integer"
+        self.minimum, self.maximum = schema.get("minimum"), schema.get("maximum")
+        if self.integer and schema.get("format") in INT_RANGES:
+            low, high = INT_RANGES[schema["format"]]
+            self.minimum = low if self.minimum is None else max(low, self.minimum)
+            self.maximum = high if self.maximum is None else min(high, self.maximum)
+        self.exclusive_minimum = bool(schema.get("exclusiveMinimum"))
+        self.exclusive_maximum = bool(schema.get("exclusiveMaximum"))
+        self.multiple_of = schema.get("multipleOf")
+
+    def check_value(self, value):
+        kind = type(value)
+        if kind is not int and (self.integer or kind is not float):
+            return _error(f"must be {self.expected}, not {_type_name(value)}")
+        if self.minimum is not None and (value <= self.minimum if self.exclusive_minimum else value < self.minimum):
+            return _error(f"must be {'>' if self.exclusive_minimum else '>='} {self.minimum}, got {value}")
+        if self.maximum is not None and (value >= self.maximum if self.exclusive_maximum else value > self.maximum):
+            return _error(f"must be {'<' if self.exclusive_maximum else '<='} {self.maximum}, got {value}")
+        if self.multiple_of and value % self.multiple_of:
+            return _error(f"must be a multiple of {self.multiple_of}")
+        return None
+
+
+class BooleanChecker(Checker):
+    __slots__ = ()
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+
+    def check_value(self, value):
+        if type(value) is not bool:
+            return _error(f"must be boolean, not {_type_name(value)}")
+        return None
+
+
+class IntOrStringChecker(Checker):
+    __slots__ = ()
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+        self.expected = "integer or string"
+
+    def check_value(self, value):
+        if type(value) not in (int, str):
+            return _error(f"must be integer or string, not {_type_name(value)}")
+        return None
+
+
+class AnyChecker(Checker):
+    """A node without a type (x-kubernetes-preserve-unknown-fields, embedded values)"""
+    __slots__ = ()
+
+    def __init__(self, schema, compile_child):
+        super().__init__(schema)
+
+
+class CombinedChecker(Checker):
+    """allOf / anyOf / oneOf / not, applied on top of the node's own checker"""
+    __slots__ = ("base", "all_of", "any_of", "one_of", "not_")
+
+    def __init__(self, schema, compile_child, base):
+        super().__init__(schema)
+        self.base = base
+        self.nullable = base.nullable
+        self.all_of = [compile_child(dict(child, **{"x-kubernetes-preserve-unknown-fields": True}))
+                       for child in schema.get("allOf") or ()]
+        self.any_of = [compile_child(dict(child, **{"x-kubernetes-preserve-unknown-fields": True}))
+                       for child in schema.get("anyOf") or ()]
+        self.one_of = [compile_child(dict(child, **{"x-kubernetes-preserve-unknown-fields": True}))
+                       for child in schema.get("oneOf") or ()]
+        not_schema = schema.get("not")
+        self.not_ = compile_child(dict(not_schema, **{"x-kubernetes-preserve-unknown-fields": True})) if not_schema else None
+
+    def check(self, value):
+        errors = self.base.check(value)
+        if errors:
+            return errors
+        for checker in self.all_of:
+            errors = checker.check(value)
+            if errors:
+                return errors
+        if self.any_of and all(checker.check(value) for checker in self.any_of):
+            return _error("must match at least one schema in anyOf")
+        if self.one_of and sum(1 for checker in self.one_of if not checker.check(value)) != 1:
+            return _error("must match exactly one schema in oneOf")
+        if self.not_ is not None and not self.not_.check(value):
+            return _error("must not match the schema in not")
+        return None
+
+
+CHECKERS = {
+    "object": ObjectChecker,
+    "array": ArrayChecker,
+    "string": StringChecker,
+    "integer": NumberChecker,
+    "number": NumberChecker,
+    "boolean": BooleanChecker,
+}
+
+
+def compile_schema(schema):
+    """Compile an openAPIV3Schema into a tree of Checkers, once; checking a value walks only the tree"""
+    if schema.get("x-kubernetes-int-or-string"):
+        checker = IntOrStringChecker(schema, compile_schema)
+    else:
+        kind = CHECKERS.get(schema.get("type"))
+        if kind is None and "properties" in schema:
+            kind = ObjectChecker
+        checker = (kind or AnyChecker)(schema, compile_schema)
+    if any(key in schema for key in ("allOf", "anyOf", "oneOf", "not")):
+        checker = CombinedChecker(schema, compile_schema, checker)
+    return checker
+
+
+class ResourceChecker:
+    """The compiled schema of one served CRD version, plus the checks the API server adds"""
+    __slots__ = ("kind", "api_version", "schema")
+
+    def __init__(self, kind, api_version, schema):
+        self.kind = kind
+        self.api_version = api_version
+        # metadata is ObjectMeta, checked below the way the API server does, not by the CRD schema
+        properties = dict(schema.get("properties") or {})
+        properties["metadata"] = {"type": "object", "x-kubernetes-preserve-unknown-fields": True}
+        self.schema = compile_schema(dict(schema, properties=properties))
+
+    def check(self, doc):
+        errors = self.schema.check(doc) or []
+        metadata = doc.get("metadata")
+        if isinstance(metadata, dict):
+            name = metadata.get("name")
+            if not name and not metadata.get("generateName"):
+                errors += _prefix(_prefix(_error("required field is missing"), "name"), "metadata")
+            elif name and (len(name) > 253 or not _DNS_SUBDOMAIN.match(str(name))):
+                errors += _prefix(_prefix(_error(f"{name!r} is not a valid DNS subdomain name"), "name"), "metadata")
+        elif metadata is None:
+            errors += _prefix(_error("required field is missing"), "metadata")
+        return errors
+
+
+def load_registry(crd_paths):
+    """Compile every served version of the CRDs in crd_paths; returns {(apiVersion, kind): ResourceChecker}"""
+    registry = {}
+    for path in crd_paths:
+        with open(path, "rb") as f:
+            for doc in yaml.load_all(f, Loader=SafeLoader):
+                if not isinstance(doc, dict) or doc.get("kind") != "CustomResourceDefinition":
+                    continue
+                spec = doc.get("spec") or {}
+                kind = (spec.get("names") or {}).get("kind")
+                for version in spec.get("versions") or ():
+                    schema = (version.get("schema") or {}).get("openAPIV3Schema")
+                    if version.get("served", True) and schema:
+                        api_version = f"{spec.get('group')}/{version.get('name')}"
+                        registry[(api_version, kind)] = ResourceChecker(kind, api_version, schema)
+    return registry
+
+
+def crd_files(paths):
+    """Expand directories into the YAML files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith((".yaml", ".yml")))
+        else:
+            files.append(path)
+    return files
+
+
+def format_path(segments):
+    """Render reversed path segments as spec.items[0].name"""
+    path = ""
+    for segment in reversed(segments):
+        if isinstance(segment, int):
+            path += f"[{segment}]"
+        else:
+            path += f".{segment}" if path else str(segment)
+    return path or "(document)"
+
+
+def validate_document(registry, doc):
+    """Return (status, kind/name, [(path, message)]); status is "valid", "invalid" or "skipped" """
+    if not isinstance(doc, dict):
+        return "skipped", None, []
+    checker = registry.get((doc.get("apiVersion"), doc.get("kind")))
+    if checker is None:
+        return "skipped", None, []
+    metadata = doc.get("metadata") if isinstance(doc.get("metadata"), dict) else {}
+    label = f"{doc.get('kind')}/{metadata.get('name') or metadata.get('generateName') or '?'}"
+    errors = checker.check(doc)
+    if not errors:
+        return "valid", label, []
+    return "invalid", label, [(format_path(segments), message) for message, segments in errors]
+
+
+def split_documents(lines):
+    """Yield (first line number, text) for each YAML document in an iterable of lines.
+
+    Documents are cut at "---" lines, which is enough for manifests; a
+    top-level block scalar containing such a line would be split wrongly.
+    """
+    chunk, start = [], 1
+    for number, line in enumerate(lines, 1):
+        if _DOCUMENT_START.match(line):
+            if chunk:
+                yield start, "".join(chunk)
+            # Keep the marker so "--- !tag" or "--- value" still parse
+            chunk, start = [line], number
+        elif line.startswith("...") and line.rstrip() == "...":
+            if chunk:
+                yield start, "".join(chunk)
+            chunk, start = [], number + 1
+        else:
+            chunk.append(line)
+    if chunk:
+        yield start, "".join(chunk)
+
+
+_registry = None
+
+
+def _init_worker(crd_paths):
+    global _registry
+    _registry = load_registry(crd_paths)
+
+
+def validate_batch(path, documents, registry=None):
+    """Parse and validate a batch of (line, text, digest) documents from path; runs in a worker process.
+
+    Returns (counts, failures, passed); passed maps the digest of every
+    document without errors to its (valid, skipped) object counts.
+    """
+    registry = registry if registry is not None else _registry
+    counts = {"valid": 0, "invalid": 0, "skipped": 0, "unparsable": 0}
+    failures = []
+    passed = {}
+    loader = KubeLoader("")
+    for line, text, digest in documents:
+        try:
+            docs = load_documents(text, loader)
+        except yaml.YAMLError as e:
+            counts["unparsable"] += 1
+            failures.append({"path": path, "line": line, "object": None, "errors": [("(document)", f"invalid YAML: {e}")]})
+            continue
+        valid = skipped = 0
+        ok = True
+        for doc in docs:
+            if isinstance(doc, dict) and doc.get("kind") == "List" and isinstance(doc.get("items"), list):
+                docs.extend(doc["items"])
+                continue
+            if doc is None:
+                continue
+            status, label, errors = validate_document(registry, doc)
+            counts[status] += 1
+            valid += status == "valid"
+            skipped += status == "skipped"
+            if errors:
+                ok = False
+                failures.append({"path": path, "line": line, "object": label,
+                                 "errors": errors[:MAX_ERRORS_PER_DOCUMENT], "more": max(0, len(errors) - MAX_ERRORS_PER_DOCUMENT)})
+        if ok:
+            passed[digest] = (valid, skipped)
+    return counts, failures, passed
+
+
+def document_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def schema_fingerprint(crd_paths):
+    """Identify the CRD files (and this validator's version) a cached result was computed with"""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for path in crd_paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Digests of documents that passed validation, for one set of CRD schemas.
+
+    Documents are hashed as they are split, so on a re-run every document
+    that passed last time is counted without being parsed or sent to a
+    worker. Only documents seen in the current run are saved back.
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.passed = {}
+        self.seen = {}
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("schemas") == fingerprint:
+                self.passed = data.get("passed") or {}
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        if not self.path or self.seen == self.passed:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            # json.dumps uses the C encoder; json.dump to a file does not
+            f.write(json.dumps({"version": CACHE_VERSION, "schemas": self.fingerprint, "passed": self.seen}))
+        os.replace(tmp, self.path)
+        self.passed = dict(self.seen)
+
+
+def iter_batches(paths, batch_documents=BATCH_DOCUMENTS, cache=None, counts=None):
+    """Yield (path, [(line, text, digest)]) batches, reading each file as a stream.
+
+    Documents found in cache are counted in counts instead of being yielded.
+    """
+    for path in paths:
+        batch = []
+        with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+            for line, text in split_documents(f):
+                digest = document_digest(text)
+                if cache is not None:
+                    known = cache.passed.get(digest)
+                    if known is not None:
+                        cache.seen[digest] = known
+                        counts["valid"] += known[0]
+                        counts["skipped"] += known[1]
+                        counts["cached"] += known[0]
+                        continue
+                batch.append((line, text, digest))
+                if len(batch) >= batch_documents:
+                    yield path, batch
+                    batch = []
+        if batch:
+            yield path, batch
+
+
+def manifest_files(paths):
+    """Expand directories into the YAML files below them"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                files += [os.path.join(root, name) for name in sorted(names) if name.endswith((".yaml", ".yml"))]
+        else:
+            files.append(path)
+    return files
+
+
+def validate_paths(paths, crd_paths, processes=None, batch_documents=BATCH_DOCUMENTS, cache=None, on_failure=None):
+    """Validate every document in paths across a process pool; returns (counts, failures).
+
+    Files are cut into batches of documents in this process; workers
+    compile the CRD schemas once at start-up and then parse and check each
+    batch. At most BATCHES_PER_WORKER batches per worker are in flight, so
+    memory stays bounded however large the inputs are.
+    """
+    processes = processes or os.cpu_count() or 1
+    counts = {"valid": 0, "invalid": 0, "skipped": 0, "unparsable": 0, "cached": 0}
+    failures = []
+
+    def collect(result):
+        batch_counts, batch_failures, passed = result
+        for key, value in batch_counts.items():
+            counts[key] += value
+        for failure in batch_failures:
+            failures.append(failure)
+            if on_failure is not None:
+                on_failure(failure)
+        if cache is not None:
+            cache.seen.update(passed)
+
+    batches = iter_batches(paths, batch_documents, cache, counts)
+    if processes == 1:
+        registry = load_registry(crd_paths)
+        for path, batch in batches:
+            collect(validate_batch(path, batch, registry))
+        return counts, failures
+
+    # spawn: workers start without the parent's threads, locks or open files
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker,
+                             initargs=(crd_paths,)) as pool:
+        pending = set()
+        for path, batch in batches:
+            if len(pending) >= processes * BATCHES_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+            pending.add(pool.submit(validate_batch, path, batch))
+        for future in pending:
+            collect(future.result())
+    # Batches finish out of order
+    failures.sort(key=lambda failure: (failure["path"], failure["line"]))
+    return counts, failures
+
+
+def format_failure(failure):
+    lines = [f"❌ {failure['path']}:{failure['line']}: {failure['object'] or 'document'}"]
+    lines += [f"   - {path}: {message}" for path, message in failure["errors"]]
+    if failure.get("more"):
+        lines.append(f"   ... and {failure['more']} more")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="manifest files or directories ('-' for stdin)")
+    parser.add_argument("--crd", action="append", help=f"CRD file or directory (default: {DEFAULT_CRD_DIR})")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per CPU; 1 validates in-process)")
+    parser.add_argument("--json", help="also write every failure to this file")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="passed-document cache (default: .cache/crd-validate.json)")
+    parser.add_argument("--no-cache", action="store_true", help="validate every document and do not update the cache")
+    args = parser.parse_args(argv)
+
+    crd_paths = crd_files(args.crd or [DEFAULT_CRD_DIR])
+    registry = load_registry(crd_paths)
+    if not registry:
+        print(f"❌ No CustomResourceDefinition schemas found in {', '.join(crd_paths)}")
+        return 1
+    print(f"Validating against {', '.join(f'{kind} {api_version}' for api_version, kind in sorted(registry))}")
+
+    started = time.perf_counter()
+    cache = None if args.no_cache else ResultCache(args.cache, schema_fingerprint(crd_paths))
+    counts, failures = validate_paths(manifest_files(args.paths), crd_paths, args.processes, cache=cache)
+    if cache is not None:
+        cache.save()
+    elapsed = time.perf_counter() - started
+    for failure in failures:
+        for line in format_failure(failure):
+            print(line)
+    checked = counts["valid"] + counts["invalid"]
+    rate = checked / elapsed if elapsed else 0
+    mark = "❌" if counts["invalid"] or counts["unparsable"] else "✓"
+    print(f"{mark} {checked} resources checked in {elapsed:.2f}s ({rate:,.0f}/s): {counts['invalid']} invalid, "
+          f"{counts['unparsable']} unparsable documents, {counts['skipped']} other objects skipped"
+          + (f", {counts['cached']} unchanged since they last passed" if counts["cached"] else ""))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"counts": counts, "failures": failures}, f, indent=2)
+        print(f"Failures written to {args.json}")
+    return 1 if counts["invalid"] or counts["unparsable"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Buffered JSONL debug log shared by the validator scripts"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_LOG_PATH = os.environ.get(
+    "ARTIFACTHUB_DEBUG_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cursor", "debug.log"),
+)
+SESSION_ID = "debug-session"
+BUFFER_CAPACITY = 65536
+BATCH_SIZE = 512
+FLUSH_INTERVAL = 0.5
+
+
+class DebugLogger:
+    """Append-only JSONL logger with an in-memory ring buffer and a writer thread.
+
+    log() only appends to a bounded deque, so it never touches the file
+    system or waits on a lock held during I/O. A daemon thread drains the
+    buffer in batches every FLUSH_INTERVAL seconds (sooner once BATCH_SIZE
+    entries are pending) through one long-lived file handle. If producers
+    outrun the writer the oldest entries are dropped and counted; the log
+    never blocks. Call flush() before exiting.
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH, capacity=BUFFER_CAPACITY, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._buffer = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def log(self, run_id, hypothesis_id, location, message, data):
+        """Queue one entry; data must not be mutated after the call"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((run_id, hypothesis_id, location, message, data, int(time.time() * 1000)))
+        if self._thread is None:
+            self._start()
+        if len(self._buffer) >= BATCH_SIZE:
+            self._wakeup.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="debug-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                run_id, hypothesis_id, location, message, data, timestamp = self._buffer.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps({
+                "sessionId": SESSION_ID,
+                "runId": run_id,
+                "hypothesisId": hypothesis_id,
+                "location": location,
+                "message": message,
+                "data": data,
+                "timestamp": timestamp
+            }, default=str))
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(json.dumps({
+                "sessionId": SESSION_ID,
+                "runId": "debug-log",
+                "hypothesisId": None,
+                "location": "debug_log.py:DebugLogger",
+                "message": "Log entries dropped (buffer full)",
+                "data": {"dropped": dropped},
+                "timestamp": int(time.time() * 1000)
+            }))
+        return lines
+
+    def flush(self):
+        """Write every buffered entry to the log file"""
+        with self._write_lock:
+            lines = self._drain()
+            if not lines:
+                return
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Unbuffered append: each batch is one write(), so processes sharing the log never interleave lines
+                self._file = open(self.path, "ab", buffering=0)
+            self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def close(self):
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_logger():
+    """Return the process-wide DebugLogger"""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = DebugLogger()
+            atexit.register(_logger.close)
+        return _logger
+
+
+def configure(path):
+    """Point the shared logger at a different file"""
+    logger = get_logger()
+    logger.flush()
+    with logger._write_lock:
+        if logger._file is not None:
+            logger._file.close()
+            logger._file = None
+        logger.path = path
+
+
+def make_log(run_id):
+    """Return a log(hypothesis_id, location, message, data) function for one script"""
+    def log(hypothesis_id, location, message, data):
+        """Write debug log entry"""
+        (_logger or get_logger()).log(run_id, hypothesis_id, location, message, data)
+    return log
+
+
+def flush():
+    """Flush the shared logger; scripts call this before exiting"""
+    if _logger is not None:
+        _logger.flush()
@@ -1,30 +1,35 @@
 #!/usr/bin/env python3
 """Deep debug Artifact Hub repository validation - simulate Artifact Hub behavior"""
-import json
 import sys
-import urllib.request
-import urllib.error
 import yaml
-from datetime import datetime
+from functools import partial
 
-LOG_PATH = "/Users/sasikanth.masini/sample-helm/.cursor/debug.log"
+import debug_log
+import request_timing
+from http_cache import get_cache
+from fetch_pool import BoundedScheduler, host_of
+from index_parser import StreamingIndex, index_entries
+from repo_fetcher import NETWORK
+from repo_model import ChartRepository
+from validation_runner import FAIL, INFO, PASS, SKIP, WARN, Check, CheckResult, run_checks
 
-def log(hypothesis_id, location, message, data):
-    """Write debug log entry"""
-    entry = {
-        "sessionId": "debug-session",
-        "runId": "deep-debug",
-        "hypothesisId": hypothesis_id,
-        "location": location,
-        "message": message,
-        "data": data,
-        "timestamp": int(datetime.now().timestamp() * 1000)
-    }
-    with open(LOG_PATH, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+# Concurrency limits for chart URL validation
+MAX_WORKERS = 16
+PER_HOST_LIMIT = 6
+
+# Download packages and compare them with the digest recorded in index.yaml
+VERIFY_DIGESTS = True
+
+log = debug_log.make_log("deep-debug")
 
-def fetch_and_parse_index(repo_url, hypothesis_id):
-    """Simulate Artifact Hub fetching and parsing index.yaml"""
+def fetch_and_parse_index(repo_url, hypothesis_id, fetcher=NETWORK):
+    """Simulate Artifact Hub fetching and parsing index.yaml
+
+    Returns (ok, index, content_str). index is a StreamingIndex that is
+    still being parsed when this returns, so checks can start on the first
+    entries; index.result() waits for the whole document and raises
+    yaml.YAMLError if it is not valid YAML.
+    """
     index_url = f"{repo_url}/index.yaml"
     
     # #region agent log
@@ -32,40 +37,34 @@ def fetch_and_parse_index(repo_url, hypothesis_id):
     # #endregion
     
     try:
-        req = urllib.request.Request(index_url)
-        req.add_header('User-Agent', 'ArtifactHub/1.0')
-        with urllib.request.urlopen(req, timeout=10) as response:
-            status = response.getcode()
-            content = response.read()
-            headers = dict(response.headers)
+        status, content, headers, not_modified = fetcher.fetch(index_url)
+        headers = dict(headers)
             
+        # #region agent log
+        log(hypothesis_id, "deep_debug_artifacthub.py:fetch_and_parse_index", "index.yaml fetched", {
+            "status": status,
+            "contentLength": len(content),
+            "contentType": headers.get('Content-Type'),
+            "contentEncoding": headers.get('Content-Encoding', 'none'),
+            "notModified": not_modified
+        })
+        # #endregion
+            
+        def parsed(index_data):
+            get_cache().store_parsed(index_url, index_data)
             # #region agent log
-            log(hypothesis_id, "deep_debug_artifacthub.py:fetch_and_parse_index", "index.yaml fetched", {
-                "status": status,
-                "contentLength": len(content),
-                "contentType": headers.get('Content-Type'),
-                "contentEncoding": headers.get('Content-Encoding', 'none')
+            log(hypothesis_id, "deep_debug_artifacthub.py:fetch_and_parse_index", "index.yaml parsed successfully", {
+                "hasEntries": "entries" in index_data if index_data else False,
+                "entryCount": len(index_data.get("entries") or {}) if index_data else 0
             })
             # #endregion
-            
-            # Parse YAML
-            try:
-                content_str = content.decode('utf-8')
-                index_data = yaml.safe_load(content_str)
-                
-                # #region agent log
-                log(hypothesis_id, "deep_debug_artifacthub.py:fetch_and_parse_index", "index.yaml parsed successfully", {
-                    "hasEntries": "entries" in index_data if index_data else False,
-                    "entryCount": len(index_data.get("entries", {})) if index_data else 0
-                })
-                # #endregion
-                
-                return True, index_data, content_str
-            except yaml.YAMLError as e:
-                # #region agent log
-                log(hypothesis_id, "deep_debug_artifacthub.py:fetch_and_parse_index", "YAML parse error", {"error": str(e)})
-                # #endregion
-                return False, None, None
+        
+        # Parse YAML in the background (an unchanged index reuses the parse from the previous run)
+        content_str = content.decode('utf-8')
+        index_data = get_cache().load_parsed(index_url) if not_modified else None
+        if index_data is not None:
+            return True, StreamingIndex.from_parsed(index_data), content_str
+        return True, StreamingIndex(content_str, on_done=parsed), content_str
                 
     except Exception as e:
         # #region agent log
@@ -73,29 +72,27 @@ def fetch_and_parse_index(repo_url, hypothesis_id):
         # #endregion
         return False, None, None
 
-def validate_chart_urls(index_data, repo_url, hypothesis_id):
-    """Validate all chart URLs in index.yaml"""
-    if not index_data or "entries" not in index_data:
-        # #region agent log
-        log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "No entries found", {})
-        # #endregion
-        return False, []
-    
-    chart_urls = []
-    for chart_name, versions in index_data["entries"].items():
-        for version in versions:
-            if "urls" in version:
-                chart_urls.extend(version["urls"])
-    
-    # #region agent log
-    log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "Found chart URLs", {
-        "urls": chart_urls,
-        "count": len(chart_urls)
-    })
-    # #endregion
+def validate_chart_urls(index_data, repo_url, hypothesis_id, max_workers=MAX_WORKERS, per_host=PER_HOST_LIMIT,
+                        verify_digests=VERIFY_DIGESTS, entries=None, fetcher=NETWORK):
+    """Validate all chart URLs in index.yaml concurrently (bounded globally and per host)
+
+    With verify_digests, packages whose entry has a digest are downloaded and
+    checked against it; all other URLs are only probed. entries may be an
+    iterator of (chart_name, version_entry) pairs such as
+    StreamingIndex.entries(), in which case each URL is checked as soon as
+    its entry has been parsed, while the rest of index.yaml is still being
+    parsed. A parse error ends the submissions and fails the validation.
+    """
+    if entries is None:
+        if not index_data or "entries" not in index_data:
+            # #region agent log
+            log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "No entries found", {})
+            # #endregion
+            return False, []
+        entries = index_entries(index_data)
     
-    all_valid = True
-    for chart_url in chart_urls:
+    def check_chart_url(item):
+        chart_url, digest = item
         # #region agent log
         log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "Validating chart URL", {"url": chart_url})
         # #endregion
@@ -108,18 +105,26 @@ def validate_chart_urls(index_data, repo_url, hypothesis_id):
             # #endregion
         
         try:
-            req = urllib.request.Request(chart_url)
-            req.add_header('User-Agent', 'ArtifactHub/1.0')
-            with urllib.request.urlopen(req, timeout=10) as response:
-                status = response.getcode()
+            if verify_digests and digest:
+                result = fetcher.verify_digest(chart_url, digest)
                 # #region agent log
-                log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "Chart URL accessible", {
-                    "url": chart_url,
-                    "status": status
-                })
+                log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls",
+                    "Chart digest verified" if result["matches"] else "Chart digest mismatch", result)
                 # #endregion
-                if status != 200:
-                    all_valid = False
+                return result["matches"]
+            
+            # Only the status matters here, so probe instead of downloading the package
+            status, headers = fetcher.probe(chart_url)
+            # #region agent log
+            log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "Chart URL accessible", {
+                "url": chart_url,
+                "status": status,
+                "contentLength": headers['Content-Length'],
+                "etag": headers['ETag'],
+                "probeMethod": headers['probeMethod']
+            })
+            # #endregion
+            return status == 200
         except Exception as e:
             # #region agent log
             log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "Chart URL not accessible", {
@@ -127,49 +132,99 @@ def validate_chart_urls(index_data, repo_url, hypothesis_id):
                 "error": str(e)
             })
             # #endregion
-            all_valid = False
+            return False
     
-    return all_valid, chart_urls
-
-def main():
-    repo_url = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+    # Relative URLs are served by the repository host, so they share its limit
+    scheduler = BoundedScheduler(
+        check_chart_url,
+        max_workers=max_workers,
+        per_host=per_host,
+        key=lambda item: host_of(item[0] if item[0].startswith('http') else repo_url),
+    )
+    chart_urls = []
+    repository = ChartRepository()
+    malformed = []
+    parse_error = False
+    try:
+        for chart_name, entry in entries:
+            if not isinstance(entry, dict):
+                malformed.append(chart_name)
+                continue
+            version = repository.add(chart_name, entry)
+            for chart_url in version.urls:
+                chart_urls.append(chart_url)
+                scheduler.submit((chart_url, version.digest))
+    except yaml.YAMLError as e:
+        # #region agent log
+        log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "YAML parse error", {"error": str(e)})
+        # #endregion
+        parse_error = True
+    finally:
+        # Checks already submitted are always waited for, even if indexing an entry failed
+        results = scheduler.results()
     
     # #region agent log
-    log("H1", "deep_debug_artifacthub.py:main", "Starting deep debug", {"repoUrl": repo_url})
+    log(hypothesis_id, "deep_debug_artifacthub.py:validate_chart_urls", "Found chart URLs", {
+        "urls": chart_urls,
+        "count": len(chart_urls),
+        "malformedEntries": malformed
+    })
     # #endregion
     
-    # Hypothesis 1: Artifact Hub can fetch and parse index.yaml
+    all_valid = all(results) and not parse_error
+    
+    return all_valid, chart_urls
+
+def check_index_fetched(ctx):
+    """H1: Artifact Hub can fetch and parse index.yaml"""
     # #region agent log
     log("H1", "deep_debug_artifacthub.py:main", "Testing H1: Artifact Hub can fetch index.yaml", {})
     # #endregion
-    success, index_data, content_str = fetch_and_parse_index(repo_url, "H1")
+    success, index, content_str = ctx.resource("index")
+    index_data = None
+    if success:
+        try:
+            index_data = index.result()
+        except yaml.YAMLError as e:
+            # #region agent log
+            log("H1", "deep_debug_artifacthub.py:main", "YAML parse error", {"error": str(e)})
+            # #endregion
     
     if not success or not index_data:
         # #region agent log
         log("H1", "deep_debug_artifacthub.py:main", "H1 REJECTED: Cannot fetch/parse index.yaml", {})
         # #endregion
-        print("❌ H1 FAILED: Cannot fetch or parse index.yaml")
-        return 1
-    else:
-        # #region agent log
-        log("H1", "deep_debug_artifacthub.py:main", "H1 CONFIRMED: index.yaml fetched and parsed", {})
-        # #endregion
-        print("✓ H1 PASSED: index.yaml fetched and parsed successfully")
-    
-    # Hypothesis 2: index.yaml has valid structure (entries, apiVersion, etc.)
+        return CheckResult(FAIL, ["❌ H1 FAILED: Cannot fetch or parse index.yaml"])
+    # #region agent log
+    log("H1", "deep_debug_artifacthub.py:main", "H1 CONFIRMED: index.yaml fetched and parsed", {})
+    # #endregion
+    return CheckResult(PASS, ["✓ H1 PASSED: index.yaml fetched and parsed successfully"])
+
+def check_index_structure(ctx):
+    """H2: index.yaml has valid structure (entries, apiVersion, etc.)"""
     # #region agent log
     log("H2", "deep_debug_artifacthub.py:main", "Testing H2: index.yaml structure validation", {})
     # #endregion
+    success, index, _ = ctx.resource("index")
+    if not success:
+        return CheckResult(SKIP)
     
     required_fields = ["apiVersion", "entries"]
-    missing_fields = [field for field in required_fields if field not in index_data]
+    try:
+        # Both fields are normally known by the first entry; the rest of the parse is not waited for
+        for _ in index.entries():
+            if all(field in index.header for field in required_fields):
+                break
+    except yaml.YAMLError as e:
+        return CheckResult(FAIL, [f"❌ H2 FAILED: index.yaml is not valid YAML: {e}"])
+    header = dict(index.header)
+    missing_fields = [field for field in required_fields if field not in header]
     
     # #region agent log
     log("H2", "deep_debug_artifacthub.py:main", "H2 structure check", {
-        "hasApiVersion": "apiVersion" in index_data,
-        "hasEntries": "entries" in index_data,
-        "missingFields": missing_fields,
-        "entryCount": len(index_data.get("entries", {}))
+        "hasApiVersion": "apiVersion" in header,
+        "hasEntries": "entries" in header,
+        "missingFields": missing_fields
     })
     # #endregion
     
@@ -177,36 +232,44 @@ def main():
         # #region agent log
         log("H2", "deep_debug_artifacthub.py:main", "H2 REJECTED: Missing required fields", {"missing": missing_fields})
         # #endregion
-        print(f"❌ H2 FAILED: Missing required fields: {missing_fields}")
-        return 1
-    else:
-        # #region agent log
-        log("H2", "deep_debug_artifacthub.py:main", "H2 CONFIRMED: All required fields present", {})
-        # #endregion
-        print("✓ H2 PASSED: index.yaml has valid structure")
-    
-    # Hypothesis 3: Chart URLs are accessible (Artifact Hub validates these)
+        return CheckResult(FAIL, [f"❌ H2 FAILED: Missing required fields: {missing_fields}"])
+    # #region agent log
+    log("H2", "deep_debug_artifacthub.py:main", "H2 CONFIRMED: All required fields present", {})
+    # #endregion
+    return CheckResult(PASS, ["✓ H2 PASSED: index.yaml has valid structure"])
+
+def check_chart_urls_accessible(ctx, repo_url, fetcher=NETWORK):
+    """H3: Chart URLs are accessible (Artifact Hub validates these)"""
     # #region agent log
     log("H3", "deep_debug_artifacthub.py:main", "Testing H3: Chart URLs are accessible", {})
     # #endregion
-    all_valid, chart_urls = validate_chart_urls(index_data, repo_url, "H3")
+    success, index, _ = ctx.resource("index")
+    if not success:
+        return CheckResult(SKIP)
+    # URL checks are submitted while index.yaml is still being parsed
+    all_valid, chart_urls = validate_chart_urls(None, repo_url, "H3", entries=index.entries(), fetcher=fetcher)
+    if "entries" not in index.header:
+        # #region agent log
+        log("H3", "deep_debug_artifacthub.py:validate_chart_urls", "No entries found", {})
+        # #endregion
+        all_valid = False
     
     if not all_valid:
         # #region agent log
         log("H3", "deep_debug_artifacthub.py:main", "H3 REJECTED: Some chart URLs not accessible", {})
         # #endregion
-        print("❌ H3 FAILED: Some chart URLs are not accessible")
-        return 1
-    else:
-        # #region agent log
-        log("H3", "deep_debug_artifacthub.py:main", "H3 CONFIRMED: All chart URLs accessible", {})
-        # #endregion
-        print("✓ H3 PASSED: All chart URLs are accessible")
-    
-    # Hypothesis 4: Check if URLs are relative vs absolute (Artifact Hub preference)
+        return CheckResult(FAIL, ["❌ H3 FAILED: Some chart URLs are not accessible"], {"chartUrls": chart_urls})
+    # #region agent log
+    log("H3", "deep_debug_artifacthub.py:main", "H3 CONFIRMED: All chart URLs accessible", {})
+    # #endregion
+    return CheckResult(PASS, ["✓ H3 PASSED: All chart URLs are accessible"], {"chartUrls": chart_urls})
+
+def check_url_format(ctx):
+    """H4: Check if URLs are relative vs absolute (Artifact Hub preference)"""
     # #region agent log
     log("H4", "deep_debug_artifacthub.py:main", "Testing H4: URL format (relative vs absolute)", {})
     # #endregion
+    chart_urls = ctx.result("H3").data["chartUrls"]
     
     has_absolute = any(url.startswith('http') for url in chart_urls)
     has_relative = any(not url.startswith('http') for url in chart_urls)
@@ -223,17 +286,18 @@ def main():
         # #region agent log
         log("H4", "deep_debug_artifacthub.py:main", "H4 WARNING: Using relative URLs", {})
         # #endregion
-        print("⚠️  H4 WARNING: Using relative URLs (Artifact Hub prefers absolute)")
-    else:
-        # #region agent log
-        log("H4", "deep_debug_artifacthub.py:main", "H4 CONFIRMED: Using absolute URLs", {})
-        # #endregion
-        print("✓ H4 PASSED: Using absolute URLs")
-    
-    # Hypothesis 5: Check if repository URL format matches Artifact Hub expectations
+        return CheckResult(WARN, ["⚠️  H4 WARNING: Using relative URLs (Artifact Hub prefers absolute)"])
+    # #region agent log
+    log("H4", "deep_debug_artifacthub.py:main", "H4 CONFIRMED: Using absolute URLs", {})
+    # #endregion
+    return CheckResult(PASS, ["✓ H4 PASSED: Using absolute URLs"])
+
+def check_repository_url(ctx, repo_url):
+    """H5: Check if repository URL format matches Artifact Hub expectations"""
     # #region agent log
     log("H5", "deep_debug_artifacthub.py:main", "Testing H5: Repository URL format", {})
     # #endregion
+    chart_urls = ctx.result("H3").data["chartUrls"]
     
     # Artifact Hub might expect the base URL without trailing slash
     repo_url_clean = repo_url.rstrip('/')
@@ -245,18 +309,42 @@ def main():
     })
     # #endregion
     
-    print(f"\n📋 Summary:")
-    print(f"   Repository URL: {repo_url_clean}")
-    print(f"   Index YAML: {repo_url_clean}/index.yaml")
-    print(f"   Chart URLs: {chart_urls}")
+    return CheckResult(INFO, [
+        f"\n📋 Summary:",
+        f"   Repository URL: {repo_url_clean}",
+        f"   Index YAML: {repo_url_clean}/index.yaml",
+        f"   Chart URLs: {chart_urls}",
+        f"\n💡 If still failing, check:",
+        f"   1. Repository visibility (must be public)",
+        f"   2. GitHub Pages deployment status",
+        f"   3. Exact error message from Artifact Hub",
+        f"   4. Try without trailing slash: {repo_url_clean}",
+    ])
+
+def build_checks(repo_url, fetcher=NETWORK):
+    """Return (checks, resources) for validating the repository at repo_url"""
+    resources = {
+        "index": lambda ctx: fetch_and_parse_index(repo_url, "H1", fetcher=fetcher),
+    }
+    checks = [
+        Check("H1", check_index_fetched, requires=["index"]),
+        # H1-H3 all read the index as it is parsed, so none of them waits for another
+        Check("H2", check_index_structure, requires=["index"]),
+        Check("H3", partial(check_chart_urls_accessible, repo_url=repo_url, fetcher=fetcher), requires=["index"]),
+        Check("H4", check_url_format, after=["H3"]),
+        Check("H5", partial(check_repository_url, repo_url=repo_url), after=["H3"]),
+    ]
+    return checks, resources
+
+def main():
+    repo_url = "https://sasikanthmasini.github.io/NDB-Operator-helm"
     
-    print(f"\n💡 If still failing, check:")
-    print(f"   1. Repository visibility (must be public)")
-    print(f"   2. GitHub Pages deployment status")
-    print(f"   3. Exact error message from Artifact Hub")
-    print(f"   4. Try without trailing slash: {repo_url_clean}")
+    # #region agent log
+    log("H1", "deep_debug_artifacthub.py:main", "Starting deep debug", {"repoUrl": repo_url})
+    # #endregion
     
-    return 0
+    checks, resources = build_checks(repo_url)
+    return run_checks(checks, resources)
 
 if __name__ == "__main__":
     try:
@@ -265,6 +353,9 @@ if __name__ == "__main__":
         print("ERROR: PyYAML not installed. Install with: pip install pyyaml")
         sys.exit(1)
     
-    sys.exit(main())
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
 
 
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Bounded-concurrency scheduler for per-URL checks"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_PER_HOST = 6
+
+
+def host_of(url):
+    """Return the host[:port] key used for per-host limits"""
+    return urlsplit(url).netloc.lower()
+
+
+class BoundedScheduler:
+    """Run worker(item) on a thread pool with a global and a per-host limit.
+
+    Items are queued per host and only dispatched when both limits have room,
+    so a slow host never holds pool threads that other hosts could use.
+    """
+
+    def __init__(self, worker, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST, key=host_of):
+        if max_workers < 1 or per_host < 1:
+            raise ValueError("max_workers and per_host must be at least 1")
+        self.worker = worker
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.key = key
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._active = {}
+        self._running = 0
+        self._submitted = 0
+        self._results = {}
+
+    def submit(self, item):
+        """Queue an item; returns its position in the result list"""
+        host = self.key(item)
+        with self._cond:
+            index = self._submitted
+            self._submitted += 1
+            self._pending.setdefault(host, deque()).append((index, item))
+            self._dispatch_locked()
+        return index
+
+    def _dispatch_locked(self):
+        for host, queue in list(self._pending.items()):
+            while queue and self._running < self.max_workers and self._active.get(host, 0) < self.per_host:
+                index, item = queue.popleft()
+                self._active[host] = self._active.get(host, 0) + 1
+                self._running += 1
+                self._pool.submit(self._run, host, index, item)
+            if not queue:
+                del self._pending[host]
+            if self._running >= self.max_workers:
+                break
+
+    def _run(self, host, index, item):
+        try:
+            outcome = (True, self.worker(item))
+        except BaseException as e:
+            outcome = (False, e)
+        with self._cond:
+            self._results[index] = outcome
+            self._active[host] -= 1
+            self._running -= 1
+            self._dispatch_locked()
+            self._cond.notify_all()
+
+    def results(self):
+        """Wait for every submitted item and return results in submission order"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._results) == self._submitted)
+            outcomes = [self._results[i] for i in range(self._submitted)]
+        self._pool.shutdown(wait=True)
+        for ok, value in outcomes:
+            if not ok:
+                raise value
+        return [value for _, value in outcomes]
+
+
+def run_bounded(items, worker, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST, key=host_of):
+    """Run worker over items concurrently and return results in input order"""
+    scheduler = BoundedScheduler(worker, max_workers=max_workers, per_host=per_host, key=key)
+    for item in items:
+        scheduler.submit(item)
+    return scheduler.results()
@@ -1,179 +1,230 @@
 #!/usr/bin/env python3
 """Final debug - check what Artifact Hub actually sees"""
-import json
 import sys
-import urllib.request
-import urllib.error
-import re
-from datetime import datetime
+from functools import partial
 
-LOG_PATH = "/Users/sasikanth.masini/sample-helm/.cursor/debug.log"
+import debug_log
+import request_timing
+from chart_http import probe_url
+from http_cache import conditional_fetch
+from index_parser import load_index
+from fetch_pool import run_bounded
+from repo_model import ChartRepository
+from validation_runner import INFO, PASS, WARN, Check, CheckResult, run_checks
 
-def log(hypothesis_id, location, message, data):
-    """Write debug log entry"""
-    entry = {
-        "sessionId": "debug-session",
-        "runId": "final-debug",
-        "hypothesisId": hypothesis_id,
-        "location": location,
-        "message": message,
-        "data": data,
-        "timestamp": int(datetime.now().timestamp() * 1000)
-    }
-    with open(LOG_PATH, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+log = debug_log.make_log("final-debug")
 
-def fetch_url(url, hypothesis_id, name):
-    """Fetch URL and return content"""
+def fetch_url(url, hypothesis_id, name, probe=False):
+    """Fetch URL and return content (probe=True returns headers only)"""
     # #region agent log
-    log(hypothesis_id, "final_debug.py:fetch_url", f"Fetching {name}", {"url": url})
+    log(hypothesis_id, "final_debug.py:fetch_url", f"Fetching {name}", {"url": url, "probe": probe})
     # #endregion
     try:
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'ArtifactHub/1.0')
-        with urllib.request.urlopen(req, timeout=10) as response:
-            status = response.getcode()
-            content = response.read()
-            headers = dict(response.headers)
+        if probe:
+            status, headers = probe_url(url)
             # #region agent log
             log(hypothesis_id, "final_debug.py:fetch_url", f"{name} fetched", {
                 "status": status,
-                "contentLength": len(content),
-                "contentType": headers.get('Content-Type'),
-                "firstBytes": content[:100].hex() if len(content) > 100 else content.hex()
+                "contentLength": headers['Content-Length'],
+                "contentType": headers['Content-Type'],
+                "etag": headers['ETag'],
+                "probeMethod": headers['probeMethod']
             })
             # #endregion
-            return True, status, content, headers
+            return True, status, None, headers
+        status, content, headers, not_modified = conditional_fetch(url)
+        headers = dict(headers)
+        # #region agent log
+        log(hypothesis_id, "final_debug.py:fetch_url", f"{name} fetched", {
+            "status": status,
+            "contentLength": len(content),
+            "contentType": headers.get('Content-Type'),
+            "firstBytes": content[:100].hex() if len(content) > 100 else content.hex(),
+            "notModified": not_modified
+        })
+        # #endregion
+        return True, status, content, headers
     except Exception as e:
         # #region agent log
         log(hypothesis_id, "final_debug.py:fetch_url", f"{name} failed", {"error": str(e)})
         # #endregion
         return False, None, None, {}
 
-def main():
-    repo_base = "https://sasikanthmasini.github.io/NDB-Operator-helm"
-    
-    # #region agent log
-    log("H1", "final_debug.py:main", "Starting final debug", {"repoBase": repo_base})
-    # #endregion
-    
-    print("🔍 Testing what Artifact Hub sees...\n")
-    
-    # Hypothesis 1: Test different URL formats Artifact Hub might expect
+def index_url_for(test_url):
+    """Map a candidate repository URL to the index.yaml it implies"""
+    if test_url.endswith('/index.yaml'):
+        return test_url
+    return test_url.rstrip('/') + '/index.yaml'
+
+def check_url_formats(ctx, test_urls):
+    """H1: Test different URL formats Artifact Hub might expect"""
     # #region agent log
     log("H1", "final_debug.py:main", "Testing H1: Different URL formats", {})
     # #endregion
     
-    test_urls = [
-        repo_base,
-        repo_base + "/",
-        repo_base + "/index.yaml",
-    ]
-    
-    print("📋 Testing URL formats:")
+    lines = ["📋 Testing URL formats:"]
+    all_ok = True
     for test_url in test_urls:
         # #region agent log
         log("H1", "final_debug.py:main", "Testing URL format", {"url": test_url})
         # #endregion
-        print(f"   Testing: {test_url}")
+        lines.append(f"   Testing: {test_url}")
         
-        # Try to fetch index.yaml from this base
-        if test_url.endswith('/index.yaml'):
-            index_url = test_url
-        else:
-            index_url = test_url.rstrip('/') + '/index.yaml'
+        # Try to fetch index.yaml from this base (each distinct URL is fetched once per run)
+        index_url = index_url_for(test_url)
+        success, status, content, headers = ctx.resource(index_url)
         
-        success, status, content, headers = fetch_url(index_url, "H1", f"index.yaml from {test_url}")
+        if not (success and status == 200):
+            # #region agent log
+            log("H1", "final_debug.py:main", "H1 REJECTED: URL format failed", {"url": test_url, "status": status})
+            # #endregion
+            lines.append(f"      ✗ index.yaml NOT accessible (Status: {status})")
+            all_ok = False
+            continue
         
-        if success and status == 200:
+        # #region agent log
+        log("H1", "final_debug.py:main", "H1 CONFIRMED: URL format works", {"url": test_url, "indexUrl": index_url})
+        # #endregion
+        lines.append(f"      ✓ index.yaml accessible: {index_url}")
+        
+        # Check content
+        try:
+            content_str = content.decode('utf-8')
+            repository = ctx.once(("repository", index_url), lambda: ChartRepository.from_index(load_index(content_str)))
             # #region agent log
-            log("H1", "final_debug.py:main", "H1 CONFIRMED: URL format works", {"url": test_url, "indexUrl": index_url})
+            log("H1", "final_debug.py:main", "Content decoded", {
+                "contentLength": len(content_str),
+                "hasEntries": bool(repository.by_name),
+                "chartVersions": len(repository)
+            })
             # #endregion
-            print(f"      ✓ index.yaml accessible: {index_url}")
             
-            # Check content
-            try:
-                content_str = content.decode('utf-8')
-                # #region agent log
-                log("H1", "final_debug.py:main", "Content decoded", {"contentLength": len(content_str), "hasEntries": "entries:" in content_str})
-                # #endregion
-                
-                # Extract chart URLs
-                chart_urls = re.findall(r'https?://[^\s"\']+\.tgz', content_str)
-                # #region agent log
-                log("H1", "final_debug.py:main", "Found chart URLs", {"urls": chart_urls})
-                # #endregion
+            # Extract chart URLs
+            chart_urls = [url for url in repository.urls() if url.startswith(('http://', 'https://'))]
+            # #region agent log
+            log("H1", "final_debug.py:main", "Found chart URLs", {"urls": chart_urls})
+            # #endregion
+            
+            # Probe every chart concurrently; URLs shared between variants are probed once
+            probes = run_bounded(
+                chart_urls,
+                lambda url: ctx.once(("probe", url), lambda: fetch_url(url, "H1", f"Chart {url}", probe=True)),
+            )
+            
+            lines.append(f"      ✓ Found {len(chart_urls)} chart URL(s)")
+            for url, (chart_success, chart_status, _, _) in zip(chart_urls, probes):
+                lines.append(f"        - {url}")
                 
-                print(f"      ✓ Found {len(chart_urls)} chart URL(s)")
-                for url in chart_urls:
-                    print(f"        - {url}")
-                    
-                    # Test if chart URL is accessible
-                    chart_success, chart_status, _, _ = fetch_url(url, "H1", f"Chart {url}")
-                    if chart_success and chart_status == 200:
-                        # #region agent log
-                        log("H1", "final_debug.py:main", "Chart URL accessible", {"url": url, "status": chart_status})
-                        # #endregion
-                        print(f"          ✓ Chart accessible")
-                    else:
-                        # #region agent log
-                        log("H1", "final_debug.py:main", "Chart URL NOT accessible", {"url": url, "status": chart_status})
-                        # #endregion
-                        print(f"          ✗ Chart NOT accessible (Status: {chart_status})")
-            except Exception as e:
-                # #region agent log
-                log("H1", "final_debug.py:main", "Failed to decode content", {"error": str(e)})
-                # #endregion
-                print(f"      ✗ Failed to decode content: {e}")
-        else:
+                # Test if chart URL is accessible
+                if chart_success and chart_status == 200:
+                    # #region agent log
+                    log("H1", "final_debug.py:main", "Chart URL accessible", {"url": url, "status": chart_status})
+                    # #endregion
+                    lines.append(f"          ✓ Chart accessible")
+                else:
+                    # #region agent log
+                    log("H1", "final_debug.py:main", "Chart URL NOT accessible", {"url": url, "status": chart_status})
+                    # #endregion
+                    lines.append(f"          ✗ Chart NOT accessible (Status: {chart_status})")
+                    all_ok = False
+        except Exception as e:
             # #region agent log
-            log("H1", "final_debug.py:main", "H1 REJECTED: URL format failed", {"url": test_url, "status": status})
+            log("H1", "final_debug.py:main", "Failed to decode content", {"error": str(e)})
             # #endregion
-            print(f"      ✗ index.yaml NOT accessible (Status: {status})")
+            lines.append(f"      ✗ Failed to decode content: {e}")
+            all_ok = False
     
-    # Hypothesis 2: Check if relative URLs would work better
+    # This script reports findings; it never fails the run
+    return CheckResult(PASS if all_ok else WARN, lines)
+
+def check_key_finding(ctx, repo_base):
+    """H2: Check if relative URLs would work better"""
     # #region agent log
     log("H2", "final_debug.py:main", "Testing H2: Relative vs absolute URLs", {})
     # #endregion
     
-    print(f"\n💡 Key Finding:")
-    print(f"   Artifact Hub expects: {repo_base}")
-    print(f"   It will fetch: {repo_base}/index.yaml")
-    print(f"   Chart URLs in index.yaml should be absolute: https://sasikanthmasini.github.io/NDB-Operator-helm/ndb-operator-0.5.3.tgz")
+    lines = [
+        f"\n💡 Key Finding:",
+        f"   Artifact Hub expects: {repo_base}",
+        f"   It will fetch: {repo_base}/index.yaml",
+        f"   Chart URLs in index.yaml should be absolute: https://sasikanthmasini.github.io/NDB-Operator-helm/ndb-operator-0.5.3.tgz",
+    ]
     
     # #region agent log
     log("H2", "final_debug.py:main", "H2 CONFIRMED: URL format requirements", {"repoUrl": repo_base})
     # #endregion
-    
-    # Hypothesis 3: Check if there's an artifacthub-repo.yml requirement
+    return CheckResult(INFO, lines)
+
+def check_artifacthub_repo_yml(ctx):
+    """H3: Check if there's an artifacthub-repo.yml requirement"""
     # #region agent log
     log("H3", "final_debug.py:main", "Testing H3: artifacthub-repo.yml file", {})
     # #endregion
     
-    artifacthub_yml_url = f"{repo_base}/artifacthub-repo.yml"
-    success, status, _, _ = fetch_url(artifacthub_yml_url, "H3", "artifacthub-repo.yml")
+    success, status, _, _ = ctx.resource("artifacthub-repo.yml")
     
     if not success or status != 200:
         # #region agent log
         log("H3", "final_debug.py:main", "H3 WARNING: artifacthub-repo.yml not found", {"status": status})
         # #endregion
-        print(f"\n⚠️  Note: artifacthub-repo.yml not found (optional but recommended)")
-        print(f"   Create docs/artifacthub-repo.yml for better integration")
-    else:
-        # #region agent log
-        log("H3", "final_debug.py:main", "H3 CONFIRMED: artifacthub-repo.yml exists", {})
-        # #endregion
-        print(f"\n✓ artifacthub-repo.yml exists")
+        return CheckResult(WARN, [
+            f"\n⚠️  Note: artifacthub-repo.yml not found (optional but recommended)",
+            f"   Create docs/artifacthub-repo.yml for better integration",
+        ])
+    # #region agent log
+    log("H3", "final_debug.py:main", "H3 CONFIRMED: artifacthub-repo.yml exists", {})
+    # #endregion
+    return CheckResult(PASS, [f"\n✓ artifacthub-repo.yml exists"])
+
+def action_items(ctx, repo_base):
+    """Closing checklist"""
+    return CheckResult(INFO, [
+        f"\n📝 Action Items:",
+        f"   1. Use this EXACT URL in Artifact Hub: {repo_base}",
+        f"   2. Ensure repository is PUBLIC",
+        f"   3. Verify GitHub Pages is deployed (check Actions tab)",
+        f"   4. If still failing, check the exact error message",
+    ])
+
+def build_checks(repo_base):
+    """Return (checks, resources) for the final debug run against repo_base"""
+    test_urls = [
+        repo_base,
+        repo_base + "/",
+        repo_base + "/index.yaml",
+    ]
+    # The URL variants all resolve to the same index.yaml, so it is one resource
+    index_urls = list(dict.fromkeys(index_url_for(test_url) for test_url in test_urls))
+    resources = {
+        index_url: partial(lambda ctx, url: fetch_url(url, "H1", f"index.yaml from {url}"), url=index_url)
+        for index_url in index_urls
+    }
+    artifacthub_yml_url = f"{repo_base}/artifacthub-repo.yml"
+    resources["artifacthub-repo.yml"] = lambda ctx: fetch_url(artifacthub_yml_url, "H3", "artifacthub-repo.yml", probe=True)
+    checks = [
+        Check("H1", partial(check_url_formats, test_urls=test_urls), requires=index_urls),
+        Check("H2", partial(check_key_finding, repo_base=repo_base)),
+        Check("H3", check_artifacthub_repo_yml, requires=["artifacthub-repo.yml"]),
+        Check("actions", partial(action_items, repo_base=repo_base)),
+    ]
+    return checks, resources
+
+def main():
+    repo_base = "https://sasikanthmasini.github.io/NDB-Operator-helm"
     
-    print(f"\n📝 Action Items:")
-    print(f"   1. Use this EXACT URL in Artifact Hub: {repo_base}")
-    print(f"   2. Ensure repository is PUBLIC")
-    print(f"   3. Verify GitHub Pages is deployed (check Actions tab)")
-    print(f"   4. If still failing, check the exact error message")
+    # #region agent log
+    log("H1", "final_debug.py:main", "Starting final debug", {"repoBase": repo_base})
+    # #endregion
+    
+    print("🔍 Testing what Artifact Hub sees...\n")
     
-    return 0
+    checks, resources = build_checks(repo_base)
+    return run_checks(checks, resources)
 
 if __name__ == "__main__":
-    sys.exit(main())
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
 
 
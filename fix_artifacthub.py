@@ -1,62 +1,56 @@
 #!/usr/bin/env python3
 """Fix Artifact Hub repository configuration"""
-import json
 import sys
-from datetime import datetime
+from functools import partial
 
-LOG_PATH = "/Users/sasikanth.masini/sample-helm/.cursor/debug.log"
+import debug_log
+from validation_runner import INFO, Check, CheckResult, run_checks
 
-def log(hypothesis_id, location, message, data):
-    """Write debug log entry"""
-    entry = {
-        "sessionId": "debug-session",
-        "runId": "fix-artifacthub",
-        "hypothesisId": hypothesis_id,
-        "location": location,
-        "message": message,
-        "data": data,
-        "timestamp": int(datetime.now().timestamp() * 1000)
-    }
-    with open(LOG_PATH, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+log = debug_log.make_log("fix-artifacthub")
 
-def main():
+def check_requirements(ctx):
+    """H1: Artifact Hub requirements and the usual failure causes"""
     # #region agent log
     log("H1", "fix_artifacthub.py:main", "Analyzing Artifact Hub requirements", {})
     # #endregion
     
-    print("Based on Artifact Hub documentation and common issues:\n")
-    print("📋 Key Requirements:")
-    print("   1. Repository URL: Use GitHub Pages URL (not GitHub repo URL)")
-    print("   2. index.yaml: Must be accessible at {repo_url}/index.yaml")
-    print("   3. Chart URLs: Must be absolute URLs")
-    print("   4. Repository: Must be public (or Artifact Hub has access)\n")
+    lines = [
+        "Based on Artifact Hub documentation and common issues:\n",
+        "📋 Key Requirements:",
+        "   1. Repository URL: Use GitHub Pages URL (not GitHub repo URL)",
+        "   2. index.yaml: Must be accessible at {repo_url}/index.yaml",
+        "   3. Chart URLs: Must be absolute URLs",
+        "   4. Repository: Must be public (or Artifact Hub has access)\n",
+    ]
     
     # #region agent log
     log("H1", "fix_artifacthub.py:main", "H1 CONFIRMED: Requirements identified", {})
     # #endregion
     
-    print("🔍 Common Issues:")
-    print("   ❌ Using GitHub repo URL instead of GitHub Pages URL")
-    print("   ❌ Using raw.githubusercontent.com URLs in index.yaml")
-    print("   ❌ Repository is private (Artifact Hub needs public access)")
-    print("   ❌ GitHub Pages not enabled or not deployed\n")
-    
+    lines += [
+        "🔍 Common Issues:",
+        "   ❌ Using GitHub repo URL instead of GitHub Pages URL",
+        "   ❌ Using raw.githubusercontent.com URLs in index.yaml",
+        "   ❌ Repository is private (Artifact Hub needs public access)",
+        "   ❌ GitHub Pages not enabled or not deployed\n",
+    ]
+    return CheckResult(INFO, lines)
+
+def check_url_options(ctx, github_repo_url, github_pages_url):
+    """H2: Repository URL format options"""
     # #region agent log
     log("H2", "fix_artifacthub.py:main", "Testing H2: Repository URL format options", {})
     # #endregion
     
-    github_repo_url = "https://github.com/sasikanthmasini/NDB-Operator-helm"
-    github_pages_url = "https://sasikanthmasini.github.io/NDB-Operator-helm"
-    
-    print("💡 Try these URLs in Artifact Hub (in order):")
-    print(f"   1. GitHub Pages URL: {github_pages_url}")
-    print(f"      → This is the recommended format for GitHub Pages")
-    print(f"      → Artifact Hub will fetch: {github_pages_url}/index.yaml\n")
-    
-    print(f"   2. If #1 fails, try GitHub repo URL: {github_repo_url}")
-    print(f"      → Artifact Hub might auto-detect GitHub Pages")
-    print(f"      → But this is less common\n")
+    lines = [
+        "💡 Try these URLs in Artifact Hub (in order):",
+        f"   1. GitHub Pages URL: {github_pages_url}",
+        f"      → This is the recommended format for GitHub Pages",
+        f"      → Artifact Hub will fetch: {github_pages_url}/index.yaml\n",
+        f"   2. If #1 fails, try GitHub repo URL: {github_repo_url}",
+        f"      → Artifact Hub might auto-detect GitHub Pages",
+        f"      → But this is less common\n",
+    ]
     
     # #region agent log
     log("H2", "fix_artifacthub.py:main", "H2 CONFIRMED: URL options provided", {
@@ -64,27 +58,51 @@ def main():
         "githubRepoUrl": github_repo_url
     })
     # #endregion
-    
-    print("✅ Verification Checklist:")
-    print(f"   ✓ index.yaml accessible: {github_pages_url}/index.yaml")
-    print(f"   ✓ Chart package accessible: {github_pages_url}/ndb-operator-0.5.3.tgz")
-    print(f"   ✓ Chart URLs in index.yaml use GitHub Pages format")
-    print(f"   ✓ Repository is public")
-    print(f"   ✓ GitHub Pages is enabled (Settings → Pages → Source: main branch, /docs folder)\n")
+    return CheckResult(INFO, lines)
+
+def check_verification_checklist(ctx, github_pages_url):
+    """H3: Verification checklist"""
+    lines = [
+        "✅ Verification Checklist:",
+        f"   ✓ index.yaml accessible: {github_pages_url}/index.yaml",
+        f"   ✓ Chart package accessible: {github_pages_url}/ndb-operator-0.5.3.tgz",
+        f"   ✓ Chart URLs in index.yaml use GitHub Pages format",
+        f"   ✓ Repository is public",
+        f"   ✓ GitHub Pages is enabled (Settings → Pages → Source: main branch, /docs folder)\n",
+    ]
     
     # #region agent log
     log("H3", "fix_artifacthub.py:main", "H3 CONFIRMED: Checklist provided", {})
     # #endregion
     
-    print("🚨 If still failing, check:")
-    print("   1. Error message in Artifact Hub - what exactly does it say?")
-    print("   2. Repository visibility - must be public")
-    print("   3. GitHub Pages deployment status - check Actions tab")
-    print("   4. Wait 30 minutes - Artifact Hub processes repos every 30 min\n")
-    
-    return 0
+    lines += [
+        "🚨 If still failing, check:",
+        "   1. Error message in Artifact Hub - what exactly does it say?",
+        "   2. Repository visibility - must be public",
+        "   3. GitHub Pages deployment status - check Actions tab",
+        "   4. Wait 30 minutes - Artifact Hub processes repos every 30 min",
+        "      (python3 watch_repo.py re-validates changed charts as soon as they are published)\n",
+    ]
+    return CheckResult(INFO, lines)
+
+def build_checks():
+    """Return (checks, resources); this script needs no network resources"""
+    github_repo_url = "https://github.com/sasikanthmasini/NDB-Operator-helm"
+    github_pages_url = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+    checks = [
+        Check("H1", check_requirements),
+        Check("H2", partial(check_url_options, github_repo_url=github_repo_url, github_pages_url=github_pages_url)),
+        Check("H3", partial(check_verification_checklist, github_pages_url=github_pages_url)),
+    ]
+    return checks, {}
+
+def main():
+    checks, resources = build_checks()
+    return run_checks(checks, resources)
 
 if __name__ == "__main__":
-    sys.exit(main())
+    status = main()
+    debug_log.flush()
+    sys.exit(status)
 
 
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""On-disk conditional-GET cache for index.yaml and chart packages"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from chart_http import get_session
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ARTIFACTHUB_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ndb-operator-helm", "http"),
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+META_SUFFIX = ".meta"
+BODY_SUFFIX = ".body"
+PARSED_SUFFIX = ".parsed.json"
+
+
+class HTTPCache:
+    """URL-keyed store of response bodies plus their ETag/Last-Modified validators.
+
+    Each entry is <sha256(url)>.meta (JSON) and <sha256(url)>.body, with an
+    optional <sha256(url)>.parsed.json holding a parsed form of the body. The
+    meta file's mtime is the entry's last use; when the directory grows past
+    max_bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def lookup(self, url):
+        """Return the entry's metadata, or None if url is not cached"""
+        try:
+            with open(self._path(url, META_SUFFIX)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(self._path(url, BODY_SUFFIX)):
+            return None
+        return meta
+
+    def validators(self, meta):
+        """Conditional request headers for a cached entry"""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("lastModified"):
+            headers["If-Modified-Since"] = meta["lastModified"]
+        return headers
+
+    def touch(self, url):
+        """Mark an entry as just used"""
+        try:
+            os.utime(self._path(url, META_SUFFIX))
+        except OSError:
+            pass
+
+    def body_path(self, url):
+        return self._path(url, BODY_SUFFIX)
+
+    def read_body(self, url):
+        with open(self._path(url, BODY_SUFFIX), "rb") as f:
+            return f.read()
+
+    def store(self, url, headers, chunks):
+        """Write a 200 response body from an iterable of chunks; returns its size.
+
+        The body is streamed to a temporary file and renamed into place, so
+        readers never see a partial entry and memory use does not grow with
+        the body size.
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            if not etag and not last_modified:
+                # Nothing to revalidate with, so the entry would never be reused
+                os.unlink(tmp_path)
+                return size
+            meta = {
+                "url": url,
+                "etag": etag,
+                "lastModified": last_modified,
+                "contentType": headers.get("Content-Type"),
+                "size": size,
+                "storedAt": int(time.time()),
+            }
+            self._remove(url, PARSED_SUFFIX)
+            os.replace(tmp_path, self._path(url, BODY_SUFFIX))
+            with open(self._path(url, META_SUFFIX), "w") as f:
+                json.dump(meta, f)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.evict()
+        return size
+
+    def update_meta(self, url, **fields):
+        """Record extra fields (e.g. a computed digest) on a cached entry"""
+        meta = self.lookup(url)
+        if meta is None:
+            return
+        meta.update(fields)
+        with open(self._path(url, META_SUFFIX), "w") as f:
+            json.dump(meta, f)
+
+    def load_parsed(self, url):
+        """Return the parsed form stored alongside a cached body, if any"""
+        try:
+            with open(self._path(url, PARSED_SUFFIX)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store_parsed(self, url, data):
+        """Keep a JSON form of the parsed body (skipped if not JSON-serializable)"""
+        if self.lookup(url) is None:
+            return
+        try:
+            payload = json.dumps(data, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return
+        with open(self._path(url, PARSED_SUFFIX), "w") as f:
+            f.write(payload)
+
+    def _remove(self, url, suffix):
+        try:
+            os.unlink(self._path(url, suffix))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = {}
+            total = 0
+            for name in os.listdir(self.directory):
+                if name.endswith(".tmp"):
+                    # Another thread is still writing this body
+                    continue
+                path = os.path.join(self.directory, name)
+                key = name.split(".", 1)[0]
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = entries.setdefault(key, {"size": 0, "used": 0.0, "paths": []})
+                entry["size"] += stat.st_size
+                entry["paths"].append(path)
+                if name.endswith(META_SUFFIX):
+                    entry["used"] = stat.st_mtime
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for entry in sorted(entries.values(), key=lambda e: e["used"]):
+                for path in entry["paths"]:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                total -= entry["size"]
+                if total <= self.max_bytes:
+                    break
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide HTTPCache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HTTPCache()
+        return _cache
+
+
+def conditional_fetch(url, cache=None, session=None, timeout=None):
+    """GET url, revalidating a cached copy with If-None-Match/If-Modified-Since.
+
+    Returns (status, body, headers, not_modified). On a 304 the cached body is
+    returned with status 200 and not_modified=True.
+    """
+    cache = cache or get_cache()
+    session = session or get_session()
+    meta = cache.lookup(url)
+    request_headers = cache.validators(meta) if meta else {}
+    with session.open("GET", url, headers=request_headers, timeout=timeout) as response:
+        if response.status == 304 and meta:
+            response.read()
+            cache.touch(url)
+            headers = dict(response.headers)
+            headers.setdefault("Content-Type", meta.get("contentType"))
+            return 200, cache.read_body(url), headers, True
+        body = response.read()
+        headers = response.headers
+        if response.status == 200:
+            cache.store(url, headers, [body])
+        return response.status, body, headers, False
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Check that the container images the chart and its published packages reference exist and agree"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.error
+from urllib.parse import urlencode
+
+import yaml
+
+import debug_log
+import request_timing
+from chart_http import get_session
+from fetch_pool import run_bounded
+from index_parser import SafeLoader
+from manifest_lint import REPO_ROOT, ManifestCache, load_manifests, load_package_templates
+
+DEFAULT_DOCS = os.path.join(REPO_ROOT, "docs")
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, ".cache", "image-digests.json")
+CACHE_VERSION = 1
+# Tags can be re-pushed; a digest found for one is trusted this long (seconds)
+DEFAULT_MAX_AGE = 60 * 60
+
+DOCKER_HUB = "registry-1.docker.io"
+MANIFEST_TYPES = ", ".join((
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+))
+
+_AUTH_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+log = debug_log.make_log("image-check")
+
+
+class ImageReference:
+    """A parsed [registry/]repository[:tag][@digest] reference, normalized the way docker pull does"""
+    __slots__ = ("text", "registry", "repository", "tag", "digest")
+
+    def __init__(self, text):
+        self.text = text
+        rest, _, self.digest = text.partition("@")
+        self.digest = self.digest or None
+        name, self.tag = rest, None
+        # A ":" after the last "/" separates the tag; one before it is a registry port
+        if ":" in rest.rsplit("/", 1)[-1]:
+            name, self.tag = rest.rsplit(":", 1)
+        first, _, remainder = name.partition("/")
+        if remainder and ("." in first or ":" in first or first == "localhost"):
+            self.registry, self.repository = first, remainder
+        else:
+            self.registry, self.repository = DOCKER_HUB, name
+        if self.registry == "docker.io":
+            self.registry = DOCKER_HUB
+        if self.registry == DOCKER_HUB and "/" not in self.repository:
+            self.repository = f"library/{self.repository}"
+        if self.tag is None and self.digest is None:
+            self.tag = "latest"
+
+    @property
+    def key(self):
+        """The normalized reference, used to deduplicate and as the cache key"""
+        return f"{self.registry}/{self.repository}" + (f"@{self.digest}" if self.digest else f":{self.tag}")
+
+    @property
+    def name(self):
+        """registry/repository without tag or digest"""
+        return f"{self.registry}/{self.repository}"
+
+
+def _collect_images(node, found):
+    """Append every string under an "image" key (containers, initContainers, ...) to found"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "image" and isinstance(value, str):
+                found.append(value)
+            else:
+                _collect_images(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_images(item, found)
+
+
+def values_image(values, chart):
+    """The image values.yaml configures (image.repository:image.tag, tag defaulting to appVersion), or None"""
+    image = (values or {}).get("image")
+    if not isinstance(image, dict) or not image.get("repository"):
+        return None
+    tag = image.get("tag") or (chart or {}).get("appVersion")
+    return f"{image['repository']}:{tag}" if tag else image["repository"]
+
+
+def images_from_chart(chart_dir):
+    """Return a source report for a chart directory: its template images and the values.yaml image"""
+    manifests, _, _, _ = load_manifests(chart_dir, ManifestCache(None))
+    with open(os.path.join(chart_dir, "Chart.yaml"), "rb") as f:
+        chart = yaml.load(f, Loader=SafeLoader) or {}
+    values_path = os.path.join(chart_dir, "values.yaml")
+    values = {}
+    if os.path.isfile(values_path):
+        with open(values_path, "rb") as f:
+            values = yaml.load(f, Loader=SafeLoader) or {}
+    templates = []
+    for manifest in manifests:
+        if manifest.path.startswith("templates/"):
+            found = []
+            _collect_images(manifest.doc, found)
+            templates += [(manifest.path, image) for image in found]
+    return {"source": chart_dir, "chart": chart.get("name"), "version": chart.get("version"),
+            "values": values_image(values, chart), "templates": templates}
+
+
+def images_from_package(source):
+    """Return a source report for a chart package (.tgz path or URL)"""
+    chart, values, templates = load_package_templates(source)
+    images = []
+    for path, docs in templates:
+        found = []
+        _collect_images(docs, found)
+        images += [(path, image) for image in found]
+    return {"source": source, "chart": chart.get("name"), "version": chart.get("version"),
+            "values": values_image(values, chart), "templates": images}
+
+
+def find_mismatches(report):
+    """Compare the values.yaml image with the template images of the same repository"""
+    problems = []
+    if report["values"] is None:
+        return problems
+    expected = ImageReference(report["values"])
+    same_repository = [(path, image) for path, image in report["templates"]
+                       if ImageReference(image).name == expected.name]
+    if not same_repository:
+        problems.append(f"values.yaml sets image {report['values']}, but no template uses {expected.name}")
+    for path, image in same_repository:
+        if ImageReference(image).key != expected.key:
+            problems.append(f"{path} uses {image}, but values.yaml sets {report['values']}")
+    return problems
+
+
+class DigestCache:
+    """Reference -> (digest, checked) for images found in a registry.
+
+    Digest references never change, so they are trusted forever; tags are
+    re-checked once older than max_age. Missing images are not cached, so
+    a freshly pushed image is picked up on the next run.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("images") or {}
+        except (OSError, ValueError):
+            pass
+
+    def get(self, reference, registry_url):
+        entry = self.entries.get(f"{registry_url}|{reference.key}")
+        if entry is None:
+            return None
+        if reference.digest is None and time.time() - entry["checked"] > self.max_age:
+            return None
+        return entry["digest"]
+
+    def put(self, reference, registry_url, digest):
+        with self._lock:
+            self.entries[f"{registry_url}|{reference.key}"] = {"digest": digest, "checked": int(time.time())}
+            self._dirty = True
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "images": self.entries}, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+class RegistryClient:
+    """HEAD /v2/<repository>/manifests/<tag or digest> against Docker Registry v2 endpoints.
+
+    Anonymous bearer tokens are requested when a registry answers 401
+    (Docker Hub, ghcr.io, gcr.io) and reused per realm and scope.
+    registry_url, if set, replaces every image's registry, e.g. a local
+    stand-in registry at http://127.0.0.1:5000.
+    """
+
+    def __init__(self, registry_url=None, cache=None, session=None):
+        self.registry_url = registry_url.rstrip("/") if registry_url else None
+        self.cache = cache
+        self.session = session or get_session()
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def base_url(self, reference):
+        return self.registry_url or f"https://{reference.registry}"
+
+    def _token(self, challenge):
+        params = dict(_AUTH_PARAM.findall(challenge))
+        realm = params.pop("realm", None)
+        if not challenge.lower().startswith("bearer") or not realm:
+            return None
+        key = (realm, params.get("service"), params.get("scope"))
+        with self._lock:
+            if key in self._tokens:
+                return self._tokens[key]
+        _, body, _ = self.session.fetch(f"{realm}?{urlencode(params)}")
+        data = json.loads(body)
+        token = data.get("token") or data.get("access_token")
+        with self._lock:
+            self._tokens[key] = token
+        return token
+
+    def check(self, reference):
+        """Return (status, digest, detail); status is "found", "missing" or "error" """
+        base = self.base_url(reference)
+        if self.cache is not None:
+            digest = self.cache.get(reference, base)
+            if digest is not None:
+                return "found", digest, "cached"
+        url = f"{base}/v2/{reference.repository}/manifests/{reference.digest or reference.tag}"
+        headers = {"Accept": MANIFEST_TYPES}
+        for _ in range(2):
+            try:
+                with self.session.open("HEAD", url, headers=headers) as response:
+                    digest = response.headers.get("Docker-Content-Digest") or reference.digest
+            except urllib.error.HTTPError as e:
+                challenge = e.headers.get("WWW-Authenticate") if e.headers else None
+                if e.code == 401 and challenge and "Authorization" not in headers:
+                    token = self._token(challenge)
+                    if token:
+                        headers["Authorization"] = f"Bearer {token}"
+                        continue
+                if e.code == 404:
+                    return "missing", None, "manifest not found"
+                if e.code in (401, 403):
+                    return "missing", None, f"HTTP {e.code} (private, or the repository does not exist)"
+                return "error", None, f"HTTP {e.code}"
+            except Exception as e:
+                return "error", None, f"{type(e).__name__}: {e}"
+            if reference.digest and digest != reference.digest:
+                return "missing", None, f"registry returned digest {digest}"
+            if self.cache is not None and digest:
+                self.cache.put(reference, base, digest)
+            return "found", digest, "HEAD ok"
+        return "error", None, "authorization failed"
+
+
+def check_images(references, client, max_workers=None):
+    """HEAD every distinct reference concurrently (bounded per registry); returns {key: (status, digest, detail)}"""
+    unique = {}
+    for reference in references:
+        unique.setdefault(reference.key, reference)
+    kwargs = {"max_workers": max_workers} if max_workers else {}
+    results = run_bounded(list(unique.values()), client.check,
+                          key=lambda reference: client.base_url(reference), **kwargs)
+    return dict(zip(unique, results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chart", default=REPO_ROOT, help="chart directory whose templates/ are checked (default: the repository root)")
+    parser.add_argument("--docs", default=DEFAULT_DOCS, help="directory of published chart packages (default: docs/)")
+    parser.add_argument("--package", action="append", default=[], help="additional package (.tgz path or URL) to check")
+    parser.add_argument("--registry-url", help="send every manifest request to this registry instead (e.g. a local stand-in)")
+    parser.add_argument("--offline", action="store_true", help="only compare values.yaml with the templates")
+    parser.add_argument("--workers", type=int, help="concurrent registry requests")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE, help=f"seconds a cached tag digest is trusted (default: {DEFAULT_MAX_AGE})")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="digest cache (default: .cache/image-digests.json)")
+    parser.add_argument("--no-cache", action="store_true", help="query the registry for every image and do not update the cache")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    reports = []
+    try:
+        reports.append(images_from_chart(args.chart))
+    except (OSError, yaml.YAMLError) as e:
+        print(f"❌ Could not read the chart in {args.chart}: {e}")
+        return 1
+    packages = sorted(glob.glob(os.path.join(args.docs, "*.tgz"))) + args.package
+    for source in packages:
+        try:
+            reports.append(images_from_package(source))
+        except Exception as e:
+            print(f"❌ {source}: could not read package: {type(e).__name__}: {e}")
+            reports.append({"source": source, "chart": None, "version": None, "values": None, "templates": [],
+                            "error": f"{type(e).__name__}: {e}"})
+
+    failed = any(report.get("error") for report in reports)
+    references = []
+    for report in reports:
+        report["mismatches"] = find_mismatches(report)
+        failed |= bool(report["mismatches"])
+        references += [ImageReference(image) for _, image in report["templates"]]
+        if report["values"]:
+            references.append(ImageReference(report["values"]))
+
+    results = {}
+    if not args.offline:
+        cache = DigestCache(None if args.no_cache else args.cache, args.max_age)
+        client = RegistryClient(args.registry_url, cache)
+        started = time.perf_counter()
+        results = check_images(references, client, args.workers)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        cache.save()
+        # #region agent log
+        log("I1", "image_check.py:main", "Image references checked", {
+            "references": len(references), "unique": len(results), "elapsedMs": round(elapsed_ms, 1),
+            "missing": [key for key, (status, _, _) in results.items() if status != "found"],
+        })
+        # #endregion
+
+    for report in reports:
+        label = f"{report['chart']} {report['version']}" if report["chart"] else report["source"]
+        print(f"\n📦 {label} ({report['source']})")
+        images = sorted({image for _, image in report["templates"]} | ({report["values"]} if report["values"] else set()))
+        for image in images:
+            where = "values.yaml" if image == report["values"] else ""
+            where = ", ".join(filter(None, [where] + sorted({path for path, i in report["templates"] if i == image})))
+            if args.offline:
+                print(f"   • {image} ({where})")
+                continue
+            status, digest, detail = results[ImageReference(image).key]
+            if status == "found":
+                print(f"   ✓ {image} ({where}) {digest or ''}")
+            else:
+                failed = True
+                print(f"   ❌ {image} ({where}): {detail}")
+        for problem in report["mismatches"]:
+            print(f"   ❌ {problem}")
+        report["images"] = {image: dict(zip(("status", "digest", "detail"), results[ImageReference(image).key]))
+                            for image in images if results}
+
+    print(f"\n{'❌' if failed else '✓'} {len(references)} image references, {len({r.key for r in references})} distinct, "
+          f"in {len(reports)} charts" + ("" if args.offline else f" ({sum(1 for s, _, d in results.values() if d == 'cached')} from cache)"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"Report written to {args.json}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
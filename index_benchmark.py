@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Compare bytes on the wire and client parse time of the index variants on synthetic indexes"""
+import argparse
+import gzip
+import hashlib
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from index_builder import MANIFEST_NAME, build_manifest, dump_index, gzip_bytes, index_variants
+from index_parser import HAS_LIBYAML, load_index
+
+DEFAULT_SIZES = (1000, 5000)
+DEFAULT_VERSIONS_PER_CHART = 250
+DEFAULT_REPEAT = 3
+
+# Repeated verbatim in every version entry, as the maintainer and annotation blocks are in docs/index.yaml
+MAINTAINERS = [{"name": f"maintainer-{i}", "email": f"maintainer-{i}@example.com"} for i in range(7)]
+ANNOTATIONS = {
+    "artifacthub.io/changes": '- kind: fixed\n  description: "Upgraded internal dependencies."\n'
+                              '- kind: security\n  description: "Upgraded kube-rbac-proxy."\n',
+    "artifacthub.io/containsSecurityUpdates": "true",
+    "artifacthub.io/license": "Apache-2.0",
+    "artifacthub.io/maintainers": "".join(f"- name: {m['name']}\n  email: {m['email']}\n" for m in MAINTAINERS),
+    "artifacthub.io/operator": "true",
+    "artifacthub.io/operatorCapabilities": "Basic Install",
+    "artifacthub.io/prerelease": "false",
+}
+
+
+def synthetic_index(versions, per_chart=DEFAULT_VERSIONS_PER_CHART, seed=0):
+    """An index of `versions` version entries shaped like docs/index.yaml, spread over charts of per_chart versions"""
+    rng = random.Random(seed)
+    entries = {}
+    for n in range(versions):
+        name = f"chart-{n // per_chart:04d}"
+        version = f"{n % per_chart // 100}.{n % 100 // 10}.{n % 10}"
+        entries.setdefault(name, []).append({
+            # Copies, so the dumper writes every block out instead of a YAML alias, as helm does
+            "annotations": dict(ANNOTATIONS),
+            "apiVersion": "v2",
+            "appVersion": f"v{version}",
+            "created": f"2026-01-{1 + n % 28:02d}T12:{n % 60:02d}:00.{n % 1000000:06d}Z",
+            "description": "A Helm chart for Nutanix Database Kubernetes Operator",
+            "digest": rng.randbytes(32).hex(),
+            "icon": "https://www.nutanix.com/content/dam/nutanix/global/icons/products/svg/Nutanix-Era-40.svg",
+            "maintainers": [dict(maintainer) for maintainer in MAINTAINERS],
+            "name": name,
+            "type": "application",
+            "urls": [f"https://example.github.io/charts/{name}-{version}.tgz"],
+            "version": version,
+        })
+    return {"apiVersion": "v1", "entries": entries, "generated": "2026-01-01T00:00:00Z"}
+
+
+def _load_json_gzip(body):
+    return json.loads(gzip.decompress(body))
+
+
+# (name, bytes on the wire, client decode): index.json+gzip is index.json served with Content-Encoding: gzip
+CLIENTS = [
+    ("index.yaml", lambda variants: variants["index.yaml"], load_index),
+    ("index.yaml.gz", lambda variants: variants["index.yaml.gz"], lambda body: load_index(gzip.decompress(body))),
+    ("index.json", lambda variants: variants["index.json"], json.loads),
+    ("index.json+gzip", lambda variants: gzip_bytes(variants["index.json"]), _load_json_gzip),
+]
+
+
+def _median_seconds(function, body, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(body)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def bench_size(versions, per_chart=DEFAULT_VERSIONS_PER_CHART, repeat=DEFAULT_REPEAT, seed=0):
+    """Measure every client variant on one synthetic index; returns a result dict"""
+    index_data = synthetic_index(versions, per_chart, seed)
+    index_bytes = dump_index(index_data).encode("utf-8")
+    variants = index_variants(index_bytes, index_data)
+    manifest = json.dumps(build_manifest(variants, index_data), indent=2, sort_keys=True).encode()
+    expected = load_index(index_bytes)
+    results = []
+    for name, wire, decode in CLIENTS:
+        body = wire(variants)
+        results.append({
+            "variant": name,
+            "bytes": len(body),
+            "ratio": round(len(body) / len(index_bytes), 4),
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "parseSeconds": _median_seconds(decode, body, repeat),
+            "ok": decode(body) == expected,
+        })
+    results.append({
+        "variant": f"{MANIFEST_NAME} (unchanged)",
+        "bytes": len(manifest),
+        "ratio": round(len(manifest) / len(index_bytes), 4),
+        "sha256": hashlib.sha256(manifest).hexdigest(),
+        "parseSeconds": _median_seconds(json.loads, manifest, repeat),
+        "ok": json.loads(manifest)["files"]["index.yaml"]["sha256"] == hashlib.sha256(index_bytes).hexdigest(),
+    })
+    return {"versions": versions, "charts": len(index_data["entries"]), "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--versions", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="version entries per synthetic index (default: 1000 5000)")
+    parser.add_argument("--per-chart", type=int, default=DEFAULT_VERSIONS_PER_CHART,
+                        help=f"versions per chart (default: {DEFAULT_VERSIONS_PER_CHART})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="parses per variant; the median is reported")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the digests")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [bench_size(versions, args.per_chart, args.repeat, args.seed) for versions in args.versions]
+    print(f"YAML loader: {'libyaml' if HAS_LIBYAML else 'pure Python'}")
+    for size in sizes:
+        print(f"\n📋 {size['versions']} versions in {size['charts']} charts")
+        for result in size["results"]:
+            mark = "✓" if result["ok"] else "❌"
+            print(f"   {mark} {result['variant']:<34} {result['bytes'] / 1024:10.1f} KiB {result['ratio']:7.1%} "
+                  f"{result['parseSeconds'] * 1000:9.2f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "config": vars(args),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "libyaml": HAS_LIBYAML,
+                "sizes": sizes,
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0 if all(result["ok"] for size in sizes for result in size["results"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Regenerate docs/index.yaml from the packages in docs/, hashing only new or changed archives"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import tarfile
+from datetime import date, datetime
+
+import yaml
+
+from chart_digest import sha256_file
+from chart_inspect import read_chart_yaml
+from index_parser import load_index
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DOCS_DIR = os.path.join(REPO_ROOT, "docs")
+DEFAULT_REPO_URL = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, ".cache", "index-digests.json")
+
+CACHE_VERSION = 1
+
+# Written next to index.yaml from the same content; the manifest lists all three with their digests
+VARIANTS = ("index.yaml", "index.yaml.gz", "index.json")
+MANIFEST_NAME = "index-manifest.json"
+
+_SEMVER = re.compile(r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+
+
+class DigestCache:
+    """Sidecar cache of package digests and Chart.yaml contents.
+
+    Entries are keyed by the package path relative to docs/ and are valid
+    while the file's size and mtime are unchanged, so a rebuild only opens
+    archives that were added or rewritten since the last run.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("entries") or {}
+        except (OSError, ValueError):
+            pass
+
+    def get(self, name, stat):
+        entry = self.entries.get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def put(self, name, stat, digest, chart):
+        self.entries[name] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "digest": digest, "chart": chart}
+        self.dirty = True
+
+    def prune(self, names):
+        """Drop entries for packages that no longer exist"""
+        for name in set(self.entries) - set(names):
+            del self.entries[name]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def _identifier_key(part):
+    return (0, int(part), "") if part.isdigit() else (1, 0, part)
+
+
+def semver_key(version):
+    """Sort key ordering versions as SemVer 2.0 does (pre-releases before the release)"""
+    match = _SEMVER.match(str(version))
+    if not match:
+        return (0, (), 0, (), str(version))
+    major, minor, patch, pre = match.groups()
+    numbers = (int(major), int(minor or 0), int(patch or 0))
+    prerelease = tuple(_identifier_key(part) for part in pre.split(".")) if pre else ()
+    return (1, numbers, 0 if pre else 1, prerelease, str(version))
+
+
+def scan_packages(docs_dir, cache):
+    """Yield (filename, digest, chart_metadata, hashed) for every .tgz in docs_dir.
+
+    Raises ValueError naming the package when it cannot be read or its
+    Chart.yaml is missing or does not set name and version.
+    """
+    names = sorted(name for name in os.listdir(docs_dir) if name.endswith(".tgz"))
+    cache.prune(names)
+    for name in names:
+        path = os.path.join(docs_dir, name)
+        stat = os.stat(path)
+        entry = cache.get(name, stat)
+        if entry is None:
+            try:
+                with open(path, "rb") as f:
+                    chart = read_chart_yaml(f)
+            except (ValueError, OSError, tarfile.TarError, yaml.YAMLError) as e:
+                raise ValueError(f"{name}: {e}") from e
+            if not isinstance(chart, dict) or not chart.get("name") or chart.get("version") is None:
+                raise ValueError(f"{name}: Chart.yaml must set name and version")
+            digest, _ = sha256_file(path)
+            cache.put(name, stat, digest, chart)
+            entry = cache.entries[name]
+            hashed = True
+        else:
+            hashed = False
+        yield name, entry["digest"], entry["chart"], hashed
+
+
+def _now():
+    return datetime.now().astimezone().isoformat()
+
+
+def build_index(docs_dir=DEFAULT_DOCS_DIR, repo_url=DEFAULT_REPO_URL, existing=None, cache=None):
+    """Return (index_data, stats) for the packages in docs_dir.
+
+    Version entries are the package's Chart.yaml plus absolute urls under
+    repo_url, digest and created. created is kept from the existing index
+    when the same chart version is already listed with the same digest, so
+    untouched versions are stable across rebuilds. stats counts packages
+    and how many of them had to be hashed. Raises ValueError when two
+    packages hold the same chart name and version, since helm would
+    publish both entries and clients would pick either digest.
+    """
+    cache = cache or DigestCache()
+    repo_url = repo_url.rstrip("/")
+    previous = {}
+    for chart_name, versions in ((existing or {}).get("entries") or {}).items():
+        for version in versions or []:
+            previous[(chart_name, str(version.get("version")))] = version
+
+    entries = {}
+    seen = {}
+    duplicates = []
+    stats = {"packages": 0, "hashed": 0}
+    for filename, digest, chart, hashed in scan_packages(docs_dir, cache):
+        stats["packages"] += 1
+        stats["hashed"] += hashed
+        key = (chart["name"], str(chart.get("version")))
+        if key in seen:
+            duplicates.append(f"{key[0]} {key[1]} ({seen[key]}, {filename})")
+            continue
+        seen[key] = filename
+        entry = dict(chart)
+        old = previous.get((chart["name"], str(chart.get("version"))))
+        created = old.get("created") if old and old.get("digest") == digest else None
+        entry["created"] = created or _now()
+        entry["digest"] = digest
+        entry["urls"] = [f"{repo_url}/{filename}"]
+        entries.setdefault(chart["name"], []).append(entry)
+
+    if duplicates:
+        raise ValueError("packages with the same chart version: " + "; ".join(duplicates))
+    for versions in entries.values():
+        versions.sort(key=lambda entry: semver_key(entry.get("version")), reverse=True)
+    index_data = {
+        "apiVersion": "v1",
+        "entries": {name: entries[name] for name in sorted(entries)},
+        "generated": _now(),
+    }
+    return index_data, stats
+
+
+class _IndexDumper(yaml.SafeDumper):
+    """Format index.yaml the way helm does: double-quoted strings and literal blocks.
+
+    The pure-Python dumper is used because libyaml's emitter cannot be told
+    to prefer double quotes; the index is small enough that it does not matter.
+    """
+
+    def choose_scalar_style(self):
+        style = super().choose_scalar_style()
+        return '"' if style == "'" else style
+
+
+def _represent_str(dumper, value):
+    style = "|" if "\n" in value else None
+    return dumper.represent_scalar("tag:yaml.org,2002:str", value, style=style)
+
+
+_IndexDumper.add_representer(str, _represent_str)
+
+
+def dump_index(index_data):
+    return yaml.dump(index_data, Dumper=_IndexDumper, sort_keys=True, default_flow_style=False,
+                     allow_unicode=True, width=1 << 16)
+
+
+def _same_entries(a, b):
+    return (a or {}).get("entries") == (b or {}).get("entries")
+
+
+def _json_default(value):
+    # Indexes written by helm have unquoted timestamps, which the YAML loader turns into datetimes
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def canonical_json(index_data):
+    """index.json: sorted keys, no whitespace, UTF-8, so equal indexes give equal bytes"""
+    return json.dumps(index_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                      default=_json_default).encode("utf-8")
+
+
+def gzip_bytes(content):
+    """Compress content with no file name and a zero timestamp in the header, so the output is reproducible"""
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def index_variants(index_bytes, index_data):
+    """Map each name in VARIANTS to its content, all derived from index.yaml"""
+    return {
+        "index.yaml": index_bytes,
+        "index.yaml.gz": gzip_bytes(index_bytes),
+        "index.json": canonical_json(index_data),
+    }
+
+
+def build_manifest(variants, index_data):
+    """The small document a client fetches first to learn whether its copy of the index is current.
+
+    The sha256 of index.yaml identifies the index; the other variants carry
+    their own digest and size so a client can verify whichever it downloads.
+    """
+    return {
+        "apiVersion": "v1",
+        "generated": json.loads(canonical_json(index_data.get("generated"))),
+        "versions": sum(len(versions or []) for versions in (index_data.get("entries") or {}).values()),
+        "files": {name: {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+                  for name, content in variants.items()},
+    }
+
+
+def _write_atomic(path, content):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _variants_current(docs_dir, manifest_path, index_digest):
+    try:
+        with open(manifest_path) as f:
+            files = json.load(f)["files"]
+        if files["index.yaml"]["sha256"] != index_digest:
+            return False
+        return all(os.path.getsize(os.path.join(docs_dir, name)) == files[name]["size"] for name in VARIANTS)
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+def write_variants(output, index_data=None):
+    """Write index.yaml.gz, index.json and index-manifest.json next to output; returns whether they changed.
+
+    Nothing is rewritten while the manifest already records the current
+    index.yaml digest and the variant files are present. The manifest is
+    replaced last, so a client that sees the new digest finds the new
+    variants too.
+    """
+    docs_dir = os.path.dirname(os.path.abspath(output))
+    manifest_path = os.path.join(docs_dir, MANIFEST_NAME)
+    with open(output, "rb") as f:
+        index_bytes = f.read()
+    if _variants_current(docs_dir, manifest_path, hashlib.sha256(index_bytes).hexdigest()):
+        return False
+    if index_data is None:
+        index_data = load_index(index_bytes)
+    variants = index_variants(index_bytes, index_data)
+    for name, content in variants.items():
+        if name != "index.yaml":
+            _write_atomic(os.path.join(docs_dir, name), content)
+    manifest = build_manifest(variants, index_data)
+    _write_atomic(manifest_path, (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode())
+    return True
+
+
+def write_index(docs_dir=DEFAULT_DOCS_DIR, repo_url=DEFAULT_REPO_URL, output=None, cache_path=DEFAULT_CACHE_PATH,
+                variants=True):
+    """Rebuild output (docs/index.yaml by default); returns (changed, stats).
+
+    The file is left untouched when no entry changed, so "generated" only
+    moves when the repository content does. With variants, the compressed
+    and JSON copies and the manifest are refreshed to match it (see
+    write_variants); stats["variants"] records whether they were rewritten.
+    """
+    output = output or os.path.join(docs_dir, "index.yaml")
+    existing = None
+    if os.path.isfile(output):
+        with open(output, "rb") as f:
+            existing = load_index(f)
+    cache = DigestCache(cache_path)
+    index_data, stats = build_index(docs_dir, repo_url, existing, cache)
+    cache.save()
+    changed = not _same_entries(index_data, existing)
+    if changed:
+        _write_atomic(output, dump_index(index_data).encode("utf-8"))
+    else:
+        index_data = existing
+    stats["variants"] = write_variants(output, index_data) if variants else False
+    return changed, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", default=DEFAULT_DOCS_DIR, help="directory holding the packages (default: docs/)")
+    parser.add_argument("--repo-url", default=DEFAULT_REPO_URL, help="URL the directory is served from")
+    parser.add_argument("--output", help="index file to write (default: <docs>/index.yaml)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="digest cache file (default: .cache/index-digests.json)")
+    parser.add_argument("--no-variants", action="store_true",
+                        help=f"do not write index.yaml.gz, index.json and {MANIFEST_NAME}")
+    args = parser.parse_args(argv)
+
+    try:
+        changed, stats = write_index(args.docs, args.repo_url, args.output, args.cache, variants=not args.no_variants)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"Hashed {stats['hashed']} of {stats['packages']} packages")
+    print("✓ index.yaml updated" if changed else "✓ index.yaml already up to date")
+    if stats["variants"]:
+        print(f"✓ index.yaml.gz, index.json and {MANIFEST_NAME} written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Fast and incremental parsing of Helm repository index.yaml files"""
+import threading
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+HAS_LIBYAML = SafeLoader.__name__ == "CSafeLoader"
+
+
+def load_index(content):
+    """Parse a whole index.yaml (str, bytes or file) with libyaml when available"""
+    return yaml.load(content, Loader=SafeLoader)
+
+
+def _compose(event, events, loader, anchors):
+    """Build a node for the value starting at event, consuming events up to its end"""
+    if isinstance(event, yaml.AliasEvent):
+        return anchors[event.anchor]
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+    elif isinstance(event, yaml.SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(yaml.SequenceNode, None, event.implicit)
+        node = yaml.SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor:
+            anchors[event.anchor] = node
+        for item in events:
+            if isinstance(item, yaml.SequenceEndEvent):
+                node.end_mark = item.end_mark
+                break
+            node.value.append(_compose(item, events, loader, anchors))
+        return node
+    elif isinstance(event, yaml.MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(yaml.MappingNode, None, event.implicit)
+        node = yaml.MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor:
+            anchors[event.anchor] = node
+        for key_event in events:
+            if isinstance(key_event, yaml.MappingEndEvent):
+                node.end_mark = key_event.end_mark
+                break
+            key = _compose(key_event, events, loader, anchors)
+            node.value.append((key, _compose(next(events), events, loader, anchors)))
+        return node
+    else:
+        raise yaml.YAMLError(f"Unexpected YAML event {event!r}")
+    if event.anchor:
+        anchors[event.anchor] = node
+    return node
+
+
+def _skip_to(events, end_type):
+    for event in events:
+        if isinstance(event, end_type):
+            return
+
+
+def iter_index_entries(stream, header=None):
+    """Yield (chart_name, version_entry) pairs from index.yaml as they are parsed.
+
+    Only one version entry is materialized at a time, so callers can start
+    working on the first charts while the rest of the document is still being
+    read. Top-level keys other than "entries" (apiVersion, generated, ...) are
+    stored in header if a dict is given; it is complete once the generator is
+    exhausted. "entries" itself is recorded there as None when it is reached,
+    so an index without it can be told apart from one with no charts.
+    """
+    loader = SafeLoader("")
+    events = yaml.parse(stream, Loader=SafeLoader)
+    anchors = {}
+    for event in events:
+        if isinstance(event, yaml.MappingStartEvent):
+            break
+        if isinstance(event, yaml.StreamEndEvent):
+            return
+    else:
+        return
+
+    for key_event in events:
+        if isinstance(key_event, yaml.MappingEndEvent):
+            break
+        key = loader.construct_document(_compose(key_event, events, loader, anchors))
+        value_event = next(events)
+        if key == "entries" and header is not None:
+            header["entries"] = None
+        if key != "entries":
+            value = loader.construct_document(_compose(value_event, events, loader, anchors))
+            if header is not None:
+                header[key] = value
+            continue
+        if not isinstance(value_event, yaml.MappingStartEvent):
+            # "entries:" with no charts (null or a scalar)
+            _compose(value_event, events, loader, anchors)
+            continue
+        for name_event in events:
+            if isinstance(name_event, yaml.MappingEndEvent):
+                break
+            chart_name = loader.construct_document(_compose(name_event, events, loader, anchors))
+            versions_event = next(events)
+            if not isinstance(versions_event, yaml.SequenceStartEvent):
+                _compose(versions_event, events, loader, anchors)
+                continue
+            for item_event in events:
+                if isinstance(item_event, yaml.SequenceEndEvent):
+                    break
+                node = _compose(item_event, events, loader, anchors)
+                yield chart_name, loader.construct_document(node)
+    _skip_to(events, yaml.StreamEndEvent)
+
+
+class StreamingIndex:
+    """An index.yaml parsed on a background thread and shared by several readers.
+
+    Each entries() call yields every (chart_name, version_entry) pair from
+    the start, waiting for the ones not parsed yet, so a URL check and a
+    structure check can both begin on the first entries while the rest of
+    the document is still being parsed. header holds the top-level keys
+    parsed so far (see iter_index_entries). A parse error is raised by
+    entries() and result() once the entries before it have been read.
+    on_done(index_data) is called on the parsing thread after a successful
+    parse.
+    """
+
+    def __init__(self, content=None, on_done=None):
+        self.header = {}
+        self._entries = []
+        self._error = None
+        self._done = False
+        self._cond = threading.Condition()
+        self._on_done = on_done
+        if content is not None:
+            threading.Thread(target=self._parse, args=(content,), daemon=True).start()
+
+    @classmethod
+    def from_parsed(cls, index_data):
+        """A stream over an index that is already parsed (e.g. from a cache); nothing is left to wait for"""
+        stream = cls()
+        index_data = index_data or {}
+        stream.header = {key: None if key == "entries" else value for key, value in index_data.items()}
+        stream._entries = list(index_entries(index_data))
+        stream._done = True
+        return stream
+
+    def _parse(self, content):
+        try:
+            for pair in iter_index_entries(content, self.header):
+                with self._cond:
+                    self._entries.append(pair)
+                    self._cond.notify_all()
+        except yaml.YAMLError as e:
+            self._error = e
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+        if self._error is None and self._on_done is not None:
+            self._on_done(self.result())
+
+    def entries(self):
+        """Yield every (chart_name, version_entry) pair, blocking until each has been parsed"""
+        position = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: position < len(self._entries) or self._done)
+                if position >= len(self._entries):
+                    if self._error is not None:
+                        raise self._error
+                    return
+                pair = self._entries[position]
+            position += 1
+            yield pair
+
+    def result(self):
+        """Wait for the whole document and return it as load_index would"""
+        for _ in self.entries():
+            pass
+        entries = {}
+        for chart_name, entry in self._entries:
+            entries.setdefault(chart_name, []).append(entry)
+        return {key: entries if key == "entries" else value for key, value in self.header.items()}
+
+
+def index_entries(index_data):
+    """Yield (chart_name, version_entry) pairs from an already parsed index"""
+    for chart_name, versions in ((index_data or {}).get("entries") or {}).items():
+        for version in versions or []:
+            yield chart_name, version
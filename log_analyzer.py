@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Summarize the JSONL debug log: step durations, slowest steps and failure rates per run"""
+import argparse
+import heapq
+import json
+import re
+import sys
+from collections import Counter, deque
+
+from debug_log import DEFAULT_LOG_PATH
+from request_timing import LatencyHistogram
+
+# Entries of one runId further apart than this (ms) belong to separate runs
+DEFAULT_RUN_GAP_MS = 60 * 1000
+DEFAULT_TOP = 10
+# Run durations kept per runId for the regression check
+RECENT_RUNS = 20
+# The latest run is flagged when it took this much longer than the median of the previous ones
+REGRESSION_FACTOR = 1.5
+
+TIMING_HYPOTHESIS = "TIMING"
+
+_FAILURE_MESSAGE = re.compile(r"REJECTED|FAILED|NOT accessible|[Ff]ailed|[Ee]rror|mismatch")
+
+
+def is_failure(entry):
+    """Whether an entry records a failed outcome, judged by its message and common data fields"""
+    if _FAILURE_MESSAGE.search(entry.get("message") or ""):
+        return True
+    data = entry.get("data")
+    if not isinstance(data, dict):
+        return False
+    if data.get("error") or data.get("errors"):
+        return True
+    if any(data.get(field) is False for field in ("matches", "ok", "allValid", "allMatch")):
+        return True
+    status = data.get("status")
+    return isinstance(status, int) and status >= 400
+
+
+def iter_entries(lines, stats):
+    """Yield parsed entries from JSONL lines; malformed lines are counted in stats, not raised"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            stats["malformed"] += 1
+            continue
+        if not isinstance(entry, dict) or not isinstance(entry.get("timestamp"), (int, float)):
+            stats["malformed"] += 1
+            continue
+        stats["entries"] += 1
+        yield entry
+
+
+class _Run:
+    """The open run of one runId: only its last entry and running totals are kept"""
+    __slots__ = ("run_id", "started", "last_timestamp", "last_entry", "entries", "hypotheses", "failed")
+
+    def __init__(self, run_id, entry):
+        self.run_id = run_id
+        self.started = self.last_timestamp = entry["timestamp"]
+        self.last_entry = entry
+        self.entries = 0
+        self.hypotheses = set()
+        self.failed = set()
+
+
+class GroupStats:
+    """Entries, failures and runs of one (runId, hypothesisId) group"""
+    __slots__ = ("entries", "failures", "runs", "failed_runs")
+
+    def __init__(self):
+        self.entries = 0
+        self.failures = 0
+        self.runs = 0
+        self.failed_runs = 0
+
+    def to_dict(self):
+        return {
+            "entries": self.entries,
+            "failures": self.failures,
+            "runs": self.runs,
+            "failedRuns": self.failed_runs,
+            "failureRate": round(self.failed_runs / self.runs, 3) if self.runs else None,
+        }
+
+
+class LogAnalyzer:
+    """Fold debug log entries into per-group, per-location and per-host aggregates.
+
+    Entries are consumed one at a time and only the open run of each
+    runId is held, so memory depends on the number of distinct runIds,
+    hypotheses, locations and hosts, never on the size of the log. A run is
+    a stretch of one runId's entries with no gap longer than run_gap_ms.
+    Within a run, the time from one entry to the next is attributed to the
+    earlier entry's location. Entries written concurrently under the same
+    runId (threads, batch workers) interleave, so their step durations are
+    only indicative; request timings come from the TIMING entries instead.
+    """
+
+    def __init__(self, run_gap_ms=DEFAULT_RUN_GAP_MS, top=DEFAULT_TOP, run_ids=None):
+        self.run_gap_ms = run_gap_ms
+        self.top = top
+        self.run_ids = set(run_ids) if run_ids else None
+        self.stats = Counter()
+        self.groups = {}
+        self.locations = {}
+        self.hosts = {}
+        self.run_durations = {}
+        self._open = {}
+        self._slowest = []
+        self._sequence = 0
+
+    def add(self, entry):
+        run_id = entry.get("runId")
+        if self.run_ids is not None and run_id not in self.run_ids:
+            return
+        hypothesis = entry.get("hypothesisId")
+        failed = is_failure(entry)
+        group = self.groups.get((run_id, hypothesis))
+        if group is None:
+            group = self.groups[(run_id, hypothesis)] = GroupStats()
+        group.entries += 1
+        group.failures += failed
+
+        if hypothesis == TIMING_HYPOTHESIS:
+            self._add_timing(entry, failed)
+
+        run = self._open.get(run_id)
+        timestamp = entry["timestamp"]
+        if run is not None and timestamp - run.last_timestamp > self.run_gap_ms:
+            self._close(run)
+            run = None
+        if run is None:
+            run = self._open[run_id] = _Run(run_id, entry)
+        elif hypothesis != TIMING_HYPOTHESIS:
+            # Batched writes from several threads can be slightly out of order
+            self._add_step(run, entry, max(0, timestamp - run.last_timestamp))
+        run.last_timestamp = max(run.last_timestamp, timestamp)
+        run.last_entry = entry
+        run.entries += 1
+        run.hypotheses.add(hypothesis)
+        if failed:
+            run.failed.add(hypothesis)
+
+    def _add_step(self, run, entry, duration):
+        previous = run.last_entry
+        location = previous.get("location")
+        histogram = self.locations.get(location)
+        if histogram is None:
+            histogram = self.locations[location] = LatencyHistogram()
+        histogram.add(duration)
+        step = (duration, self._sequence, {
+            "runId": run.run_id,
+            "runStarted": run.started,
+            "location": location,
+            "from": previous.get("message"),
+            "to": entry.get("message"),
+            "durationMs": duration,
+        })
+        self._sequence += 1
+        # Min-heap of the top slowest steps; the sequence number breaks ties without comparing dicts
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, step)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, step)
+
+    def _add_timing(self, entry, failed):
+        data = entry.get("data") if isinstance(entry.get("data"), dict) else {}
+        host = data.get("host") or "unknown"
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = {"requests": 0, "failures": 0, "total": LatencyHistogram()}
+        stats["requests"] += 1
+        stats["failures"] += failed
+        if isinstance(data.get("total"), (int, float)):
+            stats["total"].add(data["total"])
+
+    def _close(self, run):
+        del self._open[run.run_id]
+        self.stats["runs"] += 1
+        for hypothesis in run.hypotheses:
+            group = self.groups[(run.run_id, hypothesis)]
+            group.runs += 1
+            group.failed_runs += hypothesis in run.failed
+        durations = self.run_durations.get(run.run_id)
+        if durations is None:
+            durations = self.run_durations[run.run_id] = deque(maxlen=RECENT_RUNS)
+        durations.append((run.started, run.last_timestamp - run.started, run.entries))
+
+    def finish(self):
+        """Close the runs still open at the end of the log"""
+        for run in list(self._open.values()):
+            self._close(run)
+
+    def regressions(self):
+        """Runs that took REGRESSION_FACTOR times longer than the median of their runId's earlier runs"""
+        flagged = []
+        for run_id, runs in self.run_durations.items():
+            if len(runs) < 3:
+                continue
+            earlier = sorted(duration for _, duration, _ in list(runs)[:-1])
+            median = earlier[len(earlier) // 2]
+            started, duration, _ = runs[-1]
+            if median and duration > median * REGRESSION_FACTOR:
+                flagged.append({"runId": run_id, "runStarted": started, "durationMs": duration, "medianMs": median})
+        return flagged
+
+    def summary(self):
+        return {
+            "entries": self.stats["entries"],
+            "malformed": self.stats["malformed"],
+            "runs": self.stats["runs"],
+            "groups": {f"{run_id}/{hypothesis}": group.to_dict()
+                       for (run_id, hypothesis), group in sorted(self.groups.items(), key=lambda item: str(item[0]))},
+            "locationsMs": {location: histogram.to_dict() for location, histogram in
+                            sorted(self.locations.items(), key=lambda item: -item[1].sum)},
+            "slowestSteps": [step for _, _, step in sorted(self._slowest, reverse=True)],
+            "hosts": {host: {"requests": stats["requests"], "failures": stats["failures"],
+                             "totalMs": stats["total"].to_dict()} for host, stats in sorted(self.hosts.items())},
+            "runDurations": {run_id: [{"started": started, "durationMs": duration, "entries": entries}
+                                      for started, duration, entries in runs]
+                             for run_id, runs in sorted(self.run_durations.items())},
+            "regressions": self.regressions(),
+        }
+
+
+def analyze(lines, run_gap_ms=DEFAULT_RUN_GAP_MS, top=DEFAULT_TOP, run_ids=None):
+    """Stream JSONL lines through a LogAnalyzer and return its summary"""
+    analyzer = LogAnalyzer(run_gap_ms, top, run_ids)
+    for entry in iter_entries(lines, analyzer.stats):
+        analyzer.add(entry)
+    analyzer.finish()
+    return analyzer.summary()
+
+
+def format_summary(summary, top=DEFAULT_TOP):
+    """Return the lines of the text report"""
+    lines = [f"📋 {summary['entries']} entries in {summary['runs']} runs"
+             + (f" ({summary['malformed']} malformed lines skipped)" if summary["malformed"] else "")]
+    lines.append("\nFailure rate per run id / hypothesis (runs with a failure / runs):")
+    for name, group in summary["groups"].items():
+        mark = "❌" if group["failedRuns"] else "✓"
+        lines.append(f"   {mark} {name}: {group['failedRuns']}/{group['runs']} runs failed, "
+                     f"{group['failures']} of {group['entries']} entries")
+    if summary["locationsMs"]:
+        lines.append("\n⏱  Time until the next entry, per location (ms, p50/p95/max):")
+        for location, hist in list(summary["locationsMs"].items())[:top]:
+            lines.append(f"   {location:<48} {hist['p50']:9.1f} {hist['p95']:9.1f} {hist['max']:9.1f}  (n={hist['count']})")
+    if summary["slowestSteps"]:
+        lines.append("\n🐢 Slowest steps:")
+        for step in summary["slowestSteps"]:
+            lines.append(f"   {step['durationMs']:8.0f} ms  {step['runId']} {step['location']}: "
+                         f"{step['from']!r} -> {step['to']!r}")
+    if summary["hosts"]:
+        lines.append("\n🌐 HTTP requests per host (total ms, p50/p95/p99):")
+        for host, stats in summary["hosts"].items():
+            hist = stats["totalMs"]
+            if hist["count"]:
+                timing = f"{hist['p50']:.1f} / {hist['p95']:.1f} / {hist['p99']:.1f}"
+            else:
+                timing = "no timings"
+            lines.append(f"   {host}: {stats['requests']} requests, {stats['failures']} failed, {timing}")
+    for regression in summary["regressions"]:
+        lines.append(f"\n⚠️  {regression['runId']}: latest run took {regression['durationMs']} ms "
+                     f"(median of earlier runs {regression['medianMs']} ms)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("log", nargs="?", default=DEFAULT_LOG_PATH, help="JSONL debug log ('-' for stdin)")
+    parser.add_argument("--run-id", action="append", help="only analyze these run ids")
+    parser.add_argument("--run-gap", type=float, default=DEFAULT_RUN_GAP_MS / 1000,
+                        help=f"seconds of silence that end a run (default: {DEFAULT_RUN_GAP_MS // 1000})")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="slowest steps and locations to show")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.log == "-":
+            summary = analyze(sys.stdin, args.run_gap * 1000, args.top, args.run_id)
+        else:
+            with open(args.log, encoding="utf-8", errors="replace") as f:
+                summary = analyze(f, args.run_gap * 1000, args.top, args.run_id)
+    except OSError as e:
+        print(f"❌ Could not read {args.log}: {e}")
+        return 1
+    for line in format_summary(summary, args.top):
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
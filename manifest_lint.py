@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""Lint the chart's templates/ and crds/ manifests and cross-check their references"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import yaml
+
+from index_parser import SafeLoader
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, ".cache", "manifest-lint.json")
+CACHE_VERSION = 1
+
+MANIFEST_DIRS = ("crds", "templates")
+RELEASE = {"Name": "release-name", "Namespace": "default", "Service": "Helm"}
+
+ERROR = "error"
+WARNING = "warning"
+
+CLUSTER_SCOPED = {
+    "ClusterRole", "ClusterRoleBinding", "CustomResourceDefinition", "MutatingWebhookConfiguration",
+    "ValidatingWebhookConfiguration", "Namespace", "ClusterIssuer", "PersistentVolume", "StorageClass",
+    "PriorityClass", "APIService",
+}
+BUILTIN_CLUSTER_ROLES = {"cluster-admin", "admin", "edit", "view"}
+RBAC_VERBS = {"get", "list", "watch", "create", "update", "patch", "delete", "deletecollection",
+              "impersonate", "bind", "escalate", "use", "approve", "sign", "*"}
+
+_ACTION = re.compile(r"{{-?\s*(.*?)\s*-?}}", re.S)
+_REFERENCE = re.compile(r"^\.(Values|Chart|Release)((?:\.[A-Za-z0-9_]+)+)\s*(\|\s*quote)?$")
+
+
+class Manifest:
+    """One parsed Kubernetes object and the file it came from"""
+    __slots__ = ("path", "kind", "name", "namespace", "doc")
+
+    def __init__(self, path, doc):
+        self.path = path
+        self.doc = doc
+        self.kind = doc.get("kind")
+        metadata = doc.get("metadata") or {}
+        self.name = metadata.get("name")
+        self.namespace = None if self.kind in CLUSTER_SCOPED else metadata.get("namespace") or RELEASE["Namespace"]
+
+    @property
+    def key(self):
+        return (self.kind, self.namespace, self.name)
+
+    def __repr__(self):
+        return f"{self.kind}/{self.name}"
+
+
+def render(text, context):
+    """Substitute simple {{ .Values.x }} / .Chart / .Release references.
+
+    Returns (rendered, problems). Anything more involved (if, range,
+    include, toYaml of a mapping) is left in place and reported, since
+    only helm can render it faithfully.
+    """
+    problems = []
+
+    def substitute(match):
+        reference = _REFERENCE.match(match.group(1))
+        if not reference:
+            problems.append(f"unsupported template action {match.group(0)!r}")
+            return match.group(0)
+        value = context.get(reference.group(1), {})
+        for part in reference.group(2).strip(".").split("."):
+            if not isinstance(value, dict) or part not in value:
+                problems.append(f"{match.group(0)!r} is not set in values.yaml")
+                return ""
+            value = value[part]
+        if isinstance(value, (dict, list)):
+            problems.append(f"{match.group(0)!r} is a {type(value).__name__}; it needs toYaml")
+            return match.group(0)
+        if reference.group(3):
+            return json.dumps("" if value is None else str(value))
+        return "" if value is None else str(value).lower() if isinstance(value, bool) else str(value)
+
+    return _ACTION.sub(substitute, text), problems
+
+
+class ManifestCache:
+    """Parsed documents keyed by the SHA-256 of the rendered file, plus the last run's file hashes"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.documents = {}
+        self.files = {}
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.documents = data.get("documents") or {}
+                self.files = data.get("files") or {}
+        except (OSError, ValueError):
+            pass
+
+    def save(self, files):
+        """Keep the documents of the current files only and remember their hashes"""
+        if not self.path or files == self.files:
+            return
+        documents = {digest: self.documents[digest] for digest in files.values() if digest in self.documents}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            # json.dumps uses the C encoder; json.dump to a file does not
+            f.write(json.dumps({"version": CACHE_VERSION, "files": files, "documents": documents}))
+        os.replace(tmp, self.path)
+        self.files = dict(files)
+
+
+def _load_yaml(path):
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def render_context(chart, values):
+    """The .Values / .Chart / .Release context render() substitutes from"""
+    chart = chart or {}
+    return {
+        "Values": values or {},
+        "Chart": {"Name": chart.get("name"), "Version": chart.get("version"), "AppVersion": chart.get("appVersion")},
+        "Release": RELEASE,
+    }
+
+
+def load_manifests(chart_dir, cache):
+    """Render and parse every manifest; returns (manifests, findings, files, stats)"""
+    values_path = os.path.join(chart_dir, "values.yaml")
+    context = render_context(_load_yaml(os.path.join(chart_dir, "Chart.yaml")),
+                             _load_yaml(values_path) if os.path.isfile(values_path) else None)
+    manifests, findings, files = [], [], {}
+    stats = {"files": 0, "parsed": 0}
+    for directory in MANIFEST_DIRS:
+        root = os.path.join(chart_dir, directory)
+        if not os.path.isdir(root):
+            continue
+        for name in sorted(os.listdir(root)):
+            if not name.endswith((".yaml", ".yml")):
+                continue
+            path = f"{directory}/{name}"
+            with open(os.path.join(root, name), encoding="utf-8") as f:
+                text = f.read()
+            stats["files"] += 1
+            if directory == "templates":
+                text, problems = render(text, context)
+                findings += [(WARNING, path, problem) for problem in problems]
+                if any(problem.startswith("unsupported") or "toYaml" in problem for problem in problems):
+                    continue
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            files[path] = digest
+            docs = cache.documents.get(digest)
+            if docs is None:
+                try:
+                    docs = [doc for doc in yaml.load_all(text, Loader=SafeLoader) if doc]
+                except yaml.YAMLError as e:
+                    findings.append((ERROR, path, f"invalid YAML: {e}"))
+                    del files[path]
+                    continue
+                # Round-trip through JSON so cached and fresh documents compare equal
+                docs = cache.documents[digest] = json.loads(json.dumps(docs, default=str))
+                stats["parsed"] += 1
+            for doc in docs:
+                if not isinstance(doc, dict):
+                    findings.append((ERROR, path, "document is not a mapping"))
+                    continue
+                manifests.append(Manifest(path, doc))
+    return manifests, findings, files, stats
+
+
+def load_package_templates(source):
+    """Render and parse the templates of a chart package (.tgz path or URL).
+
+    Returns (chart, values, [(path, documents)]); templates that do not
+    parse once rendered are left out.
+    """
+    # Imported here so linting a chart directory does not load the network stack
+    from chart_diff import open_members
+
+    _, members = open_members(source)
+
+    def load(path):
+        member = members.get(path)
+        return yaml.load(member[2], Loader=SafeLoader) if member and member[2] is not None else None
+
+    chart, values = load("Chart.yaml") or {}, load("values.yaml") or {}
+    context = render_context(chart, values)
+    templates = []
+    for path, (_, _, content) in sorted(members.items()):
+        if not path.startswith("templates/") or content is None:
+            continue
+        text, _ = render(content.decode("utf-8"), context)
+        try:
+            templates.append((path, [doc for doc in yaml.load_all(text, Loader=SafeLoader) if doc]))
+        except yaml.YAMLError:
+            continue
+    return chart, values, templates
+
+
+def _labels_match(selector, labels):
+    return bool(selector) and all(labels.get(k) == v for k, v in selector.items())
+
+
+def _pod_specs(index):
+    """Yield (deployment, pod_labels, pod_spec) for every Deployment"""
+    for deployment in index.get("Deployment", []):
+        template = (deployment.doc.get("spec") or {}).get("template") or {}
+        yield deployment, (template.get("metadata") or {}).get("labels") or {}, template.get("spec") or {}
+
+
+def _container_ports(pod_spec):
+    for container in pod_spec.get("containers") or []:
+        for port in container.get("ports") or []:
+            yield port
+
+
+def _resolve_service_port(service, port_number, index):
+    """Return an error message if port_number on service does not reach a container port, else None"""
+    ports = (service.doc.get("spec") or {}).get("ports") or []
+    port = next((p for p in ports if p.get("port") == port_number), None)
+    if port is None:
+        return f"Service {service.name} has no port {port_number}"
+    target = port.get("targetPort", port_number)
+    selector = (service.doc.get("spec") or {}).get("selector") or {}
+    for deployment, labels, pod_spec in _pod_specs(index):
+        if deployment.namespace == service.namespace and _labels_match(selector, labels):
+            for container_port in _container_ports(pod_spec):
+                if target in (container_port.get("containerPort"), container_port.get("name")):
+                    return None
+    return f"Service {service.name} port {port_number} -> targetPort {target} matches no container port"
+
+
+def _check_duplicates(manifests, findings):
+    seen = {}
+    for manifest in manifests:
+        if not manifest.kind or not manifest.name:
+            findings.append((ERROR, manifest.path, "document has no kind or metadata.name"))
+        elif manifest.key in seen:
+            findings.append((ERROR, manifest.path, f"{manifest} is also defined in {seen[manifest.key]}"))
+        else:
+            seen[manifest.key] = manifest.path
+
+
+def _check_deployments(index, by_key, findings):
+    for deployment, labels, pod_spec in _pod_specs(index):
+        where = deployment.path
+        spec = deployment.doc.get("spec") or {}
+        selector = (spec.get("selector") or {}).get("matchLabels") or {}
+        if not _labels_match(selector, labels):
+            findings.append((ERROR, where, f"Deployment {deployment.name} selector {selector} does not match its pod labels {labels}"))
+        account = pod_spec.get("serviceAccountName", "default")
+        if account != "default" and ("ServiceAccount", deployment.namespace, account) not in by_key:
+            findings.append((ERROR, where, f"ServiceAccount {account} is not defined in namespace {deployment.namespace}"))
+        secrets = {(c.doc.get("spec") or {}).get("secretName") for c in index.get("Certificate", [])
+                   if c.namespace == deployment.namespace}
+        volumes = {}
+        for volume in pod_spec.get("volumes") or []:
+            volumes[volume.get("name")] = volume
+            secret = (volume.get("secret") or {}).get("secretName")
+            if secret and secret not in secrets and ("Secret", deployment.namespace, secret) not in by_key:
+                findings.append((WARNING, where, f"volume {volume.get('name')} uses Secret {secret}, which no Certificate or Secret in the chart provides"))
+            config_map = (volume.get("configMap") or {}).get("name")
+            if config_map and ("ConfigMap", deployment.namespace, config_map) not in by_key:
+                findings.append((WARNING, where, f"volume {volume.get('name')} uses ConfigMap {config_map}, which the chart does not define"))
+        for container in pod_spec.get("containers") or []:
+            label = f"container {container.get('name')}"
+            if not container.get("image"):
+                findings.append((ERROR, where, f"{label} has no image"))
+            if not container.get("resources"):
+                findings.append((WARNING, where, f"{label} sets no resource requests/limits"))
+            for mount in container.get("volumeMounts") or []:
+                if mount.get("name") not in volumes:
+                    findings.append((ERROR, where, f"{label} mounts undefined volume {mount.get('name')}"))
+            if "--leader-elect" in (container.get("args") or []) and not _allowed(
+                    index, deployment.namespace, account, "coordination.k8s.io", "leases", "update"):
+                findings.append((ERROR, where, f"{label} runs with --leader-elect but ServiceAccount {account} cannot update leases"))
+
+
+def _bound_rules(index, namespace, account):
+    """Yield the rules granted to a ServiceAccount through the chart's bindings"""
+    for kind in ("RoleBinding", "ClusterRoleBinding"):
+        for binding in index.get(kind, []):
+            subjects = binding.doc.get("subjects") or []
+            if not any(s.get("kind") == "ServiceAccount" and s.get("name") == account
+                       and (s.get("namespace") or binding.namespace) == namespace for s in subjects):
+                continue
+            ref = binding.doc.get("roleRef") or {}
+            role_ns = binding.namespace if ref.get("kind") == "Role" else None
+            for role in index.get(ref.get("kind"), []):
+                if role.name == ref.get("name") and role.namespace == role_ns:
+                    yield from role.doc.get("rules") or []
+
+
+def _allowed(index, namespace, account, api_group, resource, verb):
+    for rule in _bound_rules(index, namespace, account):
+        if ({api_group, "*"} & set(rule.get("apiGroups") or [])
+                and {resource, "*"} & set(rule.get("resources") or [])
+                and {verb, "*"} & set(rule.get("verbs") or [])):
+            return True
+    return False
+
+
+def _check_rbac(index, by_key, findings):
+    for kind in ("Role", "ClusterRole"):
+        for role in index.get(kind, []):
+            for i, rule in enumerate(role.doc.get("rules") or []):
+                unknown = sorted(set(rule.get("verbs") or []) - RBAC_VERBS)
+                if unknown:
+                    findings.append((ERROR, role.path, f"{kind} {role.name} rule {i} has unknown verbs {unknown}"))
+                if not rule.get("verbs") or not (rule.get("resources") or rule.get("nonResourceURLs")):
+                    findings.append((ERROR, role.path, f"{kind} {role.name} rule {i} needs verbs and resources"))
+    for kind in ("RoleBinding", "ClusterRoleBinding"):
+        for binding in index.get(kind, []):
+            ref = binding.doc.get("roleRef") or {}
+            role_ns = binding.namespace if ref.get("kind") == "Role" else None
+            name = ref.get("name")
+            builtin = ref.get("kind") == "ClusterRole" and (name in BUILTIN_CLUSTER_ROLES or str(name).startswith("system:"))
+            if (ref.get("kind"), role_ns, name) not in by_key and not builtin:
+                findings.append((ERROR, binding.path, f"{kind} {binding.name} refers to undefined {ref.get('kind')} {name}"))
+            for subject in binding.doc.get("subjects") or []:
+                if subject.get("kind") != "ServiceAccount":
+                    continue
+                namespace = subject.get("namespace") or binding.namespace
+                if namespace is None:
+                    findings.append((ERROR, binding.path, f"{kind} {binding.name} subject {subject.get('name')} needs a namespace"))
+                elif ("ServiceAccount", namespace, subject.get("name")) not in by_key:
+                    findings.append((WARNING, binding.path, f"{kind} {binding.name} binds ServiceAccount {namespace}/{subject.get('name')}, which the chart does not define"))
+
+
+def _check_ca_injection(manifest, by_key, findings):
+    source = ((manifest.doc.get("metadata") or {}).get("annotations") or {}).get("cert-manager.io/inject-ca-from")
+    if source:
+        namespace, _, name = source.partition("/")
+        if ("Certificate", namespace, name) not in by_key:
+            findings.append((WARNING, manifest.path, f"{manifest} injects its CA from Certificate {source}, which the chart does not define"))
+
+
+def _check_webhooks(index, by_key, findings):
+    crd_resources = {}
+    for crd in index.get("CustomResourceDefinition", []):
+        spec = crd.doc.get("spec") or {}
+        crd_resources.setdefault(spec.get("group"), set()).add((spec.get("names") or {}).get("plural"))
+        _check_ca_injection(crd, by_key, findings)
+    dns_names = {name for c in index.get("Certificate", []) for name in (c.doc.get("spec") or {}).get("dnsNames") or []}
+    for kind in ("MutatingWebhookConfiguration", "ValidatingWebhookConfiguration"):
+        for config in index.get(kind, []):
+            _check_ca_injection(config, by_key, findings)
+            for webhook in config.doc.get("webhooks") or []:
+                label = f"webhook {webhook.get('name')}"
+                service_ref = (webhook.get("clientConfig") or {}).get("service")
+                if service_ref:
+                    namespace = service_ref.get("namespace")
+                    service = next((s for s in index.get("Service", [])
+                                    if s.name == service_ref.get("name") and s.namespace == namespace), None)
+                    if service is None:
+                        findings.append((ERROR, config.path, f"{label} calls undefined Service {namespace}/{service_ref.get('name')}"))
+                    else:
+                        problem = _resolve_service_port(service, service_ref.get("port", 443), index)
+                        if problem:
+                            findings.append((ERROR, config.path, f"{label}: {problem}"))
+                        if index.get("Certificate") and f"{service.name}.{namespace}.svc" not in dns_names:
+                            findings.append((ERROR, config.path, f"{label}: no Certificate covers {service.name}.{namespace}.svc"))
+                for rule in webhook.get("rules") or []:
+                    for group in rule.get("apiGroups") or []:
+                        if group not in crd_resources:
+                            continue
+                        missing = sorted(set(rule.get("resources") or []) - crd_resources[group] - {"*"})
+                        if missing:
+                            findings.append((ERROR, config.path, f"{label} targets {missing} in {group}, which no CRD defines"))
+
+
+def _check_certificates(index, by_key, findings):
+    for certificate in index.get("Certificate", []):
+        issuer = (certificate.doc.get("spec") or {}).get("issuerRef") or {}
+        kind = issuer.get("kind", "Issuer")
+        namespace = certificate.namespace if kind == "Issuer" else None
+        if (kind, namespace, issuer.get("name")) not in by_key:
+            findings.append((WARNING, certificate.path, f"Certificate {certificate.name} uses {kind} {issuer.get('name')}, which the chart does not define"))
+
+
+def _check_services(index, findings):
+    for service in index.get("Service", []):
+        selector = (service.doc.get("spec") or {}).get("selector") or {}
+        if not any(d.namespace == service.namespace and _labels_match(selector, labels)
+                   for d, labels, _ in _pod_specs(index)):
+            findings.append((WARNING, service.path, f"Service {service.name} selector {selector} matches no Deployment in the chart"))
+            continue
+        for port in (service.doc.get("spec") or {}).get("ports") or []:
+            problem = _resolve_service_port(service, port.get("port"), index)
+            if problem:
+                findings.append((ERROR, service.path, problem))
+
+
+def lint(manifests):
+    """Cross-check the manifests; returns a list of (level, path, message)"""
+    findings = []
+    _check_duplicates(manifests, findings)
+    index = {}
+    by_key = {}
+    for manifest in manifests:
+        index.setdefault(manifest.kind, []).append(manifest)
+        by_key.setdefault(manifest.key, manifest)
+    _check_deployments(index, by_key, findings)
+    _check_rbac(index, by_key, findings)
+    _check_services(index, findings)
+    _check_certificates(index, by_key, findings)
+    _check_webhooks(index, by_key, findings)
+    return findings
+
+
+def diff_runs(previous_files, files, cache_documents, previous_documents):
+    """Describe object-level changes between the last run and this one"""
+    def objects(file_map, documents):
+        result = {}
+        for path, digest in file_map.items():
+            for doc in documents.get(digest) or []:
+                if isinstance(doc, dict):
+                    manifest = Manifest(path, doc)
+                    result[manifest.key] = (path, doc)
+        return result
+
+    changed_paths = {p for p in set(previous_files) | set(files) if previous_files.get(p) != files.get(p)}
+    if not changed_paths:
+        return []
+    before = objects({p: d for p, d in previous_files.items() if p in changed_paths}, previous_documents)
+    after = objects({p: d for p, d in files.items() if p in changed_paths}, cache_documents)
+    lines = []
+    for key in sorted(set(before) | set(after), key=lambda k: tuple(str(part) for part in k)):
+        kind, _, name = key
+        if key not in before:
+            lines.append(f"   + {after[key][0]}: {kind}/{name} added")
+        elif key not in after:
+            lines.append(f"   - {before[key][0]}: {kind}/{name} removed")
+        elif before[key][1] != after[key][1]:
+            lines.append(f"   ~ {after[key][0]}: {kind}/{name} changed")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chart", default=REPO_ROOT, help="chart directory (default: the repository root)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="parsed-manifest cache (default: .cache/manifest-lint.json)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every file and do not update the cache")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    cache = ManifestCache(None if args.no_cache else args.cache)
+    previous_files, previous_documents = dict(cache.files), dict(cache.documents)
+    manifests, findings, files, stats = load_manifests(args.chart, cache)
+    findings += lint(manifests)
+    changes = diff_runs(previous_files, files, cache.documents, previous_documents) if previous_files else []
+    cache.save(files)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for level, path, message in findings:
+        print(f"{'❌' if level == ERROR else '⚠️ '} {path}: {message}")
+    if changes:
+        print("Changed since the last run:")
+        for line in changes:
+            print(line)
+    errors = sum(1 for level, _, _ in findings if level == ERROR)
+    print(f"{'❌' if errors else '✓'} Linted {len(manifests)} objects from {stats['files']} files "
+          f"({stats['parsed']} parsed, {stats['files'] - stats['parsed']} cached): "
+          f"{errors} errors, {len(findings) - errors} warnings in {elapsed_ms:.1f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
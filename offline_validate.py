@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Offline pre-publish validation - run the deep debug checks against docs/ on disk"""
+import argparse
+import os
+import sys
+import time
+import urllib.error
+from functools import partial
+
+import yaml
+
+import debug_log
+from chart_inspect import check_package_contents
+from deep_debug_artifacthub import build_checks
+from repo_fetcher import LocalFetcher
+from validation_runner import FAIL, PASS, WARN, Check, CheckResult, run_checks
+
+DEFAULT_DOCS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs")
+DEFAULT_REPO_URL = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+
+log = debug_log.make_log("offline-validate")
+
+def check_artifacthub_repo_yml(ctx, fetcher, repo_url):
+    """artifacthub-repo.yml is present and is a YAML mapping"""
+    url = f"{repo_url}/artifacthub-repo.yml"
+    try:
+        _, content, _, _ = fetcher.fetch(url)
+    except urllib.error.HTTPError:
+        # #region agent log
+        log("H6", "offline_validate.py:check_artifacthub_repo_yml", "artifacthub-repo.yml not found", {"path": fetcher.path_for(url)})
+        # #endregion
+        return CheckResult(WARN, ["⚠️  H6 WARNING: docs/artifacthub-repo.yml not found (optional but recommended)"])
+    try:
+        metadata = yaml.safe_load(content) or {}
+    except yaml.YAMLError as e:
+        # #region agent log
+        log("H6", "offline_validate.py:check_artifacthub_repo_yml", "artifacthub-repo.yml parse error", {"error": str(e)})
+        # #endregion
+        return CheckResult(FAIL, [f"❌ H6 FAILED: docs/artifacthub-repo.yml is not valid YAML: {e}"])
+    if not isinstance(metadata, dict):
+        return CheckResult(FAIL, ["❌ H6 FAILED: docs/artifacthub-repo.yml must be a YAML mapping"])
+    # #region agent log
+    log("H6", "offline_validate.py:check_artifacthub_repo_yml", "artifacthub-repo.yml valid", {"keys": sorted(metadata)})
+    # #endregion
+    return CheckResult(PASS, ["✓ H6 PASSED: docs/artifacthub-repo.yml is valid"])
+
+def check_unreferenced_packages(ctx, fetcher):
+    """Every .tgz in docs/ is listed in index.yaml"""
+    _, index, _ = ctx.resource("index")
+    index_data = index.result()
+    referenced = {
+        fetcher.path_for(url)
+        for versions in (index_data.get("entries") or {}).values()
+        for version in versions or []
+        for url in version.get("urls") or []
+    }
+    unreferenced = sorted(
+        name for name in os.listdir(fetcher.root)
+        if name.endswith(".tgz") and os.path.join(fetcher.root, name) not in referenced
+    )
+    # #region agent log
+    log("H7", "offline_validate.py:check_unreferenced_packages", "Unreferenced packages", {"files": unreferenced})
+    # #endregion
+    if unreferenced:
+        return CheckResult(WARN, [f"⚠️  H7 WARNING: Packages in docs/ not listed in index.yaml: {unreferenced}"])
+    return CheckResult(PASS, ["✓ H7 PASSED: Every package in docs/ is listed in index.yaml"])
+
+def build_offline_checks(docs_dir=DEFAULT_DOCS_DIR, repo_url=DEFAULT_REPO_URL):
+    """Return (checks, resources): the deep debug checks served from docs_dir, plus docs/ extras"""
+    fetcher = LocalFetcher(docs_dir, repo_url)
+    checks, resources = build_checks(repo_url, fetcher=fetcher)
+    checks += [
+        Check("H6", partial(check_artifacthub_repo_yml, fetcher=fetcher, repo_url=repo_url)),
+        Check("H7", partial(check_unreferenced_packages, fetcher=fetcher), requires=["index"], after=["H1", "H2"]),
+        Check("H8", partial(check_package_contents, fetcher=fetcher), requires=["index"], after=["H1", "H2"]),
+    ]
+    return checks, resources
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", default=DEFAULT_DOCS_DIR, help="directory published to GitHub Pages (default: docs/)")
+    parser.add_argument("--repo-url", default=DEFAULT_REPO_URL, help="URL the directory is served from")
+    args = parser.parse_args(argv)
+
+    # #region agent log
+    log("H1", "offline_validate.py:main", "Starting offline validation", {"docs": args.docs, "repoUrl": args.repo_url})
+    # #endregion
+
+    started = time.perf_counter()
+    checks, resources = build_offline_checks(args.docs, args.repo_url)
+    status = run_checks(checks, resources)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"\n⏱  Offline validation of {args.docs} finished in {elapsed_ms:.1f} ms")
+    return status
+
+if __name__ == "__main__":
+    status = main()
+    debug_log.flush()
+    sys.exit(status)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Query and diff the permissions the chart's Roles, ClusterRoles and bindings grant"""
+import argparse
+import json
+import os
+import sys
+
+import debug_log
+import request_timing
+from manifest_lint import REPO_ROOT, Manifest, ManifestCache, load_manifests, load_package_templates
+
+# Scope of grants made by ClusterRoleBindings
+CLUSTER = "*"
+RBAC_KINDS = ("Role", "ClusterRole", "RoleBinding", "ClusterRoleBinding")
+
+# Built-in ClusterRoles a chart may bind without defining; admin/edit/view are
+# aggregated in the cluster and cannot be known offline
+BUILTIN_RULES = {
+    "cluster-admin": [
+        {"apiGroups": ["*"], "resources": ["*"], "verbs": ["*"]},
+        {"nonResourceURLs": ["*"], "verbs": ["*"]},
+    ],
+}
+
+
+class Grant:
+    """Why a subject holds one permission: the binding, the role and any resourceNames restriction"""
+    __slots__ = ("binding", "role", "resource_names")
+
+    def __init__(self, binding, role, resource_names):
+        self.binding = binding
+        self.role = role
+        self.resource_names = resource_names
+
+    def to_dict(self):
+        return {"binding": self.binding, "role": self.role,
+                "resourceNames": sorted(self.resource_names) if self.resource_names else None}
+
+
+def parse_subject(text):
+    """Normalize system:serviceaccount:NS:NAME, serviceaccount:NS/NAME, user:NAME or group:NAME"""
+    if text.startswith("system:serviceaccount:"):
+        namespace, _, name = text[len("system:serviceaccount:"):].partition(":")
+        return f"system:serviceaccount:{namespace}:{name}"
+    kind, _, name = text.partition(":")
+    kind = kind.lower()
+    if kind == "serviceaccount":
+        namespace, _, name = name.partition("/")
+        return f"system:serviceaccount:{namespace}:{name}"
+    if kind in ("user", "group") and name:
+        return f"{kind}:{name}"
+    raise ValueError(f"unknown subject {text!r} (use system:serviceaccount:NS:NAME, user:NAME or group:NAME)")
+
+
+def _binding_subject(subject, binding_namespace):
+    kind = subject.get("kind")
+    if kind == "ServiceAccount":
+        return f"system:serviceaccount:{subject.get('namespace') or binding_namespace}:{subject.get('name')}"
+    if kind in ("User", "Group"):
+        return f"{kind.lower()}:{subject.get('name')}"
+    return None
+
+
+def _identities(subject):
+    """The subject plus the groups Kubernetes puts it in"""
+    if subject.startswith("system:serviceaccount:"):
+        namespace = subject.split(":")[2]
+        return (subject, "group:system:serviceaccounts", f"group:system:serviceaccounts:{namespace}",
+                "group:system:authenticated")
+    if subject.startswith("user:"):
+        return (subject, "group:system:authenticated")
+    return (subject,)
+
+
+def parse_resource(text):
+    """Split kubectl-style resource[/subresource][.group] into (group, resource); /paths are non-resource URLs"""
+    if text.startswith("/"):
+        return None, text
+    name, _, group = text.partition(".")
+    return group, name
+
+
+class PermissionIndex:
+    """Every (subject, scope, apiGroup, resource, verb) granted by a set of RBAC objects.
+
+    scope is the namespace of a RoleBinding, or CLUSTER for a
+    ClusterRoleBinding; non-resource URLs use apiGroup None. A query
+    expands wildcards on the query side, so "can X do Y" is a fixed number
+    of dict lookups whatever the number of roles, bindings and rules.
+    """
+
+    def __init__(self):
+        self.grants = {}
+        self._url_prefixes = {}
+        self.unresolved = []
+
+    def add(self, subject, scope, group, resource, verb, grant):
+        self.grants.setdefault((subject, scope, group, resource, verb), []).append(grant)
+        if group is None and resource.endswith("*"):
+            self._url_prefixes.setdefault((subject, verb), []).append((resource[:-1], grant))
+
+    @classmethod
+    def from_manifests(cls, manifests):
+        index = cls()
+        roles = {(m.kind, m.namespace, m.name): m for m in manifests if m.kind in ("Role", "ClusterRole")}
+        for binding in manifests:
+            if binding.kind not in ("RoleBinding", "ClusterRoleBinding"):
+                continue
+            ref = binding.doc.get("roleRef") or {}
+            role_namespace = binding.namespace if ref.get("kind") == "Role" else None
+            role = roles.get((ref.get("kind"), role_namespace, ref.get("name")))
+            if role is not None:
+                rules = role.doc.get("rules") or []
+            elif ref.get("kind") == "ClusterRole" and ref.get("name") in BUILTIN_RULES:
+                rules = BUILTIN_RULES[ref["name"]]
+            else:
+                index.unresolved.append(f"{binding.kind} {binding.name} -> {ref.get('kind')} {ref.get('name')}")
+                continue
+            scope = CLUSTER if binding.kind == "ClusterRoleBinding" else binding.namespace
+            role_label = f"{ref.get('kind')}/{ref.get('name')}"
+            binding_label = f"{binding.kind}/{binding.name}"
+            for subject in binding.doc.get("subjects") or []:
+                subject = _binding_subject(subject, binding.namespace)
+                if subject is None:
+                    continue
+                for rule in rules:
+                    names = rule.get("resourceNames")
+                    grant = Grant(binding_label, role_label, frozenset(names) if names else None)
+                    verbs = rule.get("verbs") or []
+                    for url in rule.get("nonResourceURLs") or []:
+                        for verb in verbs:
+                            # Non-resource URLs are only granted cluster-wide
+                            if scope == CLUSTER:
+                                index.add(subject, CLUSTER, None, url, verb, grant)
+                    for group in rule.get("apiGroups") or []:
+                        for resource in rule.get("resources") or []:
+                            for verb in verbs:
+                                index.add(subject, scope, group, resource, verb, grant)
+        return index
+
+    def check(self, subject, verb, group, resource, namespace=None, name=None):
+        """Return the grants allowing subject to verb the resource (None group for a URL); empty if denied"""
+        found = []
+        grants = self.grants
+        verbs = (verb, "*")
+        scopes = (CLUSTER,) if namespace is None else (namespace, CLUSTER)
+        for identity in _identities(subject):
+            if group is None:
+                for v in verbs:
+                    found += grants.get((identity, CLUSTER, None, resource, v), ())
+                    for prefix, grant in self._url_prefixes.get((identity, v), ()):
+                        if resource.startswith(prefix):
+                            found.append(grant)
+                continue
+            _, _, subresource = resource.partition("/")
+            resources = (resource, "*", f"*/{subresource}") if subresource else (resource, "*")
+            for scope in scopes:
+                for g in (group, "*"):
+                    for r in resources:
+                        for v in verbs:
+                            found += grants.get((identity, scope, g, r, v), ())
+        return [grant for grant in found if grant.resource_names is None or name in grant.resource_names]
+
+    def permissions(self):
+        """The effective permissions as a set of comparable tuples"""
+        return {
+            (subject, scope, group if group is not None else "", resource, verb,
+             tuple(sorted(grant.resource_names)) if grant.resource_names else ())
+            for (subject, scope, group, resource, verb), grants in self.grants.items()
+            for grant in grants
+        }
+
+
+def manifests_from_package(source):
+    """The RBAC objects among a chart package's rendered templates"""
+    _, _, templates = load_package_templates(source)
+    return [Manifest(path, doc) for path, docs in templates
+            for doc in docs if isinstance(doc, dict) and doc.get("kind") in RBAC_KINDS]
+
+
+def load_index(source):
+    """Build a PermissionIndex from a chart directory or a packaged chart (.tgz path or URL)"""
+    if os.path.isdir(source):
+        manifests, _, _, _ = load_manifests(source, ManifestCache(None))
+        manifests = [manifest for manifest in manifests if manifest.kind in RBAC_KINDS]
+    else:
+        manifests = manifests_from_package(source)
+    return PermissionIndex.from_manifests(manifests)
+
+
+def format_permission(permission):
+    subject, scope, group, resource, verb, names = permission
+    where = "cluster-wide" if scope == CLUSTER else f"in {scope}"
+    target = resource if not group else f"{resource}.{group}"
+    return f"{subject}: {verb} {target}{' ' + ','.join(names) if names else ''} {where}"
+
+
+def parse_query(line):
+    """SUBJECT VERB RESOURCE [NAMESPACE [NAME]]; NAMESPACE "-" means cluster-wide"""
+    parts = line.split()
+    if len(parts) < 3 or len(parts) > 5:
+        raise ValueError("expected SUBJECT VERB RESOURCE [NAMESPACE [NAME]]")
+    namespace = parts[3] if len(parts) > 3 and parts[3] != "-" else None
+    name = parts[4] if len(parts) > 4 else None
+    group, resource = parse_resource(parts[2])
+    return parse_subject(parts[0]), parts[1], group, resource, namespace, name
+
+
+def run_queries(index, lines):
+    """Answer one query per line (blank lines and # comments skipped); returns a result per query"""
+    results = []
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            subject, verb, group, resource, namespace, name = parse_query(line)
+        except ValueError as e:
+            results.append({"line": number, "query": line, "allowed": None, "error": str(e)})
+            continue
+        grants = index.check(subject, verb, group, resource, namespace, name)
+        results.append({"line": number, "query": line, "allowed": bool(grants),
+                        "via": [grant.to_dict() for grant in grants]})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chart", default=REPO_ROOT,
+                        help="chart directory or package (.tgz path or URL) to query (default: the repository root)")
+    parser.add_argument("--json", help="also write the results to this file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="print every effective permission")
+    can = commands.add_parser("can", help="can SUBJECT VERB RESOURCE [-n NAMESPACE] [--name NAME]")
+    can.add_argument("subject", help="system:serviceaccount:NS:NAME, serviceaccount:NS/NAME, user:NAME or group:NAME")
+    can.add_argument("verb")
+    can.add_argument("resource", help="resource[/subresource][.group], or a non-resource URL such as /metrics")
+    can.add_argument("-n", "--namespace", help="namespace of the request (default: cluster-wide)")
+    can.add_argument("--name", help="name of the object, for rules restricted by resourceNames")
+    batch = commands.add_parser("batch", help="answer queries from files, one SUBJECT VERB RESOURCE [NAMESPACE [NAME]] per line")
+    batch.add_argument("files", nargs="+", help="query files ('-' for stdin)")
+    diff = commands.add_parser("diff", help="compare the effective permissions of two charts or packages")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "diff":
+            old, new = load_index(args.old), load_index(args.new)
+        else:
+            index = load_index(args.chart)
+    except Exception as e:
+        print(f"❌ Could not load RBAC objects: {type(e).__name__}: {e}")
+        return 1
+
+    if args.command == "list":
+        permissions = sorted(index.permissions())
+        for permission in permissions:
+            print(format_permission(permission))
+        for reference in index.unresolved:
+            print(f"⚠️  {reference}: role not defined in the chart")
+        output = [dict(zip(("subject", "scope", "apiGroup", "resource", "verb", "resourceNames"), p)) for p in permissions]
+        status = 0
+    elif args.command == "can":
+        try:
+            subject = parse_subject(args.subject)
+        except ValueError as e:
+            parser.error(str(e))
+        group, resource = parse_resource(args.resource)
+        grants = index.check(subject, args.verb, group, resource, args.namespace, args.name)
+        print("yes" if grants else "no")
+        for grant in grants:
+            print(f"   via {grant.binding} -> {grant.role}")
+        output = {"allowed": bool(grants), "via": [grant.to_dict() for grant in grants]}
+        status = 0 if grants else 1
+    elif args.command == "batch":
+        output = []
+        for path in args.files:
+            if path == "-":
+                results = run_queries(index, sys.stdin)
+            else:
+                with open(path) as f:
+                    results = run_queries(index, f)
+            for result in results:
+                result["file"] = path
+            output += results
+        for result in output:
+            answer = "error: " + result["error"] if result.get("error") else "yes" if result["allowed"] else "no"
+            print(f"{result['file']}:{result['line']}: {result['query']} -> {answer}")
+        allowed = sum(1 for result in output if result["allowed"])
+        errors = sum(1 for result in output if result.get("error"))
+        print(f"📋 {len(output)} queries: {allowed} allowed, {len(output) - allowed - errors} denied, {errors} invalid")
+        status = 1 if errors else 0
+    else:
+        before, after = old.permissions(), new.permissions()
+        added, removed = sorted(after - before), sorted(before - after)
+        for permission in added:
+            print(f"+ {format_permission(permission)}")
+        for permission in removed:
+            print(f"- {format_permission(permission)}")
+        print(f"📋 {len(added)} permissions added, {len(removed)} removed, {len(before & after)} unchanged")
+        output = {"added": [list(p) for p in added], "removed": [list(p) for p in removed]}
+        status = 0
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json}")
+    return status
+
+
+if __name__ == "__main__":
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
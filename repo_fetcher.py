@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Interchangeable fetch backends: the published repository or a local docs/ directory"""
+import hashlib
+import mimetypes
+import mmap
+import os
+import urllib.error
+
+from chart_digest import verify_digest
+from chart_http import get_session, probe_url
+from http_cache import conditional_fetch, get_cache
+
+
+class NetworkFetcher:
+    """Fetch over HTTP through the shared session and conditional-GET cache"""
+
+    def fetch(self, url):
+        """Return (status, body, headers, not_modified)"""
+        return conditional_fetch(url)
+
+    def probe(self, url):
+        """Return (status, headers) without downloading the body"""
+        return probe_url(url)
+
+    def verify_digest(self, url, expected):
+        return verify_digest(url, expected)
+
+    def open_stream(self, url):
+        """Return a readable binary stream of the body, served from the cache when still current"""
+        cache = get_cache()
+        meta = cache.lookup(url)
+        response = get_session().open("GET", url, headers=cache.validators(meta) if meta else {})
+        if response.status == 304 and meta:
+            response.read()
+            cache.touch(url)
+            return open(cache.body_path(url), 'rb')
+        return response
+
+
+class LocalFetcher:
+    """Serve repository URLs from a local directory such as docs/.
+
+    URLs under repo_url map to the matching path below root; any other URL
+    (a mirror, a relative path) maps to root/<basename>. Missing files raise
+    HTTPError 404 so callers see the same failures as over the network.
+    Digests are computed over a memory-mapped view of the archive.
+    """
+
+    def __init__(self, root, repo_url):
+        self.root = os.path.abspath(root)
+        self.repo_url = repo_url.rstrip('/')
+
+    def path_for(self, url):
+        if url.startswith(self.repo_url + '/'):
+            relative = url[len(self.repo_url) + 1:]
+        elif not url.startswith(('http://', 'https://')):
+            relative = url
+        else:
+            relative = url.rsplit('/', 1)[-1]
+        path = os.path.normpath(os.path.join(self.root, relative.split('?', 1)[0]))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise urllib.error.HTTPError(url, 404, "Outside repository root", {}, None)
+        return path
+
+    def _stat(self, url):
+        path = self.path_for(url)
+        if not os.path.isfile(path):
+            raise urllib.error.HTTPError(url, 404, f"Not Found: {path}", {}, None)
+        return path, os.stat(path)
+
+    def _headers(self, path, size):
+        return {
+            'Content-Length': size,
+            'Content-Type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            'ETag': None,
+        }
+
+    def fetch(self, url):
+        path, stat = self._stat(url)
+        with open(path, 'rb') as f:
+            body = f.read()
+        return 200, body, self._headers(path, stat.st_size), False
+
+    def probe(self, url):
+        path, stat = self._stat(url)
+        headers = self._headers(path, stat.st_size)
+        headers['probeMethod'] = 'LOCAL'
+        return 200, headers
+
+    def open_stream(self, url):
+        path, _ = self._stat(url)
+        return open(path, 'rb')
+
+    def verify_digest(self, url, expected):
+        path, stat = self._stat(url)
+        hasher = hashlib.sha256()
+        if stat.st_size:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+        actual = hasher.hexdigest()
+        return {
+            "url": url,
+            "expected": expected,
+            "actual": actual,
+            "size": stat.st_size,
+            "matches": actual == (expected or "").lower(),
+            "notModified": False,
+            "path": path,
+        }
+
+
+NETWORK = NetworkFetcher()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Compact in-memory model of a Helm chart repository index"""
+import sys
+from types import MappingProxyType
+
+# index.yaml version fields that map onto ChartVersion slots
+_FIELDS = {
+    "name": "name",
+    "version": "version",
+    "appVersion": "app_version",
+    "apiVersion": "api_version",
+    "description": "description",
+    "digest": "digest",
+    "created": "created",
+    "icon": "icon",
+    "type": "type",
+}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Maintainer:
+    """A chart maintainer; identical maintainers are shared between versions"""
+    __slots__ = ("name", "email", "url")
+
+    def __init__(self, name, email=None, url=None):
+        self.name = name
+        self.email = email
+        self.url = url
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) is not None}
+
+    def __repr__(self):
+        return f"Maintainer({self.name!r}, {self.email!r})"
+
+
+class ChartVersion:
+    """One version entry of index.yaml"""
+    __slots__ = ("name", "version", "app_version", "api_version", "description", "digest", "created",
+                 "icon", "type", "urls", "annotations", "maintainers", "extra")
+
+    def __init__(self, name, version=None, urls=(), digest=None, app_version=None, api_version=None,
+                 description=None, created=None, icon=None, type=None, annotations=None,
+                 maintainers=(), extra=None):
+        self.name = name
+        self.version = version
+        self.urls = tuple(urls)
+        self.digest = digest
+        self.app_version = app_version
+        self.api_version = api_version
+        self.description = description
+        self.created = created
+        self.icon = icon
+        self.type = type
+        self.annotations = annotations if annotations is not None else MappingProxyType({})
+        self.maintainers = tuple(maintainers)
+        self.extra = extra
+
+    def to_dict(self):
+        """Return the entry in index.yaml form"""
+        entry = {}
+        if self.annotations:
+            entry["annotations"] = dict(self.annotations)
+        for key, attr in _FIELDS.items():
+            value = getattr(self, attr)
+            if value is not None:
+                entry[key] = value
+        if self.maintainers:
+            entry["maintainers"] = [m.to_dict() for m in self.maintainers]
+        entry["urls"] = list(self.urls)
+        if self.extra:
+            entry.update(self.extra)
+        return entry
+
+    def __repr__(self):
+        return f"ChartVersion({self.name!r}, {self.version!r})"
+
+
+class ChartRepository:
+    """Chart versions from an index.yaml with O(1) lookups by name, version, URL and digest.
+
+    Repeated strings are interned and identical annotation blocks and
+    maintainer lists are stored once, so an index where every version carries
+    the same metadata costs little more than its distinct values.
+    """
+
+    def __init__(self, api_version=None, generated=None):
+        self.api_version = api_version
+        self.generated = generated
+        self.versions = []
+        self.by_name = {}
+        self.by_name_version = {}
+        self.by_url = {}
+        self.by_digest = {}
+        self._annotations = {}
+        self._maintainers = {}
+        self._maintainer_lists = {}
+
+    @classmethod
+    def from_index(cls, index_data):
+        """Build the model from a parsed index.yaml"""
+        index_data = index_data or {}
+        repository = cls(index_data.get("apiVersion"), index_data.get("generated"))
+        for chart_name, versions in (index_data.get("entries") or {}).items():
+            for entry in versions or []:
+                repository.add(chart_name, entry)
+        return repository
+
+    def extend(self, entries):
+        """Add (chart_name, version_entry) pairs, yielding each ChartVersion as it is indexed"""
+        for chart_name, entry in entries:
+            yield self.add(chart_name, entry)
+
+    def add(self, chart_name, entry):
+        """Index one version entry and return its ChartVersion"""
+        fields = {}
+        extra = {}
+        for key, value in entry.items():
+            attr = _FIELDS.get(key)
+            if attr:
+                fields[attr] = _intern(value)
+            elif key not in ("urls", "annotations", "maintainers"):
+                extra[key] = value
+        fields.setdefault("name", _intern(chart_name))
+        version = ChartVersion(
+            urls=[_intern(url) for url in entry.get("urls") or []],
+            annotations=self._shared_annotations(entry.get("annotations")),
+            maintainers=self._shared_maintainers(entry.get("maintainers")),
+            extra=extra or None,
+            **fields,
+        )
+        chart_name = _intern(chart_name)
+        self.versions.append(version)
+        self.by_name.setdefault(chart_name, []).append(version)
+        # An entry without a version is still listed, but cannot be looked up by version
+        if version.version is not None:
+            self.by_name_version[(chart_name, str(version.version))] = version
+        for url in version.urls:
+            self.by_url.setdefault(url, version)
+        if version.digest:
+            self.by_digest.setdefault(version.digest, version)
+        return version
+
+    def _shared_annotations(self, annotations):
+        if not annotations:
+            return None
+        key = tuple(sorted((str(k), str(v)) for k, v in annotations.items()))
+        shared = self._annotations.get(key)
+        if shared is None:
+            shared = MappingProxyType({_intern(k): _intern(v) for k, v in annotations.items()})
+            self._annotations[key] = shared
+        return shared
+
+    def _shared_maintainers(self, maintainers):
+        if not maintainers:
+            return ()
+        people = []
+        for m in maintainers:
+            key = (m.get("name"), m.get("email"), m.get("url"))
+            person = self._maintainers.get(key)
+            if person is None:
+                person = self._maintainers[key] = Maintainer(*(_intern(v) for v in key))
+            people.append(person)
+        people = tuple(people)
+        return self._maintainer_lists.setdefault(people, people)
+
+    def get(self, chart_name, version):
+        """Return the ChartVersion for a name and version, or None"""
+        return self.by_name_version.get((chart_name, str(version)))
+
+    def find_url(self, url):
+        return self.by_url.get(url)
+
+    def find_digest(self, digest):
+        return self.by_digest.get(digest)
+
+    def chart_names(self):
+        return list(self.by_name)
+
+    def urls(self):
+        """Every package URL, in index order"""
+        return [url for version in self.versions for url in version.urls]
+
+    def __len__(self):
+        return len(self.versions)
+
+    def __iter__(self):
+        return iter(self.versions)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Per-request phase timings and per-host latency histograms for the shared HTTP session"""
+import json
+import math
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+DEFAULT_TIMING_PATH = os.environ.get(
+    "ARTIFACTHUB_TIMING_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cursor", "timings.json"),
+)
+
+PHASES = ("dns", "connect", "tls", "ttfb", "body", "total")
+PERCENTILES = (50, 95, 99)
+
+# Histogram buckets grow by 5%, so reported percentiles are within ~2.5% of the sample
+_BUCKET_BASE_MS = 0.01
+_BUCKET_GROWTH = math.log(1.05)
+
+
+class RequestTiming:
+    """Phase durations of one HTTP request, in seconds.
+
+    dns, connect and tls are None when the request reused a pooled
+    connection (tls also for plain http). ttfb runs from sending the request
+    to receiving the response headers; body from there until the response
+    was released.
+    """
+    __slots__ = ("method", "url", "host", "status", "reused", "error", "bytes",
+                 "dns", "connect", "tls", "ttfb", "body", "started", "_mark")
+
+    def __init__(self, method, url, host):
+        self.method = method
+        self.url = url
+        self.host = host
+        self.status = None
+        self.reused = False
+        self.error = None
+        self.bytes = 0
+        self.dns = self.connect = self.tls = self.ttfb = self.body = None
+        self.started = self._mark = time.perf_counter()
+
+    def lap(self):
+        """Return the seconds since the previous lap (or the start)"""
+        now = time.perf_counter()
+        elapsed, self._mark = now - self._mark, now
+        return elapsed
+
+    @property
+    def total(self):
+        return self._mark - self.started
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in ("method", "url", "host", "status", "reused", "bytes", "error")}
+        for phase in PHASES:
+            value = getattr(self, phase)
+            data[phase] = None if value is None else round(value * 1000, 3)
+        return data
+
+
+def connect_timed(conn, timing):
+    """Open conn, recording DNS, TCP connect and TLS handshake times on timing.
+
+    http.client resolves and connects inside socket.create_connection, so
+    the connection's _create_connection hook is replaced by one that does
+    the lookup separately. Whatever remains of connect() (for HTTPS, the TLS
+    handshake) is attributed to tls.
+    """
+    def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        host, port = address
+        started = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        timing.dns = resolved - started
+        error = None
+        for family, _, _, _, sockaddr in addresses:
+            try:
+                sock = socket.create_connection(sockaddr[:2], timeout, source_address)
+            except OSError as e:
+                error = e
+                continue
+            timing.connect = time.perf_counter() - resolved
+            return sock
+        raise error or OSError(f"getaddrinfo returned no addresses for {host}")
+
+    conn._create_connection = create_connection
+    started = time.perf_counter()
+    conn.connect()
+    elapsed = time.perf_counter() - started
+    if hasattr(conn, "_context"):
+        timing.tls = max(0.0, elapsed - (timing.dns or 0.0) - (timing.connect or 0.0))
+    timing.lap()
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: constant memory however many samples"""
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        bucket = int(math.log(max(ms, _BUCKET_BASE_MS) / _BUCKET_BASE_MS) / _BUCKET_GROWTH)
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        """Return the upper bound of the bucket holding the p-th percentile, in ms"""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.max, _BUCKET_BASE_MS * math.exp((bucket + 1) * _BUCKET_GROWTH))
+        return self.max
+
+    def to_dict(self):
+        data = {"count": self.count, "mean": round(self.sum / self.count, 3) if self.count else None,
+                "max": round(self.max, 3)}
+        for p in PERCENTILES:
+            value = self.percentile(p)
+            data[f"p{p}"] = None if value is None else round(value, 3)
+        return data
+
+
+class HostStats:
+    """Request counts and one histogram per phase for a single host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = Counter()
+        self.statuses = Counter()
+        self.reused = 0
+        self.bytes = 0
+        self.phases = {phase: LatencyHistogram() for phase in PHASES}
+
+    def add(self, timing):
+        self.requests += 1
+        self.reused += timing.reused
+        self.bytes += timing.bytes
+        if timing.error:
+            self.errors[timing.error] += 1
+        else:
+            self.statuses[str(timing.status)] += 1
+        for phase in PHASES:
+            value = getattr(timing, phase)
+            if value is not None:
+                self.phases[phase].add(value * 1000)
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "reusedConnections": self.reused,
+            "bytes": self.bytes,
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "phasesMs": {phase: hist.to_dict() for phase, hist in self.phases.items() if hist.count},
+        }
+
+
+class TimingRecorder:
+    """Aggregates RequestTimings per host; on_record, if set, also sees every request"""
+
+    def __init__(self, on_record=None):
+        self.on_record = on_record
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def record(self, timing):
+        with self._lock:
+            stats = self.hosts.get(timing.host)
+            if stats is None:
+                stats = self.hosts[timing.host] = HostStats()
+            stats.add(timing)
+        if self.on_record is not None:
+            self.on_record(timing)
+
+    def __len__(self):
+        return sum(stats.requests for stats in self.hosts.values())
+
+    def summary(self):
+        with self._lock:
+            return {host: stats.to_dict() for host, stats in sorted(self.hosts.items())}
+
+    def format_summary(self):
+        """Return the lines of a per-host latency table"""
+        lines = ["", "⏱  Request timing per host (ms, p50/p95/p99)"]
+        for host, stats in self.summary().items():
+            failed = sum(stats["errors"].values())
+            lines.append(f"   {host}: {stats['requests']} requests, {stats['reusedConnections']} on reused "
+                         f"connections, {stats['bytes']} bytes, {failed} failed")
+            for phase, hist in stats["phasesMs"].items():
+                lines.append(f"     {phase:<8} {hist['p50']:9.1f} {hist['p95']:9.1f} {hist['p99']:9.1f}"
+                             f"   max {hist['max']:.1f} (n={hist['count']})")
+        return lines
+
+    def export(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"generated": int(time.time() * 1000), "hosts": self.summary()}, f, indent=2)
+
+
+def _log_timing(timing):
+    # Imported lazily so the HTTP layer does not depend on the debug log at import time
+    import debug_log
+    debug_log.make_log("http-timing")("TIMING", "request_timing.py:record", "Request timing", timing.to_dict())
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Return the process-wide TimingRecorder used by the shared HTTP session"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = TimingRecorder(on_record=_log_timing)
+        return _recorder
+
+
+def report(path=DEFAULT_TIMING_PATH, output=print):
+    """Print the per-host summary and export it as JSON; scripts call this before exiting"""
+    if _recorder is None or not len(_recorder):
+        return
+    for line in _recorder.format_summary():
+        output(line)
+    try:
+        _recorder.export(path)
+    except OSError as e:
+        output(f"   (could not write {path}: {e})")
+        return
+    output(f"   Timings written to {path}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Retries with jittered exponential backoff and per-host circuit breakers for chart fetches"""
+import email.utils
+import http.client
+import random
+import socket
+import threading
+import time
+import urllib.error
+from datetime import datetime, timezone
+
+# Responses worth another attempt: rate limiting and transient server/proxy errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Statuses that mean the host itself is unhealthy (429 only means "slow down")
+BREAKER_STATUSES = {500, 502, 503, 504}
+
+# Network failures worth another attempt; TLS certificate errors and the like are not
+RETRY_ERRORS = (ConnectionError, TimeoutError, socket.gaierror, http.client.HTTPException)
+
+# Only these are retried automatically
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+DEFAULT_MAX_RETRY_AFTER = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(urllib.error.URLError):
+    """Raised without sending a request while a host's circuit breaker is open"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"circuit open for {host}: too many consecutive failures, retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class RetryPolicy:
+    """How many times to try a request and how long to wait in between.
+
+    Delays use "full jitter": a random value between 0 and
+    base_delay * 2**(attempt - 1), capped at max_delay, so concurrent
+    workers that failed together do not retry together. A Retry-After
+    header overrides the computed delay; if it asks for more than
+    max_retry_after the response is returned to the caller instead.
+    """
+
+    def __init__(self, attempts=DEFAULT_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 max_retry_after=DEFAULT_MAX_RETRY_AFTER, sleep=time.sleep, rng=None):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+        self._rng = rng or random.Random()
+
+    def backoff(self, attempt):
+        """Jittered delay before retrying after the given (1-based) attempt"""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def delay_for(self, attempt, retry_after=None):
+        """Return the seconds to wait before the next attempt, or None to give up"""
+        if attempt >= self.attempts:
+            return None
+        requested = parse_retry_after(retry_after)
+        if requested is None:
+            return self.backoff(attempt)
+        return requested if requested <= self.max_retry_after else None
+
+
+class CircuitBreaker:
+    """Per-host breaker: closed -> open after threshold consecutive failures -> half-open.
+
+    While open every request fails at once with CircuitOpenError. After
+    reset_timeout one trial request is let through; its success closes the
+    breaker, its failure opens it again for another reset_timeout.
+    """
+
+    def __init__(self, host, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            waited = self.clock() - self.opened_at
+            if waited >= self.reset_timeout and not self._trial:
+                self._trial = True
+                return
+            raise CircuitOpenError(self.host, max(0.0, self.reset_timeout - waited))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_neutral(self):
+        """The request neither proved nor disproved the host's health (e.g. a TLS error)"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per host, created on first use"""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def states(self):
+        with self._lock:
+            return {host: breaker.state for host, breaker in self._breakers.items()}
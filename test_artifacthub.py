@@ -1,48 +1,51 @@
 #!/usr/bin/env python3
 """Test Artifact Hub repository requirements"""
-import json
 import sys
-import urllib.request
 import urllib.error
-from datetime import datetime
+from functools import partial
 
-LOG_PATH = "/Users/sasikanth.masini/sample-helm/.cursor/debug.log"
+import debug_log
+import request_timing
+from chart_http import probe_url
+from http_cache import conditional_fetch
+from index_parser import load_index
+from fetch_pool import run_bounded
+from repo_model import ChartRepository
+from validation_runner import FAIL, INFO, PASS, WARN, Check, CheckResult, run_checks
 
-def log(hypothesis_id, location, message, data):
-    """Write debug log entry"""
-    entry = {
-        "sessionId": "debug-session",
-        "runId": "artifacthub-test",
-        "hypothesisId": hypothesis_id,
-        "location": location,
-        "message": message,
-        "data": data,
-        "timestamp": int(datetime.now().timestamp() * 1000)
-    }
-    with open(LOG_PATH, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+log = debug_log.make_log("artifacthub-test")
 
-def check_url(url, hypothesis_id, check_name):
-    """Check if URL is accessible"""
+def check_url(url, hypothesis_id, check_name, probe=False):
+    """Check if URL is accessible (probe=True skips downloading the body)"""
     # #region agent log
-    log(hypothesis_id, "test_artifacthub.py:check_url", f"Checking {check_name}", {"url": url})
+    log(hypothesis_id, "test_artifacthub.py:check_url", f"Checking {check_name}", {"url": url, "probe": probe})
     # #endregion
     try:
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'ArtifactHub/1.0')
-        with urllib.request.urlopen(req, timeout=10) as response:
-            status = response.getcode()
-            content = response.read()
-            headers = dict(response.headers)
+        if probe:
+            status, headers = probe_url(url)
             # #region agent log
             log(hypothesis_id, "test_artifacthub.py:check_url", f"{check_name} accessible", {
                 "url": url,
                 "status": status,
-                "contentType": headers.get('Content-Type', 'unknown'),
-                "contentLength": len(content)
+                "contentType": headers.get('Content-Type') or 'unknown',
+                "contentLength": headers['Content-Length'],
+                "etag": headers['ETag'],
+                "probeMethod": headers['probeMethod']
             })
             # #endregion
-            return True, status, content, headers
+            return True, status, None, headers
+        status, content, headers, not_modified = conditional_fetch(url)
+        headers = dict(headers)
+        # #region agent log
+        log(hypothesis_id, "test_artifacthub.py:check_url", f"{check_name} accessible", {
+            "url": url,
+            "status": status,
+            "contentType": headers.get('Content-Type', 'unknown'),
+            "contentLength": len(content),
+            "notModified": not_modified
+        })
+        # #endregion
+        return True, status, content, headers
     except urllib.error.HTTPError as e:
         # #region agent log
         log(hypothesis_id, "test_artifacthub.py:check_url", f"{check_name} HTTP error", {
@@ -58,75 +61,73 @@ def check_url(url, hypothesis_id, check_name):
         # #endregion
         return False, None, None, {}
 
-def main():
-    repo_base = "https://sasikanthmasini.github.io/NDB-Operator-helm"
-    
-    # #region agent log
-    log("H1", "test_artifacthub.py:main", "Starting Artifact Hub validation", {"repoBase": repo_base})
-    # #endregion
-    
-    # Hypothesis 1: index.yaml must be accessible at {repo_url}/index.yaml
-    index_url = f"{repo_base}/index.yaml"
+def check_index_accessible(ctx, index_url):
+    """H1: index.yaml must be accessible at {repo_url}/index.yaml"""
     # #region agent log
     log("H1", "test_artifacthub.py:main", "Testing H1: index.yaml accessibility", {"url": index_url})
     # #endregion
-    accessible, status, content, headers = check_url(index_url, "H1", "index.yaml")
+    accessible, status, content, headers = ctx.resource("index")
     
     if not accessible or status != 200:
         # #region agent log
         log("H1", "test_artifacthub.py:main", "H1 REJECTED: index.yaml not accessible", {"status": status})
         # #endregion
-        print(f"❌ H1 FAILED: index.yaml not accessible at {index_url} (Status: {status})")
-        print(f"   → Fix: Ensure GitHub Pages is enabled and serving from docs/ folder")
-        return 1
-    else:
-        # #region agent log
-        log("H1", "test_artifacthub.py:main", "H1 CONFIRMED: index.yaml accessible", {"status": status, "contentType": headers.get('Content-Type')})
-        # #endregion
-        print(f"✓ H1 PASSED: index.yaml is accessible")
-    
-    # Hypothesis 2: index.yaml must contain absolute URLs (not relative)
+        return CheckResult(FAIL, [
+            f"❌ H1 FAILED: index.yaml not accessible at {index_url} (Status: {status})",
+            f"   → Fix: Ensure GitHub Pages is enabled and serving from docs/ folder",
+        ])
+    # #region agent log
+    log("H1", "test_artifacthub.py:main", "H1 CONFIRMED: index.yaml accessible", {"status": status, "contentType": headers.get('Content-Type')})
+    # #endregion
+    return CheckResult(PASS, [f"✓ H1 PASSED: index.yaml is accessible"])
+
+def check_absolute_urls(ctx):
+    """H2: index.yaml must contain absolute URLs (not relative)"""
     # #region agent log
     log("H2", "test_artifacthub.py:main", "Testing H2: index.yaml contains absolute URLs", {})
     # #endregion
+    _, _, content, _ = ctx.resource("index")
     try:
         content_str = content.decode('utf-8') if isinstance(content, bytes) else content
-        has_absolute_urls = 'https://' in content_str or 'http://' in content_str
-        has_relative_urls_only = not has_absolute_urls and ('urls:' in content_str or '- ' in content_str)
+        repository = ChartRepository.from_index(load_index(content_str))
+        package_urls = repository.urls()
+        absolute_urls = [url for url in package_urls if url.startswith(('http://', 'https://'))]
+        has_absolute_urls = bool(absolute_urls)
+        has_relative_urls_only = not has_absolute_urls and bool(package_urls)
         
         # #region agent log
         log("H2", "test_artifacthub.py:main", "H2 URL analysis", {
             "hasAbsoluteUrls": has_absolute_urls,
             "hasRelativeUrlsOnly": has_relative_urls_only,
-            "urlsSection": content_str[content_str.find('urls:'):content_str.find('urls:')+200] if 'urls:' in content_str else "not found"
+            "chartVersions": len(repository),
+            "urls": package_urls
         })
         # #endregion
-        
-        if not has_absolute_urls:
-            # #region agent log
-            log("H2", "test_artifacthub.py:main", "H2 REJECTED: No absolute URLs found", {})
-            # #endregion
-            print(f"❌ H2 FAILED: index.yaml does not contain absolute URLs")
-            print(f"   → Fix: Update chart URLs in index.yaml to use absolute URLs")
-            return 1
-        else:
-            # #region agent log
-            log("H2", "test_artifacthub.py:main", "H2 CONFIRMED: Absolute URLs found", {})
-            # #endregion
-            print(f"✓ H2 PASSED: index.yaml contains absolute URLs")
     except Exception as e:
         # #region agent log
         log("H2", "test_artifacthub.py:main", "H2 ERROR: Failed to parse", {"error": str(e)})
         # #endregion
-        print(f"❌ H2 ERROR: Failed to parse index.yaml: {e}")
-        return 1
+        return CheckResult(FAIL, [f"❌ H2 ERROR: Failed to parse index.yaml: {e}"])
     
-    # Hypothesis 3: Chart package URLs in index.yaml must be accessible
+    if not has_absolute_urls:
+        # #region agent log
+        log("H2", "test_artifacthub.py:main", "H2 REJECTED: No absolute URLs found", {})
+        # #endregion
+        return CheckResult(FAIL, [
+            f"❌ H2 FAILED: index.yaml does not contain absolute URLs",
+            f"   → Fix: Update chart URLs in index.yaml to use absolute URLs",
+        ])
+    # #region agent log
+    log("H2", "test_artifacthub.py:main", "H2 CONFIRMED: Absolute URLs found", {})
+    # #endregion
+    return CheckResult(PASS, [f"✓ H2 PASSED: index.yaml contains absolute URLs"], {"absoluteUrls": absolute_urls})
+
+def check_chart_packages(ctx):
+    """H3: Chart package URLs in index.yaml must be accessible"""
     # #region agent log
     log("H3", "test_artifacthub.py:main", "Testing H3: Chart package URLs accessible", {})
     # #endregion
-    import re
-    chart_urls = re.findall(r'https?://[^\s"\']+\.tgz', content_str)
+    chart_urls = [url for url in ctx.result("H2").data["absoluteUrls"] if url.endswith('.tgz')]
     # #region agent log
     log("H3", "test_artifacthub.py:main", "Found chart URLs", {"urls": chart_urls, "count": len(chart_urls)})
     # #endregion
@@ -135,38 +136,39 @@ def main():
         # #region agent log
         log("H3", "test_artifacthub.py:main", "H3 REJECTED: No chart URLs found", {})
         # #endregion
-        print(f"❌ H3 FAILED: No chart package URLs found in index.yaml")
-        return 1
+        return CheckResult(FAIL, [f"❌ H3 FAILED: No chart package URLs found in index.yaml"])
     
-    all_accessible = True
-    for chart_url in chart_urls:
+    def probe_chart(chart_url):
         # #region agent log
         log("H3", "test_artifacthub.py:main", "Checking chart URL", {"url": chart_url})
         # #endregion
-        accessible, status, _, _ = check_url(chart_url, "H3", f"Chart {chart_url}")
+        return check_url(chart_url, "H3", f"Chart {chart_url}", probe=True)
+    
+    lines = []
+    for chart_url, (accessible, status, _, _) in zip(chart_urls, run_bounded(chart_urls, probe_chart)):
         if not accessible or status != 200:
             # #region agent log
             log("H3", "test_artifacthub.py:main", "H3 REJECTED: Chart URL not accessible", {"url": chart_url, "status": status})
             # #endregion
-            print(f"❌ H3 FAILED: Chart package not accessible: {chart_url} (Status: {status})")
-            all_accessible = False
+            lines.append(f"❌ H3 FAILED: Chart package not accessible: {chart_url} (Status: {status})")
         else:
             # #region agent log
             log("H3", "test_artifacthub.py:main", "Chart URL accessible", {"url": chart_url, "status": status})
             # #endregion
     
-    if not all_accessible:
-        return 1
-    else:
-        # #region agent log
-        log("H3", "test_artifacthub.py:main", "H3 CONFIRMED: All chart URLs accessible", {})
-        # #endregion
-        print(f"✓ H3 PASSED: All chart package URLs are accessible")
-    
-    # Hypothesis 4: Chart URLs should use GitHub Pages URL, not raw.githubusercontent.com
+    if lines:
+        return CheckResult(FAIL, lines, {"chartUrls": chart_urls})
+    # #region agent log
+    log("H3", "test_artifacthub.py:main", "H3 CONFIRMED: All chart URLs accessible", {})
+    # #endregion
+    return CheckResult(PASS, [f"✓ H3 PASSED: All chart package URLs are accessible"], {"chartUrls": chart_urls})
+
+def check_github_pages_urls(ctx, repo_base):
+    """H4: Chart URLs should use GitHub Pages URL, not raw.githubusercontent.com"""
     # #region agent log
     log("H4", "test_artifacthub.py:main", "Testing H4: Chart URLs use GitHub Pages format", {})
     # #endregion
+    chart_urls = ctx.result("H3").data["chartUrls"]
     uses_raw_github = any('raw.githubusercontent.com' in url for url in chart_urls)
     uses_github_pages = any('github.io' in url for url in chart_urls)
     
@@ -182,35 +184,66 @@ def main():
         # #region agent log
         log("H4", "test_artifacthub.py:main", "H4 REJECTED: Using raw.githubusercontent.com instead of GitHub Pages", {})
         # #endregion
-        print(f"⚠️  H4 WARNING: Chart URLs use raw.githubusercontent.com instead of GitHub Pages")
-        print(f"   → Recommendation: Update to GitHub Pages URLs for consistency")
-        print(f"   → Current: {chart_urls[0]}")
-        print(f"   → Should be: {repo_base}/ndb-operator-0.5.3.tgz")
-    else:
-        # #region agent log
-        log("H4", "test_artifacthub.py:main", "H4 CONFIRMED: Using GitHub Pages URLs", {})
-        # #endregion
-        print(f"✓ H4 PASSED: Chart URLs use GitHub Pages format")
-    
-    # Hypothesis 5: Repository URL format for Artifact Hub
+        return CheckResult(WARN, [
+            f"⚠️  H4 WARNING: Chart URLs use raw.githubusercontent.com instead of GitHub Pages",
+            f"   → Recommendation: Update to GitHub Pages URLs for consistency",
+            f"   → Current: {chart_urls[0]}",
+            f"   → Should be: {repo_base}/ndb-operator-0.5.3.tgz",
+        ])
+    # #region agent log
+    log("H4", "test_artifacthub.py:main", "H4 CONFIRMED: Using GitHub Pages URLs", {})
+    # #endregion
+    return CheckResult(PASS, [f"✓ H4 PASSED: Chart URLs use GitHub Pages format"])
+
+def check_repository_url(ctx, repo_base):
+    """H5: Repository URL format for Artifact Hub"""
     # #region agent log
     log("H5", "test_artifacthub.py:main", "Testing H5: Repository URL format", {})
     # #endregion
-    print(f"\n📋 Summary:")
-    print(f"   Repository URL to use in Artifact Hub: {repo_base}")
-    print(f"   This URL should point to your GitHub Pages site")
-    print(f"\n💡 Next steps:")
-    print(f"   1. Ensure index.yaml uses GitHub Pages URLs (not raw.githubusercontent.com)")
-    print(f"   2. Add repository in Artifact Hub using: {repo_base}")
-    print(f"   3. Artifact Hub will fetch: {repo_base}/index.yaml")
+    lines = [
+        f"\n📋 Summary:",
+        f"   Repository URL to use in Artifact Hub: {repo_base}",
+        f"   This URL should point to your GitHub Pages site",
+        f"\n💡 Next steps:",
+        f"   1. Ensure index.yaml uses GitHub Pages URLs (not raw.githubusercontent.com)",
+        f"   2. Add repository in Artifact Hub using: {repo_base}",
+        f"   3. Artifact Hub will fetch: {repo_base}/index.yaml",
+    ]
     
     # #region agent log
     log("H5", "test_artifacthub.py:main", "H5 CONFIRMED: Repository URL format correct", {"repoUrl": repo_base})
     # #endregion
+    return CheckResult(INFO, lines)
+
+def build_checks(repo_base):
+    """Return (checks, resources) for validating the repository at repo_base"""
+    index_url = f"{repo_base}/index.yaml"
+    resources = {
+        "index": lambda ctx: check_url(index_url, "H1", "index.yaml"),
+    }
+    checks = [
+        Check("H1", partial(check_index_accessible, index_url=index_url), requires=["index"]),
+        Check("H2", check_absolute_urls, requires=["index"], after=["H1"]),
+        Check("H3", check_chart_packages, after=["H2"]),
+        Check("H4", partial(check_github_pages_urls, repo_base=repo_base), after=["H3"]),
+        Check("H5", partial(check_repository_url, repo_base=repo_base), after=["H4"]),
+    ]
+    return checks, resources
+
+def main():
+    repo_base = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+    
+    # #region agent log
+    log("H1", "test_artifacthub.py:main", "Starting Artifact Hub validation", {"repoBase": repo_base})
+    # #endregion
     
-    return 0
+    checks, resources = build_checks(repo_base)
+    return run_checks(checks, resources)
 
 if __name__ == "__main__":
-    sys.exit(main())
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)
 
 
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Dependency-aware runner for the Artifact Hub hypothesis checks"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PASS = "pass"
+FAIL = "fail"
+WARN = "warn"
+INFO = "info"
+SKIP = "skip"
+
+# Statuses that let dependent checks run
+OK_STATUSES = {PASS, WARN, INFO}
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class CheckResult:
+    """Outcome of one check: a status, the lines to print and data for later checks"""
+
+    def __init__(self, status, lines=(), data=None):
+        self.status = status
+        self.lines = list(lines)
+        self.data = data or {}
+
+    @property
+    def ok(self):
+        return self.status in OK_STATUSES
+
+    def __repr__(self):
+        return f"CheckResult({self.status!r})"
+
+
+class Check:
+    """A named check with its data dependencies.
+
+    requires lists the shared resources the check reads through
+    ctx.resource(); after lists checks that must have succeeded first (the
+    check is skipped if any of them failed or was skipped). run(ctx) returns
+    a CheckResult.
+    """
+
+    def __init__(self, check_id, run, requires=(), after=()):
+        self.check_id = check_id
+        self.run = run
+        self.requires = tuple(requires)
+        self.after = tuple(after)
+
+    def __repr__(self):
+        return f"Check({self.check_id!r})"
+
+
+class RunContext:
+    """Shared state for one run: lazily loaded resources and finished results"""
+
+    def __init__(self, loaders):
+        self._loaders = loaders
+        self._values = {}
+        self._locks = {name: threading.Lock() for name in loaders}
+        self._once = {}
+        self._once_lock = threading.Lock()
+        self.results = {}
+
+    def resource(self, name):
+        """Return a resource, loading it on first use; each loader runs once"""
+        if name not in self._loaders:
+            raise KeyError(f"Unknown resource: {name}")
+        with self._locks[name]:
+            if name not in self._values:
+                try:
+                    self._values[name] = (True, self._loaders[name](self))
+                except Exception as e:
+                    self._values[name] = (False, e)
+        ok, value = self._values[name]
+        if not ok:
+            raise value
+        return value
+
+    def preload(self, name):
+        """Load a resource, keeping any error for the checks that need it"""
+        try:
+            self.resource(name)
+        except Exception:
+            pass
+
+    def once(self, key, loader):
+        """Return loader() for a key discovered at run time, calling it once per key.
+
+        Used for data only known after a resource is loaded, e.g. chart URLs
+        listed in index.yaml that several checks probe.
+        """
+        with self._once_lock:
+            entry = self._once.get(key)
+            if entry is None:
+                entry = self._once[key] = [threading.Lock(), None]
+        with entry[0]:
+            if entry[1] is None:
+                try:
+                    entry[1] = (True, loader())
+                except Exception as e:
+                    entry[1] = (False, e)
+        ok, value = entry[1]
+        if not ok:
+            raise value
+        return value
+
+    def result(self, check_id):
+        return self.results[check_id]
+
+
+class ValidationRunner:
+    """Run checks with one shared fetch layer and report them in declaration order.
+
+    Every resource any check requires is loaded concurrently up front, so
+    the network round trips for index.yaml, artifacthub-repo.yml, ... overlap.
+    Checks then run in waves: each wave holds every check whose "after"
+    dependencies have finished, and runs concurrently. Results are printed
+    in the order the checks were declared, as soon as all earlier checks
+    have been reported.
+    """
+
+    def __init__(self, checks, resources=None, max_workers=DEFAULT_MAX_WORKERS, output=print):
+        self.checks = list(checks)
+        self.resources = dict(resources or {})
+        self.max_workers = max_workers
+        self.output = output
+        ids = [check.check_id for check in self.checks]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Duplicate check ids: {ids}")
+        for check in self.checks:
+            unknown = [dep for dep in check.after if dep not in ids]
+            unknown += [name for name in check.requires if name not in self.resources]
+            if unknown:
+                raise ValueError(f"{check.check_id} depends on unknown checks/resources: {unknown}")
+
+    def _run_check(self, check, ctx):
+        try:
+            return check.run(ctx)
+        except Exception as e:
+            return CheckResult(FAIL, [f"❌ {check.check_id} ERROR: {e}"], {"error": str(e)})
+
+    def run(self):
+        """Run every check; returns [(check, result)] in declaration order"""
+        ctx = RunContext(self.resources)
+        needed = []
+        for check in self.checks:
+            needed.extend(name for name in check.requires if name not in needed)
+        reported = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(ctx.preload, needed))
+            pending = list(self.checks)
+            while pending:
+                ready = [c for c in pending if all(dep in ctx.results for dep in c.after)]
+                if not ready:
+                    raise ValueError(f"Dependency cycle between checks: {pending}")
+                futures = {}
+                for check in ready:
+                    if all(ctx.results[dep].ok for dep in check.after):
+                        futures[check.check_id] = pool.submit(self._run_check, check, ctx)
+                    else:
+                        ctx.results[check.check_id] = CheckResult(SKIP)
+                for check_id, future in futures.items():
+                    ctx.results[check_id] = future.result()
+                pending = [c for c in pending if c.check_id not in ctx.results]
+                while reported < len(self.checks) and self.checks[reported].check_id in ctx.results:
+                    for line in ctx.results[self.checks[reported].check_id].lines:
+                        self.output(line)
+                    reported += 1
+        return [(check, ctx.results[check.check_id]) for check in self.checks]
+
+
+def run_checks(checks, resources=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Run checks and return a process exit code (1 if any check failed)"""
+    results = ValidationRunner(checks, resources, max_workers=max_workers).run()
+    return 1 if any(result.status == FAIL for _, result in results) else 0
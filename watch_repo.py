@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Watch the published chart repository and re-validate only what changes"""
+import argparse
+import hashlib
+import sys
+import time
+import urllib.error
+
+import yaml
+
+import debug_log
+import request_timing
+from fetch_pool import host_of, run_bounded
+from index_parser import index_entries, load_index
+from repo_fetcher import NETWORK
+
+DEFAULT_REPO_URL = "https://sasikanthmasini.github.io/NDB-Operator-helm"
+MIN_INTERVAL = 30
+MAX_INTERVAL = 30 * 60
+BACKOFF = 2.0
+
+log = debug_log.make_log("watch")
+
+
+def snapshot_entries(index_data):
+    """Map (chart, version) to the fields whose change means the entry must be re-validated"""
+    return {
+        (chart_name, str(entry.get("version"))): (entry.get("digest"), tuple(entry.get("urls") or ()), str(entry.get("created")))
+        for chart_name, entry in index_entries(index_data)
+    }
+
+
+def diff_snapshots(old, new):
+    """Return (changed, removed): keys added or modified in new, and keys no longer present"""
+    changed = [key for key, fields in new.items() if old.get(key) != fields]
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+def validate_entry(repo_url, chart_name, entry, fetcher=NETWORK):
+    """Check every URL of one version entry; returns [(url, ok, detail)]"""
+    results = []
+    for url in entry.get("urls") or []:
+        if not url.startswith("http"):
+            url = f"{repo_url}/{url}"
+        try:
+            if entry.get("digest"):
+                result = fetcher.verify_digest(url, entry["digest"])
+                ok = result["matches"]
+                detail = "digest ok" if ok else f"digest mismatch (got {result['actual']})"
+            else:
+                status, _ = fetcher.probe(url)
+                ok, detail = status == 200, f"HTTP {status}"
+        except urllib.error.HTTPError as e:
+            ok, detail = False, f"HTTP {e.code}"
+        except Exception as e:
+            ok, detail = False, str(e)
+        results.append((url, ok, detail))
+    return results
+
+
+class RepositoryWatcher:
+    """Poll index.yaml and artifacthub-repo.yml with conditional requests.
+
+    While nothing changes the interval grows by backoff up to max_interval;
+    any change drops it back to min_interval, since a publish is usually
+    followed by more (GitHub Pages deploys and follow-up fixes). Only
+    entries whose digest, URLs or created timestamp differ from the last
+    snapshot are validated again. Entries that fail stay out of the
+    snapshot and a file whose check failed is checked again on every poll,
+    even while it is unchanged, so a failure is reported until it is fixed
+    (e.g. a package that is not served yet) rather than only once.
+    """
+
+    def __init__(self, repo_url=DEFAULT_REPO_URL, fetcher=NETWORK, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, backoff=BACKOFF, output=print):
+        self.repo_url = repo_url.rstrip("/")
+        self.fetcher = fetcher
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.output = output
+        self.interval = min_interval
+        self.snapshot = None
+        self._fingerprints = {}
+        self._failing = set()
+
+    def _fetch(self, name):
+        """Return (changed, content) for one repository file; content is None if it is missing"""
+        url = f"{self.repo_url}/{name}"
+        try:
+            _, content, _, not_modified = self.fetcher.fetch(url)
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+            content, not_modified = None, False
+        if not_modified and name in self._fingerprints:
+            return False, content
+        # Servers without ETag/Last-Modified never answer 304; compare content hashes instead
+        fingerprint = None if content is None else hashlib.sha256(content).hexdigest()
+        changed = self._fingerprints.get(name, "") != fingerprint
+        self._fingerprints[name] = fingerprint
+        return changed, content
+
+    def _say(self, message):
+        self.output(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+    def _check_index(self, content):
+        try:
+            index_data = load_index(content) or {}
+        except yaml.YAMLError as e:
+            self._say(f"❌ index.yaml is not valid YAML: {e}")
+            return False
+        snapshot = snapshot_entries(index_data)
+        changed, removed = diff_snapshots(self.snapshot or {}, snapshot)
+        self.snapshot = snapshot
+        for chart_name, version in removed:
+            self._say(f"➖ {chart_name} {version} removed from index.yaml")
+        if not changed:
+            self._say("index.yaml changed, but no entry needs re-validation")
+            return True
+        wanted = set(changed)
+        entries = [(name, entry) for name, entry in index_entries(index_data)
+                   if (name, str(entry.get("version"))) in wanted]
+        results = run_bounded(
+            entries,
+            lambda item: validate_entry(self.repo_url, *item, fetcher=self.fetcher),
+            key=lambda item: host_of((item[1].get("urls") or [self.repo_url])[0]),
+        )
+        all_ok = True
+        for (chart_name, entry), urls in zip(entries, results):
+            ok = bool(urls) and all(url_ok for _, url_ok, _ in urls)
+            all_ok &= ok
+            if not ok:
+                # Left out of the snapshot, so the next check of index.yaml validates it again
+                self.snapshot.pop((chart_name, str(entry.get("version"))), None)
+            details = "; ".join(detail for _, _, detail in urls) or "no urls"
+            self._say(f"{'✓' if ok else '❌'} {chart_name} {entry.get('version')}: {details}")
+        # #region agent log
+        log("W1", "watch_repo.py:_check_index", "Changed entries validated", {
+            "changed": [list(key) for key in changed], "removed": [list(key) for key in removed], "allValid": all_ok,
+        })
+        # #endregion
+        return all_ok
+
+    def _check_repo_yml(self, content):
+        if content is None:
+            self._say("⚠️  artifacthub-repo.yml not found")
+            return True
+        try:
+            metadata = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            self._say(f"❌ artifacthub-repo.yml is not valid YAML: {e}")
+            return False
+        if not isinstance(metadata, dict):
+            self._say("❌ artifacthub-repo.yml must be a YAML mapping")
+            return False
+        self._say(f"✓ artifacthub-repo.yml valid (repositoryID: {metadata.get('repositoryID') or 'not set'})")
+        return True
+
+    def _record(self, name, ok):
+        if ok:
+            self._failing.discard(name)
+        else:
+            self._failing.add(name)
+        return ok
+
+    def poll(self):
+        """Run one polling round; returns (changed, ok) and adjusts the interval"""
+        changed = False
+        ok = True
+        index_changed, index_content = self._fetch("index.yaml")
+        if index_content is None:
+            self._say("❌ index.yaml not found")
+            ok = False
+        elif index_changed or "index.yaml" in self._failing:
+            changed |= index_changed
+            ok &= self._record("index.yaml", self._check_index(index_content))
+        repo_yml_changed, repo_yml_content = self._fetch("artifacthub-repo.yml")
+        if repo_yml_changed or "artifacthub-repo.yml" in self._failing:
+            changed |= repo_yml_changed
+            ok &= self._record("artifacthub-repo.yml", self._check_repo_yml(repo_yml_content))
+
+        # Failures are re-checked at the short interval until they pass
+        if changed or self._failing:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        # #region agent log
+        log("W1", "watch_repo.py:poll", "Poll finished", {"changed": changed, "ok": ok, "nextInterval": self.interval})
+        # #endregion
+        return changed, ok
+
+    def run(self, iterations=None, sleep=time.sleep):
+        """Poll until interrupted (or for iterations rounds); returns 1 if the last round failed"""
+        ok = True
+        done = 0
+        self._say(f"Watching {self.repo_url} (every {self.min_interval:g}-{self.max_interval:g}s)")
+        try:
+            while iterations is None or done < iterations:
+                try:
+                    changed, ok = self.poll()
+                except Exception as e:
+                    self._say(f"❌ Poll failed: {e}")
+                    changed, ok = False, False
+                    # Compare everything again next round; the snapshot still limits re-validation
+                    self._fingerprints.clear()
+                    self.interval = self.min_interval
+                done += 1
+                if iterations is not None and done >= iterations:
+                    break
+                if not changed:
+                    self._say(f"no changes, next check in {self.interval:g}s")
+                debug_log.flush()
+                sleep(self.interval)
+        except KeyboardInterrupt:
+            self._say("Stopped")
+        return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repo-url", default=DEFAULT_REPO_URL, help="chart repository URL")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL, help=f"seconds between polls after a change (default: {MIN_INTERVAL})")
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL, help=f"longest wait while nothing changes (default: {MAX_INTERVAL})")
+    parser.add_argument("--backoff", type=float, default=BACKOFF, help=f"interval multiplier per unchanged poll (default: {BACKOFF})")
+    parser.add_argument("--iterations", type=int, help="stop after this many polls")
+    args = parser.parse_args(argv)
+
+    watcher = RepositoryWatcher(args.repo_url, min_interval=args.min_interval,
+                                max_interval=args.max_interval, backoff=args.backoff)
+    return watcher.run(args.iterations)
+
+
+if __name__ == "__main__":
+    status = main()
+    request_timing.report()
+    debug_log.flush()
+    sys.exit(status)